@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ListingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'listings'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .geo import install_geo_triggers
+        from .search import install_fts_triggers
+
+        # Триггеры полнотекстового и пространственного индексов пропадают, когда SQLite пересоздает таблицу
+        post_migrate.connect(install_fts_triggers, sender=self)
+        post_migrate.connect(install_geo_triggers, sender=self)
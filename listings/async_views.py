@@ -0,0 +1,227 @@
+# Асинхронные view для чтения объявлений и отзывов (развертывание через ASGI, см. ASYNC_READ_VIEWS).
+# DRF не поддерживает async view, поэтому GET-запрос обслуживается здесь, а фильтры, права,
+# сериализаторы и пагинатор берутся из синхронного DRF view. Остальные запросы передаются ему целиком
+from abc import ABCMeta, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.paginator import InvalidPage
+from django.db.models import aprefetch_related_objects
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from . import cache as listing_cache
+from .models import related_prefetches
+from .views import ListingView, ListingDetailView, ReviewListView
+
+
+async def afetch(queryset):
+    """
+    Загружает строки queryset через aiterator (подгрузки связей выполняются отдельно).
+    """
+    return [instance async for instance in queryset.prefetch_related(None).aiterator()]
+
+
+async def apaginate(paginator, queryset, request):
+    """
+    Асинхронный вариант PageNumberPagination.paginate_queryset: строки запрошенной страницы
+    читаются сразу после COUNT, не дожидаясь проверки номера. Возвращает None, если пагинация отключена.
+    """
+    page_size = paginator.get_page_size(request)
+    if not page_size:
+        return None
+
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    try:
+        requested = int(request.query_params.get(paginator.page_query_param) or 1)
+    except (TypeError, ValueError):
+        # Например, page=last: номер станет известен только после подсчета
+        requested = None
+
+    if requested is not None and requested >= 1:
+        bottom = (requested - 1) * page_size
+        count, rows = await queryset.acount(), await afetch(queryset[bottom:bottom + page_size])
+    else:
+        count, rows = await queryset.acount(), None
+
+    # Количество уже известно: Paginator не будет выполнять COUNT еще раз
+    django_paginator.count = count
+    page_number = paginator.get_page_number(request, django_paginator)
+    try:
+        number = django_paginator.validate_number(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    if number != requested:
+        bottom = (number - 1) * page_size
+        rows = await afetch(queryset[bottom:bottom + page_size])
+
+    paginator.page = django_paginator._get_page(rows, number, django_paginator)
+    paginator.request = request
+    return rows
+
+
+class AsyncReadView(View, metaclass=ABCMeta):
+    """
+    Асинхронный GET поверх async ORM Django (aget, aiterator, acount).
+    Аутентификация, согласование формата, права, фильтры и сериализация - те же,
+    что в синхронном DRF view sync_view_class. Async ORM выполняет запросы в одном потоке
+    (thread_sensitive), поэтому запросы к базе идут по очереди; сериализация тоже выполняется
+    в этом потоке, а не в цикле событий. Подклассы реализуют get_response.
+    Остальные методы, Browsable API и параметры из sync_query_params обслуживает синхронный view.
+    """
+    view_is_async = True
+    # Синхронный DRF view с той же логикой
+    sync_view_class = None
+    # Параметры запроса, при которых используется синхронный view
+    sync_query_params = ()
+    # Функция синхронного view (создается в as_view)
+    sync_view = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Как и в DRF, CSRF проверяется аутентификацией DRF, а не middleware
+        return csrf_exempt(super().as_view(sync_view=cls.sync_view_class.as_view(), **initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or any(param in request.GET for param in self.sync_query_params):
+            return await self.delegate(request, *args, **kwargs)
+
+        view = self.sync_view_class(**self.sync_view.view_initkwargs)
+        view.setup(request, *args, **kwargs)
+        view.headers = view.default_response_headers
+        request = view.initialize_request(request, *args, **kwargs)
+        view.request = request
+        try:
+            await self.authenticate(request)
+            # Пользователь уже известен: initial не обращается к базе
+            view.initial(request, *args, **kwargs)
+            if request.accepted_renderer.format == 'api':
+                # Browsable API строит формы синхронно
+                return await self.delegate(request._request, *args, **kwargs)
+            response = await self.get_response(view, request)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+
+        response = view.finalize_response(request, response, *args, **kwargs)
+        if not isinstance(response, Response):
+            return response
+        # Готовый HttpResponse: ответ DRF обработчик ASGI рендерил бы в отдельном потоке.
+        # Данные ответа остаются доступны в data, как у Response
+        rendered = HttpResponse(response.rendered_content, status=response.status_code, headers=response.headers)
+        rendered.data = response.data
+        return rendered
+
+    async def delegate(self, request, *args, **kwargs):
+        return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+    async def authenticate(self, request):
+        """
+        Асинхронный вариант Request._authenticate: аутентификаторы с aauthenticate
+        загружают пользователя через async ORM.
+        """
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, 'aauthenticate'):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except Exception:
+                request._not_authenticated()
+                raise
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._authenticator = None
+        request.user, request.auth = AnonymousUser(), None
+
+    @abstractmethod
+    async def get_response(self, view, request):
+        """
+        Ответ на GET-запрос (Response DRF) для подготовленного синхронного view.
+        """
+
+    @staticmethod
+    async def serialize(view, *args, **kwargs):
+        # Сериализация - синхронный код (и возможные запросы к базе): вне цикла событий
+        return await sync_to_async(view.serialize)(*args, **kwargs)
+
+
+class AsyncListingView(AsyncReadView):
+    """
+    Список объявлений (GET /listings/). Фасеты и пагинация по курсору - в синхронном ListingView.
+    """
+    sync_view_class = ListingView
+    sync_query_params = ('facets', 'pagination', 'cursor')
+
+    async def get_response(self, view, request):
+        if request.user.is_authenticated:
+            return await self.list(view, request)
+
+        # Ответы анонимным пользователям кэшируются так же, как в ListingView.list
+        key = await sync_to_async(listing_cache.response_key)(request, role='anonymous')
+        data = await sync_to_async(listing_cache.get_response)(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response = await self.list(view, request)
+        if response.status_code == status.HTTP_200_OK:
+            await sync_to_async(listing_cache.set_response)(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    async def list(self, view, request):
+        queryset = view.filter_queryset(view.get_queryset())
+        page = await apaginate(view.paginator, queryset, request)
+        rows = page if page is not None else await afetch(queryset)
+        # Отзывы и бронирования страницы
+        await aprefetch_related_objects(rows, *related_prefetches(request.user, view.get_fieldset()))
+        data = await self.serialize(view, rows, many=True)
+        if page is None:
+            return Response(data)
+        return view.get_paginated_response(data)
+
+
+class AsyncListingDetailView(AsyncReadView):
+    """
+    Объявление (GET /listings/<id>/) с поддержкой условных запросов, как в ListingDetailView.
+    """
+    sync_view_class = ListingDetailView
+
+    async def get_response(self, view, request):
+        queryset = view.filter_queryset(view.get_queryset())
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        try:
+            instance = await queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404
+        view.check_object_permissions(request, instance)
+
+        etag, last_modified = view.get_validators(instance)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            await aprefetch_related_objects([instance], *view.get_prefetches())
+            response = Response(await self.serialize(view, instance))
+        return view.set_validators(response, etag, last_modified)
+
+
+class AsyncReviewListView(AsyncReadView):
+    """
+    Отзывы объявления (GET /listings/<id>/reviews/).
+    """
+    sync_view_class = ReviewListView
+
+    async def get_response(self, view, request):
+        queryset = view.filter_queryset(view.get_queryset())
+        page = await apaginate(view.paginator, queryset, request)
+        rows = page if page is not None else await afetch(queryset)
+        data = await self.serialize(view, rows, many=True)
+        if page is None:
+            return Response(data)
+        return view.get_paginated_response(data)
@@ -0,0 +1,96 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Ключи счетчиков в кэше
+GENERATION_KEY = 'listings:generation'
+HITS_KEY = 'listings:cache:hits'
+MISSES_KEY = 'listings:cache:misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'LISTING_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    # Время жизни закэшированного ответа в секундах
+    return getattr(settings, 'LISTING_CACHE_TIMEOUT', 60)
+
+
+def get_generation():
+    # Поколение данных объявлений. Начальное значение берется из времени, чтобы после вытеснения
+    # счетчика из кэша не вернуться к старому номеру, под которым еще лежат устаревшие ответы
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    cache = get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate():
+    # Сбрасываем кэш сразу и еще раз после коммита: иначе запрос, прочитавший старые данные
+    # до коммита, успел бы сохранить их под новым поколением
+    bump_generation()
+    transaction.on_commit(bump_generation)
+
+
+def normalized_query(request, exclude=()):
+    # Параметры запроса в каноническом виде: порядок параметров и значений не важен
+    params = sorted((name, sorted(values)) for name, values in request.query_params.lists() if name not in exclude)
+    return urlencode(params, doseq=True)
+
+
+def response_key(request, role):
+    # Ссылки next/previous в ответе абсолютные, поэтому адрес сервера входит в ключ
+    base = request.build_absolute_uri(request.path)
+    digest = hashlib.sha1(f'{base}?{normalized_query(request)}'.encode()).hexdigest()
+    return f'listings:response:{get_generation()}:{role}:{digest}'
+
+
+def facets_key(request, names, exclude):
+    # Фасеты зависят только от фильтров: параметры страницы и сортировки в ключ не входят
+    signature = f'{",".join(names)}?{normalized_query(request, exclude)}'
+    return f'listings:facets:{get_generation()}:{hashlib.sha1(signature.encode()).hexdigest()}'
+
+
+def get_response(key):
+    cache = get_cache()
+    data = cache.get(key)
+    counter = MISSES_KEY if data is None else HITS_KEY
+    if not cache.add(counter, 1, timeout=None):
+        try:
+            cache.incr(counter)
+        except ValueError:
+            # Счетчик вытеснили между add и incr - статистика приблизительная
+            pass
+    return data
+
+
+def set_response(key, data):
+    get_cache().set(key, data, get_timeout())
+
+
+def stats():
+    cache = get_cache()
+    values = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = values.get(HITS_KEY, 0), values.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+        'generation': get_generation(),
+    }
@@ -0,0 +1,61 @@
+# Фасеты списка объявлений: количество объявлений по значениям полей для текущих фильтров
+from django.db.models import Count, Q
+from rest_framework.exceptions import ValidationError
+
+from .models import Listing
+
+# Группы по количеству комнат: (название, от, до включительно; None - без ограничения)
+ROOM_BUCKETS = [('1', 1, 1), ('2', 2, 2), ('3', 3, 3), ('4+', 4, None)]
+
+# Границы гистограммы цен
+PRICE_EDGES = [0, 500, 1000, 1500, 2000, 3000]
+
+
+def _range_filter(field, low, high, inclusive_high):
+    condition = Q(**{f'{field}__gte': low}) if low is not None else Q()
+    if high is not None:
+        condition &= Q(**{f'{field}__lte' if inclusive_high else f'{field}__lt': high})
+    return condition
+
+
+def _price_buckets():
+    edges = PRICE_EDGES + [None]
+    for low, high in zip(edges, edges[1:]):
+        yield (f'{low}-{high}' if high is not None else f'{low}+'), low, high
+
+
+# Для каждого фасета - список (значение, условие)
+FACETS = {
+    'type': [(value, Q(type=value)) for value, _ in Listing.TYPE_CHOICES],
+    'rooms': [(label, _range_filter('rooms', low, high, True)) for label, low, high in ROOM_BUCKETS],
+    'price': [(label, _range_filter('price', low, high, False)) for label, low, high in _price_buckets()],
+    'is_active': [('true', Q(is_active=True)), ('false', Q(is_active=False))],
+}
+
+
+def parse_facets(value):
+    """
+    Разбирает параметр ?facets=type,rooms. Пустой параметр - все фасеты.
+    """
+    names = [name.strip() for name in value.split(',') if name.strip()] or list(FACETS)
+    unknown = [name for name in names if name not in FACETS]
+    if unknown:
+        raise ValidationError({'facets': [f'Unknown facets: {", ".join(unknown)}. '
+                                          f'Available: {", ".join(FACETS)}.']})
+    return sorted(set(names))
+
+
+def compute_facets(queryset, names):
+    """
+    Считает все запрошенные фасеты одним запросом: COUNT(...) FILTER (WHERE ...) на каждое значение.
+    """
+    aggregates = {
+        f'{name}__{index}': Count('pk', filter=condition)
+        for name in names
+        for index, (_, condition) in enumerate(FACETS[name])
+    }
+    counts = queryset.order_by().aggregate(**aggregates)
+    return {
+        name: {label: counts[f'{name}__{index}'] for index, (label, _) in enumerate(FACETS[name])}
+        for name in names
+    }
@@ -0,0 +1,143 @@
+import django_filters
+from django import forms
+from django.db import connections
+from django.db.models import F
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+from .models import Listing
+from .search import build_match_query, fts_available
+
+
+# Список чисел через запятую: ?bbox=52.4,13.2,52.6,13.5
+class NumberListFilter(django_filters.BaseCSVFilter, django_filters.NumberFilter):
+    pass
+
+
+def coordinate_errors(latitude, longitude):
+    """
+    Ошибки диапазона координат: широта от -90 до 90, долгота от -180 до 180.
+    """
+    errors = []
+    if not -90 <= latitude <= 90:
+        errors.append('Latitude must be between -90 and 90.')
+    if not -180 <= longitude <= 180:
+        errors.append('Longitude must be between -180 and 180.')
+    return errors
+
+
+# Форма фильтров объявлений: проверки, в которых участвуют несколько параметров (ошибка - ответ 400)
+class ListingFilterForm(forms.Form):
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('available_from')
+        date_to = cleaned_data.get('available_to')
+        if date_from is not None and date_to is not None and date_from >= date_to:
+            self.add_error('available_to', 'available_to must be later than available_from.')
+
+        bbox = cleaned_data.get('bbox')
+        if bbox:
+            if len(bbox) != 4:
+                self.add_error('bbox', 'Expected min_lat,min_lon,max_lat,max_lon.')
+            else:
+                min_lat, min_lon, max_lat, max_lon = bbox
+                errors = coordinate_errors(min_lat, min_lon) + coordinate_errors(max_lat, max_lon)
+                if min_lat > max_lat or min_lon > max_lon:
+                    errors.append('Expected min_lat <= max_lat and min_lon <= max_lon.')
+                for error in dict.fromkeys(errors):
+                    self.add_error('bbox', error)
+
+        near = cleaned_data.get('near')
+        if near:
+            if len(near) != 2:
+                self.add_error('near', 'Expected lat,lon.')
+            else:
+                for error in coordinate_errors(*near):
+                    self.add_error('near', error)
+        return cleaned_data
+
+
+# Набор фильтров для списка объявлений
+class ListingFilter(django_filters.FilterSet):
+    # Минимальный средний рейтинг: ?min_rating=4
+    min_rating = django_filters.NumberFilter(field_name='rating_avg', lookup_expr='gte')
+    # Свободные даты: ?available_from=2024-09-20&available_to=2024-09-25
+    available_from = django_filters.DateFilter(method='filter_available')
+    available_to = django_filters.DateFilter(method='filter_available')
+    # Прямоугольник на карте: ?bbox=min_lat,min_lon,max_lat,max_lon
+    bbox = NumberListFilter(method='filter_bbox')
+    # Расстояние до точки (для ?ordering=distance) и поиск в радиусе: ?near=52.52,13.40&radius=5 (км)
+    near = NumberListFilter(method='filter_near')
+    radius = django_filters.NumberFilter(method='filter_near', min_value=0)
+
+    class Meta:
+        model = Listing
+        form = ListingFilterForm
+        # Поля для фильтрации по точному совпадению
+        fields = ['price', 'location', 'rooms', 'type', 'is_active']
+
+    def filter_available(self, queryset, name, value):
+        """
+        Оставляет объявления без подтвержденных бронирований в периоде [available_from, available_to).
+        Метод вызывается для каждого заданного параметра, фильтр применяется один раз.
+        """
+        date_from = self.form.cleaned_data.get('available_from')
+        date_to = self.form.cleaned_data.get('available_to')
+        if name == 'available_to' and date_from is not None:
+            return queryset
+        return queryset.available_between(date_from, date_to)
+
+    def filter_bbox(self, queryset, name, value):
+        # Количество чисел, диапазоны и порядок проверены в ListingFilterForm.clean
+        return queryset.within_bbox(*(float(number) for number in value))
+
+    def filter_near(self, queryset, name, value):
+        """
+        Точка и радиус применяются вместе, один раз (метод вызывается для каждого заданного параметра).
+        """
+        near = self.form.cleaned_data.get('near')
+        radius = self.form.cleaned_data.get('radius')
+        if name == 'radius':
+            if not near:
+                raise ValidationError({'radius': ['Radius requires near=lat,lon.']})
+            return queryset
+        return queryset.near(float(near[0]), float(near[1]), float(radius) if radius is not None else None)
+
+
+# Поиск по объявлениям через полнотекстовый индекс
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Заменяет LIKE-поиск SearchFilter на индекс FTS5 по title и description.
+    Результаты сортируются по релевантности (можно переопределить через ?ordering=).
+    Каждое слово запроса ищется как префикс. Если индекс недоступен (не SQLite),
+    используется стандартный SearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not fts_available(connections[queryset.db]):
+            return super().filter_queryset(request, queryset, view)
+
+        query = build_match_query(self.get_search_terms(request))
+        if not query:
+            return queryset
+
+        # JOIN с индексом по rowid: SQLite начинает с поиска в FTS5, затем читает объявления по PK
+        return (queryset
+                .filter(search_index__document__match=query)
+                .annotate(search_rank=F('search_index__rank'))
+                .order_by('search_rank', 'id'))
+
+
+# Сортировка объявлений с поддержкой расстояния
+class ListingOrderingFilter(filters.OrderingFilter):
+    """
+    Сортировка по расстоянию (?ordering=distance) доступна только вместе с ?near=:
+    без точки аннотации distance нет, и такое поле сортировки отбрасывается.
+    """
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        fields = super().remove_invalid_fields(queryset, fields, view, request)
+        if 'distance' not in queryset.query.annotations:
+            fields = [field for field in fields if field.lstrip('-') != 'distance']
+        return fields
@@ -0,0 +1,85 @@
+# Поиск объявлений по координатам на основе модуля SQLite R*Tree
+import math
+
+from django.db import connections
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.db.models.functions import Sqrt
+
+# Виртуальная таблица R*Tree: id объявления и прямоугольник (для точки - вырожденный)
+GEO_TABLE = 'listings_listing_geo'
+
+# Радиус Земли и длина градуса меридиана в километрах
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 2 * math.pi * EARTH_RADIUS_KM / 360
+
+# Триггеры, поддерживающие индекс в актуальном состоянии (объявления без координат в индекс не попадают)
+GEO_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {GEO_TABLE}_ai AFTER INSERT ON listings_listing
+    WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT INTO {GEO_TABLE}(id, min_lat, max_lat, min_lon, max_lon)
+        VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {GEO_TABLE}_ad AFTER DELETE ON listings_listing BEGIN
+        DELETE FROM {GEO_TABLE} WHERE id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {GEO_TABLE}_au AFTER UPDATE OF latitude, longitude ON listings_listing BEGIN
+        DELETE FROM {GEO_TABLE} WHERE id = old.id;
+        INSERT INTO {GEO_TABLE}(id, min_lat, max_lat, min_lon, max_lon)
+        SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+    END
+    """,
+]
+
+
+def rtree_available(connection):
+    """
+    Проверяет, что база данных - SQLite (индекс R*Tree создается миграцией только в SQLite).
+    """
+    return connection.vendor == 'sqlite'
+
+
+def install_geo_triggers(sender=None, using='default', **kwargs):
+    """
+    Восстанавливает триггеры индекса после миграций (см. install_fts_triggers).
+    Подключается к сигналу post_migrate.
+    """
+    connection = connections[using]
+    if not rtree_available(connection) or GEO_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        for statement in GEO_TRIGGERS:
+            cursor.execute(statement)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Прямоугольник (min_lat, min_lon, max_lat, max_lon), содержащий круг радиуса radius_km.
+    Вблизи полюсов прямоугольник расширяется до всех долгот. Переход через 180-й меридиан
+    не поддерживается: прямоугольник обрезается по границе.
+    """
+    delta_lat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(latitude - delta_lat, -90.0), min(latitude + delta_lat, 90.0)
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 1e-9 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180:
+        return min_lat, -180.0, max_lat, 180.0
+    delta_lon = radius_km / (KM_PER_DEGREE * cos_lat)
+    return min_lat, max(longitude - delta_lon, -180.0), max_lat, min(longitude + delta_lon, 180.0)
+
+
+def distance_expression(latitude, longitude):
+    """
+    Расстояние в километрах от точки до координат объявления как SQL-выражение.
+    Используется равнопромежуточная проекция: на расстояниях в пределах города и региона
+    погрешность меньше процента, а в SQL остается только арифметика и квадратный корень
+    (косинус широты считается заранее).
+    """
+    scale_lon = KM_PER_DEGREE * math.cos(math.radians(latitude))
+    delta_lat = (F('latitude') - latitude) * KM_PER_DEGREE
+    delta_lon = (F('longitude') - longitude) * scale_lon
+    return ExpressionWrapper(Sqrt(delta_lat * delta_lat + delta_lon * delta_lon), output_field=FloatField())
@@ -0,0 +1,46 @@
+# Общие помощники для команд-бенчмарков (модули с "_" Django не считает командами)
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Создает отдельную тестовую базу данных на время бенчмарка и удаляет ее после,
+    чтобы не засорять рабочую базу.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def measure(func, repeat):
+    """
+    Выполняет func repeat раз и возвращает длительности в миллисекундах.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def percentile(timings, percent):
+    ordered = sorted(timings)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def format_timings(label, timings):
+    """
+    Строка отчета: медиана, p95 и среднее.
+    """
+    return (f'{label:<40} median {statistics.median(timings):9.2f} ms   '
+            f'p95 {percentile(timings, 95):9.2f} ms   mean {statistics.mean(timings):9.2f} ms')
@@ -0,0 +1,258 @@
+# Набор эндпоинтов для бенчмарка bench_endpoints и теста бюджетов запросов (tests/test_endpoint_budgets.py):
+# каждый маршрут listings/urls.py и users/urls.py с типичным запросом
+import io
+import json
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from listings.models import Listing
+from users.models import User
+from users.tokens import RefreshToken, access_token_refreshes, verified_tokens
+from ._bench import percentile
+
+BASELINE_PATH = Path(settings.BASE_DIR) / 'tests' / 'perf_baseline.json'
+# Набор данных, на котором записан базовый файл, если в нем не указан другой (опции create_test_data)
+DEFAULT_DATASET = {'users': 50, 'listings': 200, 'bookings_per_listing': 5, 'reviews_per_listing': 2, 'seed': 1}
+# Допустимый рост медианы задержки и размера ответа относительно базового файла (доля)
+DEFAULT_LATENCY_THRESHOLD = 0.5
+DEFAULT_PAYLOAD_THRESHOLD = 0.1
+# Медианы меньше миллисекунды зависят от шума: рост в пределах этой добавки не считается регрессией
+LATENCY_SLACK_MS = 1.0
+# Служебные запросы вложенных транзакций в количество запросов не входят
+TRANSACTION_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class Endpoint:
+    """
+    Запрос к маршруту url_name от имени пользователя user (anonymous, tenant, landlord, admin).
+    kwargs и data - функции от подготовленных данных (prepare), возвращающие аргументы URL и тело запроса.
+    """
+
+    def __init__(self, url_name, method, user, kwargs=None, data=None, query='', status=200):
+        self.url_name = url_name
+        self.method = method
+        self.user = user
+        self.kwargs = kwargs or (lambda objects: {})
+        self.data = data or (lambda objects: None)
+        self.query = query
+        self.status = status
+
+    @property
+    def name(self):
+        return f'{self.method} {self.url_name}{"?" + self.query if self.query else ""} [{self.user}]'
+
+
+def listing_kwargs(objects):
+    return {'pk': objects['listing'].pk}
+
+
+def listing_id_kwargs(objects):
+    return {'listing_id': objects['listing'].pk}
+
+
+def booking_kwargs(objects):
+    return {'listing_id': objects['listing'].pk, 'pk': objects['booking'].pk}
+
+
+def review_kwargs(objects):
+    return {'listing_id': objects['listing'].pk, 'pk': objects['review'].pk}
+
+
+def future_dates(days, length=3):
+    # Даты после всех сгенерированных бронирований
+    start = timezone.now().date() + timedelta(days=days)
+    return {'start_date': str(start), 'end_date': str(start + timedelta(days=length))}
+
+
+ENDPOINTS = [
+    # listings/urls.py
+    Endpoint('listings', 'GET', 'anonymous'),
+    Endpoint('listings', 'GET', 'tenant'),
+    Endpoint('listings', 'GET', 'landlord'),
+    Endpoint('listings', 'GET', 'anonymous', query='ordering=-rating_avg&type=apartment'),
+    Endpoint('listings', 'POST', 'landlord', status=201, data=lambda objects: {
+        'title': 'Benchmark listing', 'description': 'Created by bench_endpoints', 'location': 'Berlin, Germany',
+        'price': '900.00', 'rooms': 2, 'type': 'apartment'}),
+    Endpoint('listing_export', 'GET', 'landlord'),
+    Endpoint('booking_export', 'GET', 'landlord'),
+    Endpoint('listing_cache_stats', 'GET', 'admin'),
+    Endpoint('listing_detail', 'GET', 'tenant', kwargs=listing_kwargs),
+    Endpoint('listing_detail', 'PATCH', 'landlord', kwargs=listing_kwargs, data=lambda objects: {'price': '999.00'}),
+    Endpoint('listing_detail', 'DELETE', 'landlord', kwargs=listing_kwargs, status=204),
+    Endpoint('bookings', 'GET', 'tenant', kwargs=listing_id_kwargs),
+    Endpoint('bookings', 'POST', 'tenant', kwargs=listing_id_kwargs, status=201,
+             data=lambda objects: {'listing': objects['listing'].pk, **future_dates(1000)}),
+    Endpoint('booking_bulk_create', 'POST', 'landlord', kwargs=listing_id_kwargs, status=201,
+             data=lambda objects: [{**future_dates(1000 + 5 * i), 'user': objects['tenant'].pk, 'status': 'confirmed'}
+                                   for i in range(10)]),
+    Endpoint('booking_detail', 'GET', 'landlord', kwargs=booking_kwargs),
+    Endpoint('booking_detail', 'PATCH', 'landlord', kwargs=booking_kwargs, data=lambda objects: {'status': 'cancelled'}),
+    Endpoint('booking_detail', 'DELETE', 'landlord', kwargs=booking_kwargs, status=204),
+    Endpoint('review_list', 'GET', 'tenant', kwargs=listing_id_kwargs),
+    Endpoint('review_detail', 'GET', 'tenant', kwargs=review_kwargs),
+    Endpoint('review_detail', 'PATCH', 'tenant', kwargs=review_kwargs, data=lambda objects: {'rating': 3}),
+    Endpoint('review_detail', 'DELETE', 'tenant', kwargs=review_kwargs, status=204),
+    # users/urls.py
+    Endpoint('users', 'GET', 'admin'),
+    Endpoint('register', 'POST', 'anonymous', status=201, data=lambda objects: {
+        'username': 'benchmark', 'email': 'benchmark@example.com', 'role': 'tenant',
+        'password': 'Benchmark-Password-1', 're_password': 'Benchmark-Password-1'}),
+    Endpoint('login', 'POST', 'anonymous',
+             data=lambda objects: {'email': objects['tenant'].email, 'password': objects['password']}),
+    Endpoint('logout', 'POST', 'tenant'),
+    Endpoint('token_obtain_pair', 'POST', 'anonymous',
+             data=lambda objects: {'email': objects['tenant'].email, 'password': objects['password']}),
+    Endpoint('token_refresh', 'POST', 'anonymous', data=lambda objects: {'refresh': objects['refresh']}),
+    Endpoint('protected_data', 'GET', 'tenant'),
+]
+
+
+def seed(dataset):
+    """
+    Наполняет базу данными create_test_data (пароль пользователей - password123).
+    """
+    call_command('create_test_data', stdout=io.StringIO(), **dataset)
+
+
+def prepare(password='password123'):
+    """
+    Выбирает объекты для запросов: объявление с отзывами и бронированиями, его владельца,
+    автора отзыва (он же арендатор с бронированием) и создает администратора.
+    """
+    listing = Listing.objects.filter(review_count__gt=0).order_by('id').first()
+    review = listing.reviews.order_by('id').first()
+    admin = User.objects.filter(username='perf-admin').first() or User.objects.create_user(
+        username='perf-admin', email='perf-admin@example.com', password=None, role='landlord', is_staff=True)
+    objects = {
+        'listing': listing,
+        'booking': listing.bookings.order_by('id').first(),
+        'review': review,
+        'tenant': review.user,
+        'landlord': listing.owner,
+        'admin': admin,
+        'password': password,
+        'refresh': str(RefreshToken.for_user(review.user)),
+    }
+    objects['tokens'] = {role: str(AccessToken.for_user(objects[role])) for role in ('tenant', 'landlord', 'admin')}
+    return objects
+
+
+def reset_caches():
+    # Каждый запрос измеряется "холодным": без кэшей ответов, пользователей и проверенных токенов
+    for cache in caches.all():
+        cache.clear()
+    verified_tokens.clear()
+    access_token_refreshes.clear()
+
+
+def request(endpoint, objects):
+    """
+    Выполняет запрос и возвращает (ответ, тело, запросы к базе). Изменения в базе откатываются.
+    """
+    client = APIClient()
+    if endpoint.user != 'anonymous':
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {objects["tokens"][endpoint.user]}')
+    url = reverse(endpoint.url_name, kwargs=endpoint.kwargs(objects))
+    if endpoint.query:
+        url = f'{url}?{endpoint.query}'
+    data = endpoint.data(objects)
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, endpoint.method.lower())(url, data, format='json')
+            # Потоковый ответ читает базу при отдаче
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+        transaction.set_rollback(True)
+    statements = [query['sql'] for query in queries.captured_queries
+                  if not query['sql'].startswith(TRANSACTION_STATEMENTS)]
+    return response, body, statements
+
+
+def measure(endpoint, objects, iterations):
+    """
+    Задержки (мс), наибольшее количество запросов к базе и размер ответа (байт) эндпоинта.
+    """
+    timings, queries, size = [], 0, 0
+    for _ in range(iterations):
+        reset_caches()
+        started = time.perf_counter()
+        response, body, statements = request(endpoint, objects)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != endpoint.status:
+            raise RuntimeError(f'{endpoint.name}: HTTP {response.status_code}, expected {endpoint.status}: '
+                                 f'{body[:200]!r}')
+        queries, size = max(queries, len(statements)), len(body)
+    return {
+        'queries': queries,
+        'bytes': size,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+    }
+
+
+def run(objects, iterations, endpoints=ENDPOINTS):
+    """
+    Измеряет эндпоинты по очереди, возвращает пары (эндпоинт, результат measure).
+    """
+    for endpoint in endpoints:
+        # Прогрев: импорты, построение сериализаторов, загрузка черного списка токенов
+        measure(endpoint, objects, 1)
+        yield endpoint, measure(endpoint, objects, iterations)
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not Path(path).exists():
+        return {'dataset': DEFAULT_DATASET, 'endpoints': {}}
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_baseline(baseline, results, path=BASELINE_PATH):
+    """
+    Записывает результаты в базовый файл. Бюджет запросов только уменьшается вслед за измеренным
+    количеством (увеличить его можно только правкой файла); новым эндпоинтам бюджет - измеренное количество.
+    """
+    endpoints = {}
+    for name, result in results.items():
+        budget = min(baseline['endpoints'].get(name, {}).get('query_budget', result['queries']), result['queries'])
+        endpoints[name] = {'query_budget': budget, **result}
+    baseline = {**baseline, 'endpoints': endpoints}
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2, ensure_ascii=False)
+        file.write('\n')
+    return baseline
+
+
+def compare(baseline, results, check_latency=True):
+    """
+    Сравнивает результаты с базовым файлом. Возвращает список нарушений:
+    превышение бюджета запросов, рост размера ответа или медианы задержки больше порога,
+    эндпоинт без записи в базовом файле.
+    """
+    latency_threshold = baseline.get('latency_threshold', DEFAULT_LATENCY_THRESHOLD)
+    payload_threshold = baseline.get('payload_threshold', DEFAULT_PAYLOAD_THRESHOLD)
+    failures = []
+    for name, result in results.items():
+        expected = baseline['endpoints'].get(name)
+        if expected is None:
+            failures.append(f'{name}: no baseline (run bench_endpoints --update-baseline)')
+            continue
+        if result['queries'] > expected['query_budget']:
+            failures.append(f'{name}: {result["queries"]} queries, budget {expected["query_budget"]}')
+        if result['bytes'] > expected['bytes'] * (1 + payload_threshold):
+            failures.append(f'{name}: payload {result["bytes"]} bytes, baseline {expected["bytes"]}')
+        if check_latency and result['p50_ms'] > expected['p50_ms'] * (1 + latency_threshold) + LATENCY_SLACK_MS:
+            failures.append(f'{name}: median {result["p50_ms"]:.2f} ms, baseline {expected["p50_ms"]:.2f} ms')
+    return failures
@@ -0,0 +1,101 @@
+import statistics
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication as SimpleJWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from users.authentication import JWTAuthentication
+from users.middleware import JWTAuthenticationMiddleware
+from users.models import User
+from users.tokens import verified_tokens
+from ._bench import benchmark_database, format_timings, measure
+
+
+class LegacyJWTAuthenticationMiddleware(JWTAuthenticationMiddleware):
+    """
+    Прежний порядок работы middleware для сравнения: токен из cookie декодируется в middleware,
+    еще раз в JWTAuthentication, а выпущенный при обновлении токен - еще раз ради exp.
+    """
+
+    def process_request(self, request):
+        access_token = request.COOKIES.get('access_token')
+        refresh_token = request.COOKIES.get('refresh_token')
+        if access_token:
+            try:
+                token = AccessToken(access_token)
+                if datetime.utcfromtimestamp(token['exp']) < datetime.utcnow():
+                    raise TokenError('Token expired')
+                request.META['HTTP_AUTHORIZATION'] = f'Bearer {access_token}'
+            except TokenError:
+                refresh = RefreshToken(refresh_token)
+                request._new_access_token = str(refresh.access_token)
+                request.META['HTTP_AUTHORIZATION'] = f'Bearer {request._new_access_token}'
+
+    def process_response(self, request, response):
+        new_access_token = getattr(request, '_new_access_token', None)
+        if new_access_token:
+            access_expiry = AccessToken(new_access_token)['exp']
+            response.set_cookie(key='access_token', value=new_access_token, httponly=True, samesite='Lax',
+                                expires=datetime.utcfromtimestamp(access_expiry))
+        return response
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает накладные расходы JWT-аутентификации на запрос (middleware + аутентификация DRF): '
+            'прежнее многократное декодирование токена и однократную проверку с кэшем проверенных токенов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2_000, help='Количество запросов в серии')
+        parser.add_argument('--repeat', type=int, default=5, help='Количество серий')
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user = User.objects.create_user(username='bench', email='bench@example.com', password=None,
+                                            role='tenant')
+            access = str(AccessToken.for_user(user))
+            expired = AccessToken.for_user(user)
+            expired.set_exp(lifetime=-timedelta(minutes=1))
+            refresh = str(RefreshToken.for_user(user))
+            cases = [
+                ('access token cookie', {'access_token': access}, {}),
+                ('expired cookie + refresh', {'access_token': str(expired), 'refresh_token': refresh}, {}),
+                ('Authorization header', {}, {'HTTP_AUTHORIZATION': f'Bearer {access}'}),
+            ]
+            pipelines = [
+                ('before (decode per step)', LegacyJWTAuthenticationMiddleware, SimpleJWTAuthentication),
+                ('after (single decode + cache)', JWTAuthenticationMiddleware, JWTAuthentication),
+            ]
+            for label, cookies, headers in cases:
+                self.stdout.write(f'{label} ({options["requests"]} requests)')
+                for pipeline, middleware_class, authentication_class in pipelines:
+                    verified_tokens.clear()
+                    run = self.pipeline(middleware_class, authentication_class, cookies, headers)
+
+                    def series():
+                        for _ in range(options['requests']):
+                            run()
+                    timings = measure(series, options['repeat'])
+                    per_request = statistics.median(timings) * 1000 / options['requests']
+                    self.stdout.write('  ' + format_timings(pipeline, timings) + f'   ({per_request:.1f} us/request)')
+
+    @staticmethod
+    def pipeline(middleware_class, authentication_class, cookies, headers):
+        factory = APIRequestFactory()
+        authentication = authentication_class()
+
+        def view(request):
+            # Аутентификация DRF, как в любом view
+            return HttpResponse(str(Request(request, authenticators=[authentication]).user.pk))
+
+        middleware = middleware_class(view)
+
+        def run():
+            request = factory.get('/listings/', SERVER_NAME='localhost', **headers)
+            request.COOKIES.update(cookies)
+            return middleware(request)
+        return run
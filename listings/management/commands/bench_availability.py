@@ -0,0 +1,87 @@
+import datetime
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from listings.models import Booking, Listing
+from users.models import User
+from ._bench import benchmark_database, format_timings, measure
+
+# Начало периода, в котором генерируются бронирования
+START = datetime.date(2024, 1, 1)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск свободных объявлений: проверка пересечений по каждому объявлению '
+            'и один запрос NOT EXISTS (с индексом и без него).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=10_000, help='Количество объявлений')
+        parser.add_argument('--bookings', type=int, default=1_000_000, help='Количество бронирований')
+        parser.add_argument('--repeat', type=int, default=10, help='Количество повторов каждого запроса')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.populate(options['listings'], options['bookings'], random.Random(options['seed']))
+            date_from, date_to = START + datetime.timedelta(days=200), START + datetime.timedelta(days=207)
+            repeat = options['repeat']
+
+            free = Listing.objects.available_between(date_from, date_to)
+            self.stdout.write(f'{free.count()} listings free between {date_from} and {date_to}')
+
+            timings = measure(lambda: self.per_listing(date_from, date_to), max(1, repeat // 5))
+            self.stdout.write(format_timings('overlap query per listing', timings))
+            timings = measure(lambda: self.anti_join(date_from, date_to), repeat)
+            self.stdout.write(format_timings('NOT EXISTS (indexed)', timings))
+
+            with connection.cursor() as cursor:
+                cursor.execute('DROP INDEX booking_listing_status_dates')
+            timings = measure(lambda: self.anti_join(date_from, date_to), max(1, repeat // 5))
+            self.stdout.write(format_timings('NOT EXISTS (no composite index)', timings))
+
+    def populate(self, listing_count, booking_count, rng):
+        owner = User.objects.create_user(username='landlord', email='landlord@example.com', password=None,
+                                         role='landlord')
+        tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None)
+        Listing.objects.bulk_create(
+            [Listing(owner=owner, title=f'Listing {i}', description='', location='Berlin', price=100,
+                     rooms=2, type='apartment') for i in range(listing_count)],
+            batch_size=5000,
+        )
+        listing_ids = list(Listing.objects.values_list('id', flat=True))
+        per_listing = max(1, booking_count // listing_count)
+
+        # Непересекающиеся бронирования подряд с небольшими промежутками
+        batch, created = [], 0
+        for listing_id in listing_ids:
+            day = rng.randint(0, 20)
+            for _ in range(per_listing):
+                length = rng.randint(1, 6)
+                start = START + datetime.timedelta(days=day)
+                batch.append(Booking(listing_id=listing_id, user=tenant, start_date=start,
+                                     end_date=start + datetime.timedelta(days=length),
+                                     status=rng.choice(['confirmed', 'confirmed', 'pending', 'canceled'])))
+                day += length + rng.randint(0, 10)
+            if len(batch) >= 20_000:
+                Booking.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        Booking.objects.bulk_create(batch)
+        created += len(batch)
+        self.stdout.write(f'{listing_count} listings and {created} bookings created')
+
+    def per_listing(self, date_from, date_to):
+        # Как если бы проверка из BookingSerializer.validate выполнялась для каждого объявления
+        return [
+            listing for listing in Listing.objects.all()
+            if not Booking.objects.filter(listing=listing, status='confirmed', start_date__lt=date_to,
+                                          end_date__gt=date_from).exists()
+        ][:10]
+
+    def anti_join(self, date_from, date_to):
+        # Первая страница и COUNT, как в ListingView
+        queryset = Listing.objects.available_between(date_from, date_to).order_by('id')
+        queryset.count()
+        return list(queryset[:10])
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from . import _endpoints as endpoints
+from ._bench import benchmark_database
+
+
+class Command(BaseCommand):
+    help = ('Бенчмарк всех маршрутов listings/urls.py и users/urls.py на наполненной create_test_data базе: '
+            'задержка (p50/p95/p99), количество SQL-запросов и размер ответа. Результаты сравниваются '
+            'с tests/perf_baseline.json; превышение бюджета запросов или рост сверх порога - ошибка.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Запросов к каждому эндпоинту')
+        parser.add_argument('--baseline', default=str(endpoints.BASELINE_PATH), help='Базовый файл')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Записать результаты в базовый файл (бюджеты запросов не увеличиваются)')
+        parser.add_argument('--no-latency', action='store_true',
+                            help='Не сравнивать задержки (например, на машине, отличной от той, где записан базовый файл)')
+
+    def handle(self, *args, **options):
+        baseline = endpoints.load_baseline(options['baseline'])
+        # Окружение тестового клиента (ALLOWED_HOSTS с testserver), как при запуске тестов
+        setup_test_environment()
+        try:
+            results = self.benchmark(baseline, options['iterations'])
+        finally:
+            teardown_test_environment()
+
+        if options['update_baseline']:
+            endpoints.save_baseline(baseline, results, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {options["baseline"]}'))
+            return
+        failures = endpoints.compare(baseline, results, check_latency=not options['no_latency'])
+        if failures:
+            raise CommandError('Performance regressions:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All endpoints within budgets'))
+
+    def benchmark(self, baseline, iterations):
+        results = {}
+        with benchmark_database():
+            endpoints.seed(baseline['dataset'])
+            objects = endpoints.prepare()
+            for endpoint, result in endpoints.run(objects, iterations):
+                results[endpoint.name] = result
+                budget = baseline['endpoints'].get(endpoint.name, {}).get('query_budget', '-')
+                self.stdout.write(f'{endpoint.name:<62} p50 {result["p50_ms"]:8.2f} ms   '
+                                  f'p95 {result["p95_ms"]:8.2f} ms   p99 {result["p99_ms"]:8.2f} ms   '
+                                  f'{result["queries"]:3} queries (budget {budget})   {result["bytes"]:8} bytes')
+        return results
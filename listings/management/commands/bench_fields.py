@@ -0,0 +1,78 @@
+import datetime
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from listings.models import Booking, Listing, Review
+from listings.views import ListingView
+from users.models import User
+from ._bench import benchmark_database, format_timings, measure
+
+# Варианты запроса списка объявлений: полное представление и сокращенные
+VARIANTS = [
+    ('full representation', {}),
+    ('omit=reviews,bookings', {'omit': 'reviews,bookings'}),
+    ('fields=title,price,location,type', {'fields': 'title,price,location,type'}),
+]
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает размер ответа, число запросов и время GET /listings/ с ?fields= / ?omit= и без них.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=10_000, help='Количество объявлений')
+        parser.add_argument('--related', type=int, default=10,
+                            help='Количество отзывов и бронирований на объявление')
+        parser.add_argument('--repeat', type=int, default=50, help='Количество повторов каждого запроса')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            owner = self.populate(options['listings'], options['related'], random.Random(options['seed']))
+            view = ListingView.as_view()
+            factory = APIRequestFactory()
+
+            for label, params in VARIANTS:
+                params = {**params, 'ordering': 'price'}
+
+                def call():
+                    request = factory.get('/listings/', params, SERVER_NAME='localhost')
+                    # Арендодатель видит все бронирования; ответы аутентифицированным не кэшируются
+                    force_authenticate(request, user=owner)
+                    response = view(request)
+                    response.render()
+                    return response
+
+                with CaptureQueriesContext(connection) as context:
+                    size = len(call().content)
+                timings = measure(call, options['repeat'])
+                self.stdout.write(f'{label}: {size} bytes, {len(context.captured_queries)} queries')
+                self.stdout.write('  ' + format_timings('GET /listings/', timings))
+
+    def populate(self, listing_count, related, rng):
+        owner = User.objects.create_user(username='landlord', email='landlord@example.com', password=None,
+                                         role='landlord')
+        tenants = User.objects.bulk_create([
+            User(username=f'tenant{i}', email=f'tenant{i}@example.com', role='tenant') for i in range(related)
+        ])
+        Listing.objects.bulk_create([
+            Listing(owner=owner, title=f'Listing {i}', description='Spacious apartment near the park. ' * 10,
+                    location='Berlin', price=rng.randint(300, 3000), rooms=rng.randint(1, 5), type='apartment')
+            for i in range(listing_count)
+        ], batch_size=5000)
+        start = datetime.date(2024, 1, 1)
+        reviews, bookings = [], []
+        for listing_id in Listing.objects.values_list('id', flat=True):
+            for index, tenant in enumerate(tenants):
+                day = start + datetime.timedelta(days=index * 10)
+                bookings.append(Booking(listing_id=listing_id, user=tenant, start_date=day,
+                                        end_date=day + datetime.timedelta(days=5), status='confirmed'))
+                reviews.append(Review(listing_id=listing_id, user=tenant, rating=rng.randint(1, 5),
+                                      comment='Nice place, would stay again.'))
+        Booking.objects.bulk_create(bookings, batch_size=5000)
+        Review.objects.bulk_create(reviews, batch_size=5000)
+        self.stdout.write(f'{listing_count} listings, {len(reviews)} reviews, {len(bookings)} bookings created')
+        return owner
@@ -0,0 +1,88 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from listings.geo import bounding_box, distance_expression
+from listings.models import Listing
+from users.models import User
+from ._bench import benchmark_database, format_timings, measure
+
+# Города, вокруг которых генерируются объявления: (название, широта, долгота)
+CITIES = [
+    ('Berlin', 52.52, 13.405), ('Hamburg', 53.551, 9.994), ('Munich', 48.135, 11.582),
+    ('Paris', 48.857, 2.352), ('Madrid', 40.417, -3.704), ('Rome', 41.903, 12.496),
+    ('Warsaw', 52.230, 21.012), ('Vienna', 48.208, 16.374), ('Prague', 50.076, 14.438),
+    ('Amsterdam', 52.370, 4.895),
+]
+
+# Центр поиска (Берлин, Митте) и радиусы в километрах
+CENTER = (52.52, 13.405)
+RADII = [1, 5, 25]
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск объявлений в радиусе и в прямоугольнике через индекс R*Tree '
+            'и фильтром по колонкам координат (полный просмотр таблицы).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=1_000_000, help='Количество объявлений')
+        parser.add_argument('--repeat', type=int, default=20, help='Количество повторов каждого запроса')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.populate(options['listings'], random.Random(options['seed']))
+            repeat = options['repeat']
+            for radius in RADII:
+                matches = Listing.objects.near(*CENTER, radius).count()
+                self.stdout.write(f'radius {radius} km around Berlin-Mitte ({matches} matches)')
+                timings = measure(lambda: self.first_page(Listing.objects.near(*CENTER, radius)), repeat)
+                self.stdout.write('  ' + format_timings('R*Tree + distance', timings))
+                timings = measure(lambda: self.first_page(self.near_without_index(radius)), max(1, repeat // 5))
+                self.stdout.write('  ' + format_timings('columns + distance (no index)', timings))
+
+            box = bounding_box(*CENTER, 3)
+            matches = Listing.objects.within_bbox(*box).count()
+            self.stdout.write(f'map viewport 6x6 km ({matches} matches)')
+            timings = measure(lambda: self.first_page(Listing.objects.within_bbox(*box), 'id'), repeat)
+            self.stdout.write('  ' + format_timings('R*Tree', timings))
+            timings = measure(lambda: self.first_page(self.bbox_without_index(box), 'id'), max(1, repeat // 5))
+            self.stdout.write('  ' + format_timings('columns (no index)', timings))
+
+            # Сортировка всех объявлений по расстоянию без радиуса - для сравнения
+            timings = measure(lambda: list(Listing.objects.near(*CENTER).order_by('distance', 'id')[:10]),
+                              max(1, repeat // 5))
+            self.stdout.write(format_timings('nearest 10 without radius', timings))
+
+    def populate(self, count, rng):
+        owner = User.objects.create_user(username='bench', email='bench@example.com', password=None,
+                                         role='landlord')
+        batch = []
+        for i in range(count):
+            city, latitude, longitude = rng.choice(CITIES)
+            batch.append(Listing(
+                owner=owner, title=f'Listing {i}', description='', location=city,
+                price=rng.randint(300, 3000), rooms=rng.randint(1, 5), type='apartment',
+                # Разброс около 10 км вокруг центра города
+                latitude=rng.gauss(latitude, 0.09), longitude=rng.gauss(longitude, 0.14),
+            ))
+            if len(batch) == 10_000:
+                Listing.objects.bulk_create(batch)
+                batch = []
+        Listing.objects.bulk_create(batch)
+        self.stdout.write(f'{count} listings created')
+
+    def first_page(self, queryset, ordering='distance'):
+        # Первая страница и COUNT, как в ListingView
+        queryset.count()
+        return list(queryset.order_by(ordering, 'id')[:10])
+
+    def bbox_without_index(self, box):
+        min_lat, min_lon, max_lat, max_lon = box
+        return Listing.objects.filter(latitude__gte=min_lat, latitude__lte=max_lat,
+                                      longitude__gte=min_lon, longitude__lte=max_lon)
+
+    def near_without_index(self, radius):
+        return (self.bbox_without_index(bounding_box(*CENTER, radius))
+                .annotate(distance=distance_expression(*CENTER))
+                .filter(distance__lte=radius))
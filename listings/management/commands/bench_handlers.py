@@ -0,0 +1,165 @@
+import asyncio
+import importlib
+import io
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import clear_url_caches
+from rest_framework_simplejwt.tokens import AccessToken
+
+from listings.models import Listing
+from ._bench import benchmark_database, percentile
+from .bench_serializers import Command as SerializersCommand
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность (запросов в секунду) и p99 обработчиков Django при чтении '
+            'объявлений и отзывов: WSGIHandler с синхронными view, ASGIHandler с синхронными view и ASGIHandler '
+            'с асинхронными view (ASYNC_READ_VIEWS). Запросы подаются прямо в обработчики в этом процессе: '
+            'сеть, разбор HTTP и воркеры серверов (uvicorn, gunicorn) не измеряются, поэтому результат - '
+            'не сравнение ASGI- и WSGI-серверов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=2_000, help='Количество объявлений')
+        parser.add_argument('--requests', type=int, default=500, help='Количество запросов на сценарий')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16],
+                            help='Количество одновременных клиентов (для WSGI - потоков сервера)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            owner = SerializersCommand(stdout=self.stdout).populate(options['listings'],
+                                                                     random.Random(options['seed']))
+            listing_id = Listing.objects.order_by('id').values_list('id', flat=True).first()
+            headers = {'authorization': f'Bearer {AccessToken.for_user(owner)}'}
+            endpoints = [
+                ('GET /listings/', '/listings/', ''),
+                ('GET /listings/<id>/', f'/listings/{listing_id}/', ''),
+                ('GET /listings/<id>/reviews/', f'/listings/{listing_id}/reviews/', ''),
+            ]
+            scenarios = [
+                ('WSGIHandler, sync views', WSGIHandler, False),
+                ('ASGIHandler, sync views', ASGIHandler, False),
+                ('ASGIHandler, async views', ASGIHandler, True),
+            ]
+            for label, path, query_string in endpoints:
+                self.stdout.write(label)
+                for concurrency in options['concurrency']:
+                    for scenario, handler_class, async_views in scenarios:
+                        with read_views(async_views):
+                            handler = handler_class()
+                            run = run_wsgi if handler_class is WSGIHandler else run_asgi
+                            # Прогрев: загрузка модулей, кэши сериализаторов
+                            run(handler, path, query_string, headers, concurrency, concurrency)
+                            elapsed, timings = run(handler, path, query_string, headers, options['requests'],
+                                                   concurrency)
+                        self.stdout.write(f'  {scenario:<26} x{concurrency:<3} '
+                                          f'{len(timings) / elapsed:8.1f} req/s   '
+                                          f'p50 {percentile(timings, 50):7.2f} ms   '
+                                          f'p99 {percentile(timings, 99):7.2f} ms')
+
+
+@contextmanager
+def read_views(async_views):
+    """
+    Включает или выключает асинхронные view чтения: маршруты выбираются при импорте listings.urls.
+    """
+    def reload_urls():
+        clear_url_caches()
+        importlib.reload(importlib.import_module('listings.urls'))
+        importlib.reload(importlib.import_module('rental_project.urls'))
+
+    try:
+        with override_settings(ASYNC_READ_VIEWS=async_views):
+            reload_urls()
+            yield
+    finally:
+        reload_urls()
+
+
+def check_status(status, path):
+    if status != 200:
+        raise RuntimeError(f'{path}: HTTP {status}')
+
+
+def run_wsgi(handler, path, query_string, headers, requests, concurrency):
+    """
+    Вызовы WSGIHandler из пула потоков (модель gunicorn --threads): каждый запрос - в своем потоке пула.
+    """
+    def request():
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query_string, 'SCRIPT_NAME': '',
+            'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            **{f'HTTP_{name.upper()}': value for name, value in headers.items()},
+        }
+        started = time.perf_counter()
+        statuses = []
+        response = handler(environ, lambda status, response_headers, exc_info=None: statuses.append(status))
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+        check_status(int(statuses[0].split()[0]), path)
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings = list(executor.map(lambda _: request(), range(requests)))
+    return time.perf_counter() - started, timings
+
+
+def run_asgi(handler, path, query_string, headers, requests, concurrency):
+    """
+    Вызовы ASGIHandler в одном event loop (модель ASGI-сервера): одновременно не больше concurrency.
+    """
+    async def request():
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+            'query_string': query_string.encode(), 'server': ('localhost', 80), 'client': ('127.0.0.1', 50000),
+            'headers': [(b'host', b'localhost'), *((name.encode(), value.encode()) for name, value in headers.items())],
+        }
+        body_sent = asyncio.Event()
+        messages = []
+
+        async def receive():
+            if not messages:
+                messages.append(None)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # Клиент не отключается: ждем, пока обработчик не закончит ответ
+            await body_sent.wait()
+            return {'type': 'http.disconnect'}
+
+        status = []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif not message.get('more_body'):
+                body_sent.set()
+
+        started = time.perf_counter()
+        await handler(scope, receive, send)
+        check_status(status[0], path)
+        return (time.perf_counter() - started) * 1000
+
+    async def clients():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited():
+            async with semaphore:
+                return await request()
+        return await asyncio.gather(*(limited() for _ in range(requests)))
+
+    started = time.perf_counter()
+    timings = asyncio.run(clients())
+    return time.perf_counter() - started, timings
@@ -0,0 +1,68 @@
+import io
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+from ._bench import benchmark_database, format_timings, measure
+
+INSTRUMENTATION = 'rental_project.instrumentation.InstrumentationMiddleware'
+
+
+@contextmanager
+def silent_log():
+    # Строки лога формируются, но не выводятся: измеряется стоимость инструментирования, а не вывода
+    logger = logging.getLogger('rental_project.instrumentation')
+    handlers, logger.handlers = logger.handlers, [logging.NullHandler()]
+    try:
+        yield
+    finally:
+        logger.handlers = handlers
+
+
+class Command(BaseCommand):
+    help = ('Измеряет накладные расходы InstrumentationMiddleware на GET /listings/: без middleware '
+            'и с разной долей измеряемых запросов (INSTRUMENTATION_SAMPLE_RATE).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=2_000, help='Количество объявлений')
+        parser.add_argument('--requests', type=int, default=1_000, help='Количество запросов на сценарий')
+
+    def handle(self, *args, **options):
+        without = [name for name in settings.MIDDLEWARE if name != INSTRUMENTATION]
+        scenarios = [
+            ('without middleware', {'MIDDLEWARE': without}),
+            ('sample rate 0', {'INSTRUMENTATION_SAMPLE_RATE': 0}),
+            ('sample rate 0.01', {'INSTRUMENTATION_SAMPLE_RATE': 0.01}),
+            ('sample rate 1', {'INSTRUMENTATION_SAMPLE_RATE': 1}),
+        ]
+        setup_test_environment()
+        try:
+            with benchmark_database(), silent_log():
+                call_command('create_test_data', users=50, listings=options['listings'], seed=1,
+                             stdout=io.StringIO())
+                user = User.objects.filter(role='tenant').first()
+                headers = {'authorization': f'Bearer {AccessToken.for_user(user)}'}
+                self.stdout.write(f'GET /listings/, {options["requests"]} requests per scenario')
+                clients = []
+                for label, overrides in scenarios:
+                    with override_settings(**overrides):
+                        # Обработчик клиента загружает middleware из текущих настроек при первом запросе
+                        client = Client(headers=headers)
+                        # Прогрев
+                        measure(lambda: client.get('/listings/'), 20)
+                    clients.append((label, client, []))
+                # Сценарии чередуются по запросам, чтобы дрейф (прогрев, кэш страниц SQLite) не влиял на сравнение
+                for _ in range(options['requests']):
+                    for label, client, timings in clients:
+                        timings.extend(measure(lambda: client.get('/listings/'), 1))
+                for label, client, timings in clients:
+                    self.stdout.write(format_timings(label, timings))
+        finally:
+            teardown_test_environment()
@@ -0,0 +1,85 @@
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt import tokens as simplejwt_tokens
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from users.blacklist import blacklist_index
+from users.models import User
+from users.serializers import TokenRefreshSerializer
+from users.tokens import RefreshToken
+from ._bench import benchmark_database, format_timings, measure
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность обновления JWT: проверку черного списка запросом к базе '
+            'и поиск пользователя при записи OutstandingToken (simplejwt) с фильтром в памяти и записью без поиска.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--blacklisted', type=int, default=50_000, help='Записей в черном списке')
+        parser.add_argument('--refreshes', type=int, default=500, help='Обновлений в серии')
+        parser.add_argument('--repeat', type=int, default=5, help='Количество серий')
+
+    # Бенчмарк идет в одном процессе: фильтр включается и при LocMemCache
+    @override_settings(TOKEN_BLACKLIST_BLOOM_FILTER=True)
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user = User.objects.create_user(username='bench', email='bench@example.com', password=None,
+                                            role='tenant')
+            self.fill_blacklist(user, options['blacklisted'])
+            started = time.perf_counter()
+            blacklist_index.warm()
+            self.stdout.write(f'warm: {options["blacklisted"]} blacklisted tokens in '
+                              f'{(time.perf_counter() - started) * 1000:.1f} ms')
+
+            cases = [
+                ('middleware refresh (access token from refresh)', self.access_series),
+                ('rotation (TokenRefreshView serializer)', self.rotation_series),
+            ]
+            implementations = [
+                ('before (database lookups)', simplejwt_tokens.RefreshToken, jwt_serializers.TokenRefreshSerializer),
+                ('after (bloom filter)', RefreshToken, TokenRefreshSerializer),
+            ]
+            for label, make_series in cases:
+                self.stdout.write(f'{label} ({options["refreshes"]} refreshes)')
+                for name, token_class, serializer_class in implementations:
+                    series = make_series(user, token_class, serializer_class, options['refreshes'])
+                    timings = measure(series, options['repeat'])
+                    throughput = options['refreshes'] / statistics.median(timings) * 1000
+                    self.stdout.write('  ' + format_timings(name, timings) + f'   ({throughput:.0f} refreshes/s)')
+
+    @staticmethod
+    def fill_blacklist(user, count):
+        expires_at = timezone.now() + timedelta(days=1)
+        outstanding = OutstandingToken.objects.bulk_create(
+            [OutstandingToken(user=user, jti=uuid.uuid4().hex, token='', expires_at=expires_at) for _ in range(count)],
+            batch_size=1_000)
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token) for token in outstanding],
+                                             batch_size=1_000)
+
+    @staticmethod
+    def access_series(user, token_class, serializer_class, refreshes):
+        raw = str(token_class.for_user(user))
+
+        def series():
+            for _ in range(refreshes):
+                str(token_class(raw).access_token)
+        return series
+
+    @staticmethod
+    def rotation_series(user, token_class, serializer_class, refreshes):
+        # Цепочка ротаций, как у клиента: каждый следующий запрос - с новым refresh-токеном
+        current = [str(token_class.for_user(user))]
+
+        def series():
+            for _ in range(refreshes):
+                serializer = serializer_class(data={'refresh': current[0]})
+                serializer.is_valid(raise_exception=True)
+                current[0] = serializer.validated_data['refresh']
+        return series
@@ -0,0 +1,60 @@
+import io
+import json
+import random
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from listings.models import Listing
+from listings.serializers import ListingSerializer
+from rental_project.parsers import MessagePackParser, ORJSONParser
+from rental_project.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+from ._bench import benchmark_database, format_timings, measure
+from .bench_serializers import Command as SerializersCommand
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает кодирование и разбор ответа ListingSerializer стандартным JSONRenderer/JSONParser DRF, '
+            'orjson и MessagePack (если установлен msgpack).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100, 1_000, 10_000],
+                            help='Количество объявлений в ответе')
+        parser.add_argument('--repeat', type=int, default=5, help='Количество повторов')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            # Те же данные, что и в bench_serializers: объявления с бронированиями и отзывами
+            owner = SerializersCommand(stdout=self.stdout).populate(max(options['rows']),
+                                                                     random.Random(options['seed']))
+            request = APIRequestFactory().get('/listings/', SERVER_NAME='localhost')
+            force_authenticate(request, user=owner)
+            request = Request(request)
+            request.user = owner
+
+            cases = [('DRF JSONRenderer', JSONRenderer(), JSONParser()),
+                     ('orjson', ORJSONRenderer(), ORJSONParser())]
+            if msgpack is not None:
+                cases.append(('MessagePack', MessagePackRenderer(), MessagePackParser()))
+            else:
+                self.stdout.write('msgpack не установлен, MessagePack пропущен')
+
+            for rows in options['rows']:
+                listings = list(Listing.objects.with_related(owner).order_by('id')[:rows])
+                data = ListingSerializer(listings, many=True, context={'request': request}).data
+                reference = json.loads(JSONRenderer().render(data))
+                self.stdout.write(f'{rows} listings')
+                for label, renderer, parser in cases:
+                    content = renderer.render(data)
+                    parsed = parser.parse(io.BytesIO(content))
+                    identical = 'identical' if parsed == reference else 'DIFFERENT'
+                    self.stdout.write(f'  {label} ({len(content)} bytes, decoded output {identical})')
+                    self.stdout.write('    ' + format_timings('render', measure(lambda: renderer.render(data),
+                                                                                  options['repeat'])))
+                    self.stdout.write('    ' + format_timings('parse', measure(
+                        lambda: parser.parse(io.BytesIO(content)), options['repeat'])))
+
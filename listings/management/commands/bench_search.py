@@ -0,0 +1,70 @@
+import random
+
+from django.core.management.base import BaseCommand
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from listings.filters import FullTextSearchFilter
+from listings.models import Listing
+from listings.views import ListingView
+from users.models import User
+from ._bench import benchmark_database, format_timings, measure
+
+# Частые слова для генерации заголовков и описаний
+WORDS = ('apartment house studio balcony garden river park center quiet sunny spacious cozy modern '
+         'renovated loft terrace view station metro kitchen bedroom parking family bright old town').split()
+
+# Количество редких слов: частоты слов в словаре убывают по закону Ципфа
+RARE_WORDS = 5000
+
+# Поисковые запросы для сравнения: частое слово, пара слов, префикс, редкое слово, отсутствующее слово
+QUERIES = ['balcony', 'river view', 'reno', 'w1a5', 'nonexistentword']
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает поиск по объявлениям через LIKE (SearchFilter) и через индекс FTS5.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=100_000, help='Количество объявлений')
+        parser.add_argument('--repeat', type=int, default=20, help='Количество повторов каждого запроса')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.populate(options['listings'], random.Random(options['seed']))
+            for query in QUERIES:
+                matches = self.run_search(FullTextSearchFilter(), query)
+                self.stdout.write(f'search={query!r} ({matches} matches)')
+                for label, backend in (('LIKE (SearchFilter)', filters.SearchFilter()),
+                                       ('FTS5 (FullTextSearchFilter)', FullTextSearchFilter())):
+                    timings = measure(lambda: self.run_search(backend, query), options['repeat'])
+                    self.stdout.write('  ' + format_timings(label, timings))
+
+    def populate(self, count, rng):
+        vocabulary = WORDS + [f'w{index:x}' for index in range(RARE_WORDS)]
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        owner = User.objects.create_user(username='bench', email='bench@example.com', password=None,
+                                         role='landlord')
+        batch = []
+        for i in range(count):
+            batch.append(Listing(
+                owner=owner,
+                title=' '.join(rng.choices(vocabulary, weights, k=3)).capitalize(),
+                description=' '.join(rng.choices(vocabulary, weights, k=30)),
+                location='Berlin', price=rng.randint(300, 3000), rooms=rng.randint(1, 5),
+                type=rng.choice(['apartment', 'house', 'studio']),
+            ))
+            if len(batch) == 5000:
+                Listing.objects.bulk_create(batch)
+                batch = []
+        Listing.objects.bulk_create(batch)
+        self.stdout.write(f'{count} listings created')
+
+    def run_search(self, backend, query):
+        # Первая страница выдачи и COUNT - то, что выполняет ListingView
+        request = Request(APIRequestFactory().get('/listings/', {'search': query}))
+        view = ListingView(request=request, format_kwarg=None)
+        queryset = backend.filter_queryset(request, Listing.objects.all(), view)
+        list(queryset[:10])
+        return queryset.count()
@@ -0,0 +1,86 @@
+import datetime
+import random
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from listings.models import Booking, Listing, Review
+from listings.representation import FastRepresentationMixin
+from listings.serializers import BookingSerializer, ListingSerializer, ReviewSerializer
+from users.models import User
+from ._bench import benchmark_database, format_timings, measure
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает стандартный to_representation DRF и быстрый путь (FastRepresentationMixin) '
+            'для ListingSerializer, BookingSerializer и ReviewSerializer.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                            help='Количество сериализуемых объектов')
+        parser.add_argument('--repeat', type=int, default=5, help='Количество повторов')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            owner = self.populate(max(options['rows']), random.Random(options['seed']))
+            request = APIRequestFactory().get('/listings/')
+            force_authenticate(request, user=owner)
+            request = Request(request)
+            request.user = owner
+
+            for rows in options['rows']:
+                self.stdout.write(f'{rows} rows')
+                cases = [
+                    ('ListingSerializer', ListingSerializer,
+                     list(Listing.objects.with_related(owner).order_by('id')[:rows])),
+                    ('BookingSerializer', BookingSerializer, list(Booking.objects.order_by('id')[:rows])),
+                    ('ReviewSerializer', ReviewSerializer, list(Review.objects.order_by('id')[:rows])),
+                ]
+                for label, serializer_class, instances in cases:
+                    def serialize():
+                        data = serializer_class(instances, many=True, context={'request': request}).data
+                        return JSONRenderer().render(data)
+
+                    fast_output = serialize()
+                    fast = measure(serialize, options['repeat'])
+                    original = FastRepresentationMixin._get_fast_accessors
+                    FastRepresentationMixin._get_fast_accessors = lambda self: None
+                    try:
+                        standard_output = serialize()
+                        standard = measure(serialize, options['repeat'])
+                    finally:
+                        FastRepresentationMixin._get_fast_accessors = original
+                    identical = 'identical' if fast_output == standard_output else 'DIFFERENT'
+                    self.stdout.write(f'  {label} ({len(fast_output)} bytes, output {identical})')
+                    self.stdout.write('    ' + format_timings('standard DRF', standard))
+                    self.stdout.write('    ' + format_timings('fast path', fast))
+
+    def populate(self, count, rng):
+        owner = User.objects.create_user(username='landlord', email='landlord@example.com', password=None,
+                                         role='landlord')
+        tenants = User.objects.bulk_create([
+            User(username=f'tenant{i}', email=f'tenant{i}@example.com', role='tenant') for i in range(2)
+        ])
+        Listing.objects.bulk_create([
+            Listing(owner=owner, title=f'Listing {i}', description='Spacious apartment near the park.',
+                    location='Berlin', price=rng.randint(300, 3000), rooms=rng.randint(1, 5), type='apartment',
+                    latitude=52.5 + rng.random() / 10, longitude=13.4 + rng.random() / 10)
+            for i in range(count)
+        ], batch_size=5000)
+        start = datetime.date(2024, 1, 1)
+        # По два отзыва и два бронирования на объявление: в сумме не меньше count объектов каждого вида
+        listing_ids = list(Listing.objects.values_list('id', flat=True)[:count // 2 + 1])
+        Booking.objects.bulk_create([
+            Booking(listing_id=listing_id, user=tenant, start_date=start, end_date=start + datetime.timedelta(days=3),
+                    status='confirmed')
+            for listing_id in listing_ids for tenant in tenants
+        ], batch_size=5000)
+        Review.objects.bulk_create([
+            Review(listing_id=listing_id, user=tenant, rating=rng.randint(1, 5), comment='Nice place.')
+            for listing_id in listing_ids for tenant in tenants
+        ], batch_size=5000)
+        self.stdout.write(f'{count} listings created')
+        return owner
@@ -0,0 +1,99 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication import JWTAuthentication
+from users.blacklist import blacklist_index
+from users.middleware import JWTAuthenticationMiddleware
+from users.models import User
+from users.tokens import RefreshToken, access_token_refreshes, verified_tokens
+from ._bench import benchmark_database, percentile
+
+
+class UncoalescedJWTAuthenticationMiddleware(JWTAuthenticationMiddleware):
+    """
+    Прежнее обновление для сравнения: каждый запрос выпускает свой access-токен.
+    """
+
+    def refresh_access_token(self, refresh_token):
+        if not refresh_token:
+            return None
+        return self.issue_access_token(refresh_token)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает "лавину" обновлений access-токена: волна одновременных запросов с истекшим '
+            'access-токеном и одним refresh-токеном, с объединением обновлений (SingleFlight) и без него.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=16, help='Одновременных запросов в волне')
+        parser.add_argument('--waves', type=int, default=200, help='Количество волн')
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user = User.objects.create_user(username='bench', email='bench@example.com', password=None,
+                                            role='tenant')
+            blacklist_index.warm()
+            pipelines = [
+                ('before (refresh per request)', UncoalescedJWTAuthenticationMiddleware),
+                ('after (single-flight)', JWTAuthenticationMiddleware),
+            ]
+            self.stdout.write(f'{options["waves"]} waves x {options["concurrency"]} parallel requests')
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                for label, middleware_class in pipelines:
+                    timings, issued, cookies = self.run(executor, user, middleware_class, options)
+                    self.stdout.write(f'  {label:<30} wave p50 {percentile(timings, 50):7.2f} ms   '
+                                      f'p99 {percentile(timings, 99):7.2f} ms   '
+                                      f'per wave: {statistics.mean(issued):5.1f} tokens issued, '
+                                      f'{statistics.mean(cookies):5.1f} distinct Set-Cookie')
+                # Соединения потоков пула с тестовой базой
+                list(executor.map(lambda _: connections.close_all(), range(options['concurrency'])))
+
+    @staticmethod
+    def run(executor, user, middleware_class, options):
+        factory = APIRequestFactory()
+        authentication = JWTAuthentication()
+        issued = []
+        lock = threading.Lock()
+        issue = middleware_class.issue_access_token
+
+        def counting_issue(self, refresh_token):
+            with lock:
+                issued[-1] += 1
+            return issue(self, refresh_token)
+
+        def view(request):
+            return HttpResponse(str(Request(request, authenticators=[authentication]).user.pk))
+
+        middleware = type('CountingMiddleware', (middleware_class,), {'issue_access_token': counting_issue})(view)
+        timings, cookies = [], []
+        # Первая волна - прогрев (кэш пользователей, импорты), в замер не входит
+        for _ in range(options['waves'] + 1):
+            verified_tokens.clear()
+            access_token_refreshes.clear()
+            expired = AccessToken.for_user(user)
+            expired.set_exp(lifetime=-timedelta(minutes=1))
+            wave_cookies = {'access_token': str(expired), 'refresh_token': str(RefreshToken.for_user(user))}
+            issued.append(0)
+            barrier = threading.Barrier(options['concurrency'])
+
+            def request(_):
+                request = factory.get('/listings/', SERVER_NAME='localhost')
+                request.COOKIES.update(wave_cookies)
+                barrier.wait()
+                return middleware(request).cookies['access_token'].value
+
+            started = time.perf_counter()
+            values = set(executor.map(request, range(options['concurrency'])))
+            timings.append((time.perf_counter() - started) * 1000)
+            cookies.append(len(values))
+        return timings[1:], issued[1:], cookies[1:]
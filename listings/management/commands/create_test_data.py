@@ -1,40 +1,193 @@
-# your_app/management/commands/create_test_data.py
-from django.core.management.base import BaseCommand
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import IntegerField, Max, Q, Value
+from django.db.models.functions import Cast, Replace
+from django.utils import timezone
+
+from listings.cache import invalidate as invalidate_listing_cache
+from listings.models import Booking, Listing, Review
 from users.models import User
-from listings.models import Listing, Review, Booking
-from datetime import date
+
+# Города с координатами центра: объявления разбрасываются вокруг них
+CITIES = [
+    ('Berlin, Germany', 52.520, 13.405),
+    ('Munich, Germany', 48.137, 11.575),
+    ('Hamburg, Germany', 53.551, 9.993),
+    ('Cologne, Germany', 50.937, 6.960),
+    ('Frankfurt, Germany', 50.110, 8.682),
+    ('Leipzig, Germany', 51.340, 12.370),
+    ('Dresden, Germany', 51.050, 13.740),
+    ('Stuttgart, Germany', 48.780, 9.180),
+]
+ADJECTIVES = ['Beautiful', 'Cozy', 'Spacious', 'Bright', 'Modern', 'Quiet', 'Charming', 'Renovated']
+PLACES = ['in the city center', 'near the park', 'by the river', 'close to the station', 'in the old town',
+          'with a balcony', 'with a garden view', 'near the university']
+SENTENCES = ['Fully furnished with a modern kitchen.', 'Walking distance to shops and restaurants.',
+             'Fast internet and a dedicated workspace.', 'Pets are welcome.', 'Washing machine included.',
+             'Public transport right outside.', 'Quiet neighbourhood, perfect for families.',
+             'Parking space available on request.']
+COMMENTS = ['Great place to stay!', 'Clean and comfortable.', 'Exactly as described.', 'Friendly landlord.',
+            'A bit noisy at night.', 'Would book again.', 'Good value for the price.', 'Not as clean as expected.']
+# Базовая цена по типу и надбавка за комнату
+BASE_PRICES = {'apartment': 600, 'house': 1200, 'studio': 400}
+STATUSES = ['confirmed', 'pending', 'canceled']
+STATUS_WEIGHTS = [60, 25, 15]
+RATING_WEIGHTS = [5, 8, 17, 35, 35]
+
 
 class Command(BaseCommand):
-    help = 'Создает тестовые данные для пользователей, объявлений, отзывов и бронирований.'
-
-    def handle(self, *args, **kwargs):
-        landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password='password123', role='landlord')
-        tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password='password123')
-
-        listing = Listing.objects.create(
-            owner=landlord,
-            title="Beautiful Apartment",
-            description="A spacious apartment in the city center.",
-            location="Berlin, Germany",
-            price=1500.00,
-            rooms=3,
-            type="apartment",
-            is_active=True
-        )
+    help = ('Создает тестовые данные: пользователей, объявления, бронирования и отзывы. '
+            'Бронирования одного объявления не пересекаются, отзывы оставляют арендаторы с завершенным '
+            'подтвержденным бронированием. Данные пишутся bulk_create пакетами, поэтому команда подходит '
+            'для наполнения базы миллионами строк.')
 
-        review = Review.objects.create(
-            listing=listing,
-            user=tenant,
-            rating=4,
-            comment="Great place to stay!"
-        )
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2, help='Количество пользователей (не меньше 2)')
+        parser.add_argument('--landlords', type=float, default=0.2, help='Доля арендодателей среди пользователей')
+        parser.add_argument('--listings', type=int, default=1, help='Количество объявлений')
+        parser.add_argument('--bookings-per-listing', type=int, default=1, help='Бронирований на объявление')
+        parser.add_argument('--reviews-per-listing', type=int, default=1,
+                            help='Отзывов на объявление (не больше числа завершенных подтвержденных бронирований; '
+                                 'у каждого объявления с бронированиями есть хотя бы одно такое)')
+        parser.add_argument('--password', default='password123', help='Пароль всех созданных пользователей')
+        parser.add_argument('--chunk-size', type=int, default=2_000,
+                            help='Количество объявлений (пользователей), записываемых одной транзакцией')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('Нужны хотя бы два пользователя: арендодатель и арендатор')
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
 
-        booking = Booking.objects.create(
-            listing=listing,
-            user=tenant,
-            start_date=date(2024, 9, 1),
-            end_date=date(2024, 9, 10),
-            status='confirmed'
+        landlord_ids, tenant_ids = self.create_users(options)
+        self.stdout.write(f'{len(landlord_ids) + len(tenant_ids)} users created')
+
+        counts = {'listings': 0, 'bookings': 0, 'reviews': 0}
+        for first in range(0, options['listings'], options['chunk_size']):
+            size = min(options['chunk_size'], options['listings'] - first)
+            with transaction.atomic():
+                for name, created in self.create_listings(size, landlord_ids, tenant_ids, rng, options).items():
+                    counts[name] += created
+            self.stdout.write(f'{counts["listings"]}/{options["listings"]} listings created')
+        # bulk_create не отправляет сигналы - сбрасываем кэш ответов явно
+        invalidate_listing_cache()
+
+        elapsed = time.perf_counter() - started
+        rows = len(landlord_ids) + len(tenant_ids) + sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Test data created successfully! {counts["listings"]} listings, {counts["bookings"]} bookings, '
+            f'{counts["reviews"]} reviews in {elapsed:.1f} s ({rows / elapsed:.0f} rows/s)'))
+
+    def create_users(self, options):
+        """
+        Создает пользователей пакетами и возвращает id арендодателей и арендаторов.
+        Пароль хешируется один раз: хеш с одной солью у всех пользователей допустим только в тестовых данных.
+        """
+        password = make_password(options['password'])
+        landlords = max(1, min(options['users'] - 1, round(options['users'] * options['landlords'])))
+        # Номера продолжают наибольший существующий: повторные запуски и удаление пользователей не дают совпадений
+        last = (User.objects.filter(username__regex=r'^(landlord|tenant)[0-9]+$')
+                .annotate(number=Cast(Replace(Replace('username', Value('landlord')), Value('tenant')), IntegerField()))
+                .aggregate(Max('number'))['number__max'])
+        start = 0 if last is None else last + 1
+        # Привычные учетные записи landlord@example.com и tenant@example.com создаются, если их еще нет
+        taken = {role for role in ('landlord', 'tenant')
+                 if User.objects.filter(Q(username=role) | Q(email=f'{role}@example.com')).exists()}
+        roles = [('landlord', number) for number in range(landlords)]
+        roles += [('tenant', number) for number in range(options['users'] - landlords)]
+        ids = {'landlord': [], 'tenant': []}
+        for first in range(0, len(roles), options['chunk_size']):
+            users = []
+            for role, number in roles[first:first + options['chunk_size']]:
+                username = role if number == 0 and role not in taken else f'{role}{start + number}'
+                users.append(User(username=username, email=f'{username}@example.com', password=password, role=role))
+            with transaction.atomic():
+                for user in User.objects.bulk_create(users):
+                    ids[user.role].append(user.pk)
+        return ids['landlord'], ids['tenant']
+
+    def create_listings(self, count, landlord_ids, tenant_ids, rng, options):
+        """
+        Создает count объявлений с бронированиями и отзывами. Агрегаты рейтинга объявления
+        считаются здесь же: сигналы отзывов при bulk_create не вызываются.
+        """
+        today = timezone.now().date()
+        listings, bookings, reviews = [], [], []
+        for _ in range(count):
+            listing_bookings = self.make_bookings(tenant_ids, today, rng, options['bookings_per_listing'])
+            listing_reviews = self.make_reviews(listing_bookings, today, rng, options['reviews_per_listing'])
+            listings.append(self.make_listing(landlord_ids, listing_reviews, rng))
+            bookings.append(listing_bookings)
+            reviews.append(listing_reviews)
+
+        Listing.objects.bulk_create(listings)
+        for listing, listing_bookings, listing_reviews in zip(listings, bookings, reviews):
+            for item in listing_bookings + listing_reviews:
+                item.listing_id = listing.pk
+        bookings = [booking for listing_bookings in bookings for booking in listing_bookings]
+        reviews = [review for listing_reviews in reviews for review in listing_reviews]
+        Booking.objects.bulk_create(bookings, batch_size=5_000)
+        Review.objects.bulk_create(reviews, batch_size=5_000)
+        return {'listings': len(listings), 'bookings': len(bookings), 'reviews': len(reviews)}
+
+    @staticmethod
+    def make_listing(landlord_ids, reviews, rng):
+        listing_type = rng.choice(list(BASE_PRICES))
+        rooms = 1 if listing_type == 'studio' else rng.randint(1, 6)
+        location, latitude, longitude = rng.choice(CITIES)
+        rating_sum = sum(review.rating for review in reviews)
+        return Listing(
+            owner_id=rng.choice(landlord_ids),
+            title=f'{rng.choice(ADJECTIVES)} {listing_type} {rng.choice(PLACES)}',
+            description=' '.join(rng.sample(SENTENCES, 3)),
+            location=location,
+            price=Decimal(round(BASE_PRICES[listing_type] + rooms * rng.randint(150, 350), -1)),
+            rooms=rooms,
+            type=listing_type,
+            is_active=rng.random() < 0.9,
+            # Около 10 км вокруг центра города
+            latitude=round(latitude + rng.uniform(-0.1, 0.1), 6),
+            longitude=round(longitude + rng.uniform(-0.15, 0.15), 6),
+            review_count=len(reviews),
+            rating_sum=rating_sum,
+            rating_avg=rating_sum / len(reviews) if reviews else 0,
         )
 
-        self.stdout.write(self.style.SUCCESS('Test data created successfully!'))
+    @staticmethod
+    def make_bookings(tenant_ids, today, rng, count):
+        """
+        Бронирования идут друг за другом с промежутками, начиная примерно за год до сегодняшнего дня:
+        следующее начинается не раньше окончания предыдущего, поэтому они не пересекаются.
+        Среди них всегда есть завершенное подтвержденное, чтобы у объявления был хотя бы один отзыв.
+        """
+        bookings = []
+        day = today - timedelta(days=365 - rng.randint(0, 30))
+        for _ in range(count):
+            day += timedelta(days=rng.randint(0, 21))
+            end_date = day + timedelta(days=rng.randint(2, 14))
+            status = rng.choices(STATUSES, STATUS_WEIGHTS)[0]
+            bookings.append(Booking(user_id=rng.choice(tenant_ids), start_date=day, end_date=end_date, status=status))
+            day = end_date
+        # Первое бронирование всегда в прошлом: подтверждаем его, если остальные отзыва не дают
+        if bookings and not any(booking.status == 'confirmed' and booking.end_date <= today for booking in bookings):
+            bookings[0].status = 'confirmed'
+        return bookings
+
+    @staticmethod
+    def make_reviews(bookings, today, rng, count):
+        """
+        Отзывы арендаторов с завершенным подтвержденным бронированием: не больше одного на арендатора.
+        """
+        reviewers = list(dict.fromkeys(booking.user_id for booking in bookings
+                                       if booking.status == 'confirmed' and booking.end_date <= today))
+        rng.shuffle(reviewers)
+        return [Review(user_id=user_id, rating=rng.choices(range(1, 6), RATING_WEIGHTS)[0],
+                       comment=rng.choice(COMMENTS))
+                for user_id in reviewers[:count]]
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from rental_project.profiling import HEADER, PROFILERS, make_token
+
+
+class Command(BaseCommand):
+    help = ('Выдает значение заголовка X-Profile: запрос с ним профилируется (rental_project/profiling.py), '
+            'профиль записывается в PROFILING_DIR.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(PROFILERS), default=settings.PROFILING_FORMAT,
+                            help='prof - cProfile, collapsed - свернутые стеки для flame graph')
+
+    def handle(self, *args, **options):
+        token = make_token(options['format'])
+        self.stdout.write(f'{HEADER}: {token}')
+        self.stderr.write(f'Valid for {settings.PROFILING_TOKEN_MAX_AGE} s, e.g.: '
+                          f'curl -H "{HEADER}: {token}" http://localhost:8000/listings/')
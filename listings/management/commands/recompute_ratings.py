@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from listings.models import Listing
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает агрегаты рейтинга объявлений (review_count, rating_sum, rating_avg) по отзывам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10_000,
+                            help='Количество объявлений, пересчитываемых одним UPDATE')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_id = Listing.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        updated = 0
+        # Пересчет диапазонами id, чтобы не держать одну длинную транзакцию на всей таблице
+        for start in range(0, last_id, chunk_size):
+            with transaction.atomic():
+                updated += Listing.objects.filter(id__gt=start, id__lte=start + chunk_size).recompute_ratings()
+        self.stdout.write(self.style.SUCCESS(f'Ratings recomputed for {updated} listings'))
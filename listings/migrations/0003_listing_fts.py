@@ -0,0 +1,70 @@
+import django.db.models.deletion
+import listings.search
+from django.db import migrations, models
+
+
+FTS_TABLE = 'listings_listing_fts'
+
+
+def create_fts_index(apps, schema_editor):
+    # Полнотекстовый индекс доступен только в SQLite
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"title, description, content='listings_listing', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON listings_listing BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); "
+        f"END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON listings_listing BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+        f"VALUES ('delete', old.id, old.title, old.description); "
+        f"END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF title, description ON listings_listing BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+        f"VALUES ('delete', old.id, old.title, old.description); "
+        f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); "
+        f"END"
+    )
+    # Индексируем уже существующие объявления
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for suffix in ('ai', 'ad', 'au'):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0002_remove_booking_is_confirmed_booking_status_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+        migrations.CreateModel(
+            name='ListingSearchIndex',
+            fields=[
+                ('listing', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='listings.listing')),
+                ('title', models.TextField()),
+                ('description', models.TextField()),
+                ('document', listings.search.SearchDocumentField(db_column='listings_listing_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'listings_listing_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def compute_ratings(apps, schema_editor):
+    # Заполняем агрегаты для уже существующих отзывов
+    Listing = apps.get_model('listings', 'Listing')
+    Review = apps.get_model('listings', 'Review')
+    reviews = Review.objects.filter(listing=OuterRef('pk')).order_by().values('listing')
+    count = Coalesce(Subquery(reviews.annotate(value=Count('id')).values('value')), 0)
+    total = Coalesce(Subquery(reviews.annotate(value=Sum('rating')).values('value')), 0)
+    Listing.objects.update(
+        review_count=count,
+        rating_sum=total,
+        rating_avg=Coalesce(Cast(total, FloatField()) / NullIf(count, Value(0)), Value(0.0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0004_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='rating_avg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['rating_avg'], name='listing_active_rating_idx'),
+        ),
+        migrations.RunPython(compute_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0005_listing_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['listing', 'status', 'start_date', 'end_date'], name='booking_listing_status_dates'),
+        ),
+    ]
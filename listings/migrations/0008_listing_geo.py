@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:23
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+GEO_TABLE = 'listings_listing_geo'
+
+
+def create_geo_index(apps, schema_editor):
+    # Пространственный индекс доступен только в SQLite
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"CREATE VIRTUAL TABLE {GEO_TABLE} USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+    schema_editor.execute(
+        f"CREATE TRIGGER {GEO_TABLE}_ai AFTER INSERT ON listings_listing "
+        f"WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN "
+        f"INSERT INTO {GEO_TABLE}(id, min_lat, max_lat, min_lon, max_lon) "
+        f"VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude); "
+        f"END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {GEO_TABLE}_ad AFTER DELETE ON listings_listing BEGIN "
+        f"DELETE FROM {GEO_TABLE} WHERE id = old.id; "
+        f"END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {GEO_TABLE}_au AFTER UPDATE OF latitude, longitude ON listings_listing BEGIN "
+        f"DELETE FROM {GEO_TABLE} WHERE id = old.id; "
+        f"INSERT INTO {GEO_TABLE}(id, min_lat, max_lat, min_lon, max_lon) "
+        f"SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude "
+        f"WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL; "
+        f"END"
+    )
+    # Индексируем уже существующие объявления с координатами
+    schema_editor.execute(
+        f"INSERT INTO {GEO_TABLE}(id, min_lat, max_lat, min_lon, max_lon) "
+        f"SELECT id, latitude, latitude, longitude, longitude FROM listings_listing "
+        f"WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    )
+
+
+def drop_geo_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for suffix in ('ai', 'ad', 'au'):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {GEO_TABLE}_{suffix}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {GEO_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0007_booking_review_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.RunPython(create_geo_index, drop_geo_index),
+        migrations.CreateModel(
+            name='ListingGeoIndex',
+            fields=[
+                ('listing', models.OneToOneField(db_column='id', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='geo_index', serialize=False, to='listings.listing')),
+                ('min_lat', models.FloatField()),
+                ('max_lat', models.FloatField()),
+                ('min_lon', models.FloatField()),
+                ('max_lon', models.FloatField()),
+            ],
+            options={
+                'db_table': 'listings_listing_geo',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,11 +1,147 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import Count, Exists, F, FloatField, Max, OuterRef, Prefetch, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
 from django.utils import timezone
 
 from users.models import User
+from .cache import invalidate as invalidate_listing_cache
+from .geo import GEO_TABLE, bounding_box, distance_expression, rtree_available
+from .search import FTS_TABLE, SearchDocumentField
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
+# QuerySet объявлений с заранее подготовленными связанными данными
+class ListingQuerySet(models.QuerySet):
+
+    def with_related(self, user=None, fields=None):
+        """
+        Подгружает отзывы и видимые пользователю бронирования фиксированным числом запросов.
+        Бронирования попадают в атрибут visible_bookings:
+        - владелец объявления получает все бронирования объявления;
+        - остальные аутентифицированные пользователи - только свои бронирования.
+        Если задан набор полей ответа fields, подгружаются только упомянутые в нем связи.
+        """
+        return self.prefetch_related(*related_prefetches(user, fields))
+
+    def only_fields(self, fields, *extra):
+        """
+        Загружает только колонки, нужные для полей ответа fields (и полей extra, например для сортировки).
+        fields=None - все колонки.
+        """
+        if fields is None:
+            return self
+        names = {field.name for field in self.model._meta.concrete_fields
+                 if field.name in fields or field.name in extra}
+        if 'bookings' in fields:
+            # Видимость бронирований зависит от владельца объявления
+            names.add('owner')
+        return self.only('id', *names)
+
+    def with_change_markers(self):
+        """
+        Добавляет к объявлению значения, по которым видно, изменились ли его отзывы и бронирования:
+        количество, последний id и последнее время изменения. Количество и id отражают удаления
+        и пересоздания, которые не меняют максимальное время изменения.
+        Все значения вычисляются подзапросами в том же запросе, что и объявление.
+        """
+        markers = {}
+        for relation, model in (('reviews', Review), ('bookings', Booking)):
+            related = model.objects.filter(listing=OuterRef('pk')).order_by().values('listing')
+            for name, aggregate in (('count', Count('id')), ('last_id', Max('id')), ('updated_at', Max('updated_at'))):
+                markers[f'{relation}_{name}'] = Subquery(related.annotate(value=aggregate).values('value'))
+        return self.annotate(**markers)
+
+    def available_between(self, date_from=None, date_to=None):
+        """
+        Исключает объявления с подтвержденными бронированиями, пересекающимися с периодом
+        [date_from, date_to). Одна из границ может быть не задана (открытый период).
+        Выполняется одним запросом: NOT EXISTS по индексу (listing_id, status, start_date, end_date).
+        """
+        overlapping = Booking.objects.filter(listing=OuterRef('pk'), status='confirmed')
+        if date_to is not None:
+            overlapping = overlapping.filter(start_date__lt=date_to)
+        if date_from is not None:
+            overlapping = overlapping.filter(end_date__gt=date_from)
+        return self.filter(~Exists(overlapping))
+
+    def within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        Объявления с координатами внутри прямоугольника.
+        В SQLite кандидаты выбираются по индексу R*Tree (JOIN по id), точная проверка - по колонкам
+        объявления: R*Tree хранит координаты с округлением до float32 наружу.
+        """
+        queryset = self.filter(latitude__gte=min_lat, latitude__lte=max_lat,
+                               longitude__gte=min_lon, longitude__lte=max_lon)
+        if rtree_available(connections[self.db]):
+            queryset = queryset.filter(geo_index__max_lat__gte=min_lat, geo_index__min_lat__lte=max_lat,
+                                       geo_index__max_lon__gte=min_lon, geo_index__min_lon__lte=max_lon)
+        return queryset
+
+    def near(self, latitude, longitude, radius_km=None):
+        """
+        Добавляет расстояние до точки в километрах (аннотация distance, для сортировки ?ordering=distance).
+        Объявления без координат исключаются. С радиусом остаются только объявления в круге:
+        сначала прямоугольник по индексу, затем расстояние.
+        """
+        if radius_km is not None:
+            queryset = self.within_bbox(*bounding_box(latitude, longitude, radius_km))
+        else:
+            queryset = self.filter(latitude__isnull=False, longitude__isnull=False)
+        queryset = queryset.annotate(distance=distance_expression(latitude, longitude))
+        if radius_km is not None:
+            queryset = queryset.filter(distance__lte=radius_km)
+        return queryset
+
+    def lock(self, pk):
+        """
+        Блокирует строку объявления до конца текущей транзакции (SELECT ... FOR UPDATE),
+        чтобы проверки пересечения бронирований одного объявления выполнялись по очереди.
+        Бронирования разных объявлений друг друга не ждут. В SQLite FOR UPDATE не поддерживается:
+        там транзакции открываются как BEGIN IMMEDIATE (см. DATABASES в settings.py),
+        и запись в базу сериализуется целиком.
+        """
+        return list(self.select_for_update().filter(pk=pk).values_list('pk', flat=True))
+
+    def apply_review_delta(self, count_delta, rating_delta):
+        """
+        Атомарно изменяет агрегаты рейтинга одним UPDATE через F-выражения.
+        В правой части UPDATE F() ссылается на старые значения строки, поэтому среднее
+        считается от уже измененных количества и суммы.
+        """
+        count = F('review_count') + count_delta
+        total = F('rating_sum') + rating_delta
+        return self.update(review_count=count, rating_sum=total, rating_avg=rating_average(total, count))
+
+    def recompute_ratings(self):
+        """
+        Пересчитывает агрегаты рейтинга по таблице отзывов одним UPDATE с подзапросами.
+        """
+        reviews = Review.objects.filter(listing=OuterRef('pk')).order_by().values('listing')
+        count = Coalesce(Subquery(reviews.annotate(value=Count('id')).values('value')), 0)
+        total = Coalesce(Subquery(reviews.annotate(value=Sum('rating')).values('value')), 0)
+        updated = self.update(review_count=count, rating_sum=total, rating_avg=rating_average(total, count))
+        # UPDATE не отправляет сигналы - сбрасываем кэш ответов явно
+        invalidate_listing_cache()
+        return updated
+
+
+# Подгрузка отзывов и видимых пользователю бронирований (см. ListingQuerySet.with_related)
+def related_prefetches(user=None, fields=None):
+    prefetches = []
+    if fields is None or 'reviews' in fields:
+        prefetches.append(Prefetch('reviews', queryset=Review.objects.order_by('id')))
+    if user is not None and user.is_authenticated and (fields is None or 'bookings' in fields):
+        bookings = Booking.objects.filter(Q(user=user) | Q(listing__owner=user)).order_by('id')
+        prefetches.append(Prefetch('bookings', queryset=bookings, to_attr='visible_bookings'))
+    return prefetches
+
+
+# Средний рейтинг как SQL-выражение (0, если отзывов нет)
+def rating_average(total, count):
+    return Coalesce(Cast(total, FloatField()) / NullIf(count, Value(0)), Value(0.0))
+
+
 # Модель объявления
 class Listing(models.Model):
     # Варианты типов объявлений
@@ -45,11 +181,145 @@ class Listing(models.Model):
     # Дата обновления объявления (автоматически устанавливается при обновлении)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Координаты объявления (необязательные, для поиска на карте)
+    latitude = models.FloatField(null=True, blank=True,
+                                 validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True,
+                                  validators=[MinValueValidator(-180), MaxValueValidator(180)])
+
+    # Количество отзывов (поддерживается сигналами отзывов, пересчет - команда recompute_ratings)
+    review_count = models.PositiveIntegerField(default=0)
+
+    # Сумма оценок отзывов
+    rating_sum = models.PositiveIntegerField(default=0)
+
+    # Средняя оценка (0, если отзывов нет)
+    rating_avg = models.FloatField(default=0)
+
+    # Менеджер объявлений
+    objects = ListingQuerySet.as_manager()
+
+    # Индексы под фильтры и сортировки ListingView (проверяются тестами tests/test_query_plans.py).
+    # Django записывает is_active=True как WHERE "is_active", а не как сравнение, поэтому
+    # составной индекс с ведущим is_active не используется SQLite - вместо него частичные индексы
+    class Meta:
+        indexes = [
+            # Активные объявления по дате создания
+            models.Index(fields=['created_at'], condition=Q(is_active=True), name='listing_active_created_idx'),
+            # Активные объявления по цене
+            models.Index(fields=['price'], condition=Q(is_active=True), name='listing_active_price_idx'),
+            # Активные объявления по рейтингу
+            models.Index(fields=['rating_avg'], condition=Q(is_active=True), name='listing_active_rating_idx'),
+            # Объявления по типу и цене (в том числе вместе с фильтром is_active)
+            models.Index(fields=['type', 'price'], name='listing_type_price_idx'),
+            # Поиск по местоположению и количеству комнат
+            models.Index(fields=['location', 'rooms'], name='listing_location_rooms_idx'),
+        ]
+
     # Возвращает строковое представление объявления (заголовок)
     def __str__(self):
         return self.title
 
 
+# QuerySet бронирований
+class BookingQuerySet(models.QuerySet):
+
+    def visible_to(self, user):
+        """
+        Бронирования, доступные пользователю:
+        - арендодатель видит бронирования своих объявлений;
+        - арендатор видит только свои бронирования;
+        - остальные не видят ничего.
+        """
+        if user.role == 'landlord':
+            return self.filter(listing__owner=user)
+        elif user.role == 'tenant':
+            return self.filter(user=user)
+        return self.none()
+
+    def overlapping(self, listing, start_date, end_date):
+        """
+        Подтвержденные бронирования объявления, пересекающиеся с периодом [start_date, end_date).
+        """
+        return self.filter(listing=listing, status='confirmed', start_date__lt=end_date, end_date__gt=start_date)
+
+    def bulk_admit(self, listing, items):
+        """
+        Создает пакет бронирований объявления одной транзакцией.
+        items - список словарей с user (id арендатора), start_date, end_date и status в порядке запроса.
+        Как и одиночное бронирование, любое бронирование пакета отклоняется, если пересекается
+        с подтвержденным: уже существующим или принятым подтвержденным из этого же пакета
+        (из пересекающихся подтвержденных принимается то, что начинается раньше).
+        Ожидающие подтверждения бронирования друг другу не мешают.
+        Проверка - проход по интервалам, отсортированным по дате заезда: сначала подтвержденные
+        бронирования пакета, затем остальные.
+        Возвращает словарь {индекс: созданное бронирование} и множество индексов с конфликтами.
+        """
+        if not items:
+            return {}, set()
+
+        def by_start(index):
+            return items[index]['start_date'], items[index]['end_date'], index
+
+        batch_confirmed = sorted((index for index, item in enumerate(items) if item.get('status') == 'confirmed'),
+                                 key=by_start)
+        batch_pending = sorted((index for index, item in enumerate(items) if item.get('status') != 'confirmed'),
+                               key=by_start)
+
+        with transaction.atomic():
+            Listing.objects.lock(listing.pk)
+            confirmed = list(
+                self.overlapping(listing, min(item['start_date'] for item in items),
+                                 max(item['end_date'] for item in items))
+                .order_by('start_date')
+                .values_list('start_date', 'end_date')
+            )
+
+            accepted, conflicts = self.admit_intervals(items, batch_confirmed, confirmed, blocking=True)
+            confirmed = sorted(confirmed + [(items[index]['start_date'], items[index]['end_date'])
+                                            for index in accepted])
+            accepted_pending, pending_conflicts = self.admit_intervals(items, batch_pending, confirmed,
+                                                                       blocking=False)
+            accepted = sorted(accepted + accepted_pending)
+            conflicts |= pending_conflicts
+
+            created = self.bulk_create([
+                Booking(listing=listing, user_id=items[index]['user'], start_date=items[index]['start_date'],
+                        end_date=items[index]['end_date'], status=items[index].get('status', 'pending'))
+                for index in accepted
+            ])
+            # bulk_create не отправляет сигналы - сбрасываем кэш ответов явно
+            if created:
+                invalidate_listing_cache()
+        return dict(zip(accepted, created)), conflicts
+
+    @staticmethod
+    def admit_intervals(items, indexes, confirmed, blocking):
+        """
+        Один проход по интервалам items[indexes] (отсортированным по дате заезда) против подтвержденных
+        интервалов confirmed (отсортированных по дате заезда). Если blocking, принятые интервалы
+        тоже блокируют следующие. Возвращает список принятых индексов и множество конфликтующих.
+        """
+        accepted, conflicts = [], set()
+        # Самая поздняя дата выезда среди блокирующих интервалов, начавшихся не позже текущего
+        reach = None
+        position = 0
+        for index in indexes:
+            start_date, end_date = items[index]['start_date'], items[index]['end_date']
+            while position < len(confirmed) and confirmed[position][0] <= start_date:
+                if reach is None or confirmed[position][1] > reach:
+                    reach = confirmed[position][1]
+                position += 1
+            starts_inside = position < len(confirmed) and confirmed[position][0] < end_date
+            if (reach is not None and reach > start_date) or starts_inside:
+                conflicts.add(index)
+                continue
+            accepted.append(index)
+            if blocking and (reach is None or end_date > reach):
+                reach = end_date
+        return accepted, conflicts
+
+
 # Модель бронирования
 class Booking(models.Model):
     # Варианты статусов бронирования
@@ -77,10 +347,23 @@ class Booking(models.Model):
     # Дата создания бронирования (автоматически устанавливается при создании)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Дата изменения бронирования (для ETag и Last-Modified объявления)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Менеджер бронирований
+    objects = BookingQuerySet.as_manager()
+
     # Возвращает строковое представление бронирования (имя пользователя и заголовок объявления)
     def __str__(self):
         return f'Booking by {self.user.email} for {self.listing.title}'
 
+    # Индекс для проверки пересечения дат бронирований объявления
+    class Meta:
+        indexes = [
+            models.Index(fields=['listing', 'status', 'start_date', 'end_date'],
+                         name='booking_listing_status_dates'),
+        ]
+
     # Метод для проверки возможности отмены бронирования
     def can_cancel(self):
         # Проверка, можно ли отменить бронирование (до начала бронирования)
@@ -104,10 +387,63 @@ class Review(models.Model):
     # Дата создания отзыва (автоматически устанавливается при создании)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Дата изменения отзыва (для ETag и Last-Modified объявления)
+    updated_at = models.DateTimeField(auto_now=True)
+
     # Meta-класс для обеспечения уникальности отзыва для каждого пользователя и объявления
     class Meta:
         unique_together = ('listing', 'user')  # Ensures one review per user per listing
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Запоминаем загруженное объявление: при переносе отзыва сигнал пересчитает и прежнее
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_listing_id = instance.__dict__.get('listing_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Отзыв и агрегаты рейтинга объявления (обновляются в post_save) сохраняются в одной транзакции
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
     # Возвращает строковое представление отзыва (заголовок объявления и имя пользователя)
     def __str__(self):
-        return f'Review for {self.listing.title} by {self.user.email}'
\ No newline at end of file
+        return f'Review for {self.listing.title} by {self.user.email}'
+
+
+# Полнотекстовый индекс объявлений (виртуальная таблица FTS5, создается миграцией только в SQLite)
+class ListingSearchIndex(models.Model):
+    # Объявление (rowid строки индекса совпадает с id объявления)
+    listing = models.OneToOneField(Listing, primary_key=True, db_column='rowid', related_name='search_index',
+                                   on_delete=models.DO_NOTHING)
+
+    # Проиндексированные заголовок и описание
+    title = models.TextField()
+    description = models.TextField()
+
+    # Колонка для поиска по всему документу: search_index__document__match=...
+    document = SearchDocumentField(db_column=FTS_TABLE)
+
+    # Релевантность найденной строки (bm25, чем меньше - тем релевантнее)
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = FTS_TABLE
+
+
+# Пространственный индекс объявлений (виртуальная таблица R*Tree, создается миграцией только в SQLite)
+class ListingGeoIndex(models.Model):
+    # Объявление (id строки индекса совпадает с id объявления)
+    listing = models.OneToOneField(Listing, primary_key=True, db_column='id', related_name='geo_index',
+                                   on_delete=models.DO_NOTHING)
+
+    # Границы прямоугольника (для точки min и max совпадают)
+    min_lat = models.FloatField()
+    max_lat = models.FloatField()
+    min_lon = models.FloatField()
+    max_lon = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = GEO_TABLE
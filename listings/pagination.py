@@ -0,0 +1,200 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# Пагинация по ключу (keyset) с откатом на постраничную пагинацию
+class KeysetPagination(PageNumberPagination):
+    """
+    По умолчанию работает как PageNumberPagination.
+    При ?pagination=cursor (или при наличии ?cursor=) переключается в режим keyset:
+    следующая страница выбирается условием WHERE по значениям сортировки последней строки
+    (с id в качестве последнего ключа), а не через OFFSET.
+    В режиме keyset COUNT(*) выполняется только при ?count=true.
+    """
+    # Параметр запроса с курсором
+    cursor_query_param = 'cursor'
+    # Параметр запроса для выбора режима пагинации
+    mode_query_param = 'pagination'
+    # Параметр запроса для получения общего количества
+    count_query_param = 'count'
+    # Ключ, замыкающий сортировку
+    tie_breaker = 'id'
+
+    cursor_mode = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.is_cursor_mode(request)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request)
+
+        if cursor is not None and cursor['o'] != self.ordering:
+            # Курсор получен для другой сортировки
+            raise NotFound('Invalid cursor')
+
+        reverse = bool(cursor and cursor['r'])
+        terms = [(term.lstrip('-'), term.startswith('-') != reverse) for term in self.ordering]
+        page_queryset = queryset.order_by(*[('-' if desc else '') + name for name, desc in terms])
+        if cursor is not None:
+            values = self.decode_values(queryset, cursor['v'])
+            page_queryset = page_queryset.filter(self.position_filter(terms, values))
+
+        # Берем на одну строку больше, чтобы узнать, есть ли следующая страница
+        rows = list(page_queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.rows = rows
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true'):
+            self.count = queryset.count()
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        response = {}
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or not self.rows:
+            return None
+        return self.encode_link(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous or not self.rows:
+            return None
+        return self.encode_link(self.rows[0], reverse=True)
+
+    def is_cursor_mode(self, request):
+        """
+        Проверяет, запросил ли клиент пагинацию по курсору.
+        """
+        return (request.query_params.get(self.mode_query_param) == 'cursor'
+                or self.cursor_query_param in request.query_params)
+
+    def get_ordering(self, queryset):
+        """
+        Возвращает сортировку queryset с добавленным id для однозначности.
+        """
+        ordering = []
+        for term in list(queryset.query.order_by) or list(queryset.model._meta.ordering):
+            if not isinstance(term, str) or not self.is_keyset_field(queryset, term.lstrip('-')):
+                raise ValidationError({'ordering': 'This ordering is not supported by cursor pagination.'})
+            if term.lstrip('-') == 'pk':
+                term = term.replace('pk', self.tie_breaker)
+            ordering.append(term)
+        if self.tie_breaker not in [term.lstrip('-') for term in ordering]:
+            descending = bool(ordering) and ordering[0].startswith('-')
+            ordering.append(('-' if descending else '') + self.tie_breaker)
+        return ordering
+
+    def is_keyset_field(self, queryset, name):
+        # Поддерживаются собственные поля модели и аннотации queryset
+        if name in queryset.query.annotations or name == 'pk':
+            return True
+        if '__' in name:
+            return False
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        return field.concrete and not field.is_relation
+
+    def position_filter(self, terms, values):
+        """
+        Строит условие "строка идет после позиции курсора" для составного ключа сортировки:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        condition = Q()
+        for index, (name, desc) in enumerate(terms):
+            step = Q(**{f'{name}__{"lt" if desc else "gt"}': values[index]})
+            for previous in range(index):
+                step &= Q(**{terms[previous][0]: values[previous]})
+            condition |= step
+        return condition
+
+    def encode_link(self, row, reverse):
+        values = [self.encode_value(getattr(row, term.lstrip('-'))) for term in self.ordering]
+        payload = json.dumps({'o': self.ordering, 'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """
+        Декодирует курсор из параметров запроса. Пустой курсор означает первую страницу.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            cursor = json.loads(payload)
+            if (not isinstance(cursor['o'], list) or not isinstance(cursor['v'], list)
+                    or len(cursor['o']) != len(cursor['v']) or cursor['r'] not in (0, 1)
+                    or not isinstance(cursor['r'], int)):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound('Invalid cursor')
+        return cursor
+
+    def decode_values(self, queryset, values):
+        """
+        Проверяет и приводит значения курсора: аннотации (distance, search_rank) - только числа,
+        поля модели - скаляры JSON, приводимые к типу поля.
+        """
+        decoded = []
+        for term, value in zip(self.ordering, values):
+            name = term.lstrip('-')
+            if value is None:
+                decoded.append(value)
+                continue
+            if name in queryset.query.annotations:
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise NotFound('Invalid cursor')
+            else:
+                if not isinstance(value, (str, int, float)):
+                    raise NotFound('Invalid cursor')
+                try:
+                    value = queryset.model._meta.get_field(name).to_python(value)
+                except (DjangoValidationError, TypeError, ValueError):
+                    raise NotFound('Invalid cursor')
+            decoded.append(value)
+        return decoded
+
+    @staticmethod
+    def encode_value(value):
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        return value
@@ -0,0 +1,60 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+
+class StreamingRenderer(ABC, renderers.BaseRenderer):
+    """
+    Рендерер выгрузки: строки отдаются по одной (render_rows), чтобы ответ можно было
+    передавать через StreamingHttpResponse, не собирая его в памяти целиком.
+    Обычный render используется для ответов об ошибках. Подклассы реализуют render_rows.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows else []
+        return b''.join(self.render_rows(rows, fields))
+
+    @abstractmethod
+    def render_rows(self, rows, fields):
+        """
+        Возвращает итератор байтовых строк ответа для строк rows с полями fields.
+        """
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """
+    Одна строка JSON на объект (newline-delimited JSON).
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render_rows(self, rows, fields):
+        for row in rows:
+            yield json.dumps(row, cls=encoders.JSONEncoder, ensure_ascii=False).encode(self.charset) + b'\n'
+
+
+class _Line:
+    # Буфер для csv.writer: writerow возвращает записанную строку вместо записи в файл
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(StreamingRenderer):
+    """
+    CSV с заголовком из имен полей.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render_rows(self, rows, fields):
+        writer = csv.writer(_Line())
+        yield writer.writerow(fields).encode(self.charset)
+        for row in rows:
+            yield writer.writerow([row.get(field) for field in fields]).encode(self.charset)
@@ -0,0 +1,111 @@
+# Быстрое представление объектов для ответов на GET-запросы
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import PKOnlyObject
+
+# Поля, у которых to_representation для значений из базы возвращает само значение
+# (int(int), str(str), float(float), bool). Сравнивается точный тип: наследники
+# (EmailField, SlugField и т.п.) могут форматировать значение по-своему
+IDENTITY_TYPES = {serializers.IntegerField, serializers.CharField, serializers.FloatField,
+                  serializers.BooleanField}
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _is_identity(field):
+    if type(field) in IDENTITY_TYPES:
+        return True
+    # ChoiceField возвращает ключ из choices по str(value): для строковых ключей это само значение
+    return type(field) is serializers.ChoiceField and all(isinstance(key, str) for key in field.choices)
+
+
+def compile_accessor(field, model):
+    """
+    Возвращает функцию instance -> значение поля в ответе, повторяющую
+    Serializer.to_representation для этого поля, но без его общих проверок.
+    Для полей, которые не удается упростить, используется стандартный путь DRF.
+    """
+    model_field = _model_field(model, field.source) if len(field.source_attrs) == 1 else None
+    concrete = model_field is not None and model_field.concrete
+
+    # Поле модели, значение которого выводится как есть
+    if concrete and not model_field.is_relation and _is_identity(field):
+        return attrgetter(model_field.attname)
+
+    # Первичный ключ связанного объекта: значение колонки <name>_id без загрузки объекта
+    if (concrete and model_field.many_to_one and isinstance(field, serializers.PrimaryKeyRelatedField)
+            and field.pk_field is None):
+        return attrgetter(model_field.attname)
+
+    # Поле модели с форматированием (даты, Decimal)
+    if concrete and not model_field.is_relation:
+        get_value, to_representation = attrgetter(model_field.attname), field.to_representation
+
+        def accessor(instance):
+            value = get_value(instance)
+            return None if value is None else to_representation(value)
+        return accessor
+
+    # Поля, вычисляемые по всему объекту (SerializerMethodField и source='*')
+    if field.source == '*':
+        return field.to_representation
+
+    return _generic_accessor(field)
+
+
+# Признак пропущенного поля (SkipField в стандартном пути)
+SKIP = object()
+
+
+def _generic_accessor(field):
+    def accessor(instance):
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            return SKIP
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        return None if check_for_none is None else field.to_representation(attribute)
+    return accessor
+
+
+class FastRepresentationMixin:
+    """
+    Ускоряет to_representation сериализатора моделей для GET-запросов: функции чтения полей
+    строятся один раз на экземпляр сериализатора (для many=True - один раз на список),
+    а не разбираются заново для каждого объекта. Ответ совпадает со стандартным побайтно.
+    Для остальных запросов используется стандартная реализация.
+    """
+
+    def to_representation(self, instance):
+        accessors = self._get_fast_accessors()
+        if accessors is None:
+            return super().to_representation(instance)
+        ret = {}
+        for name, accessor in accessors:
+            value = accessor(instance)
+            if value is not SKIP:
+                ret[name] = value
+        return ret
+
+    def _get_fast_accessors(self):
+        try:
+            return self._fast_accessors
+        except AttributeError:
+            pass
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            self._fast_accessors = None
+        else:
+            model = self.Meta.model
+            self._fast_accessors = [(field.field_name, compile_accessor(field, model))
+                                    for field in self._readable_fields]
+        return self._fast_accessors
@@ -0,0 +1,74 @@
+# Полнотекстовый поиск по объявлениям на основе SQLite FTS5
+from django.db import connections, models
+
+# Виртуальная таблица FTS5 с внешним содержимым (listings_listing)
+FTS_TABLE = 'listings_listing_fts'
+
+# Триггеры, поддерживающие индекс в актуальном состоянии
+FTS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON listings_listing BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON listings_listing BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON listings_listing BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+
+def fts_available(connection):
+    """
+    Проверяет, что база данных - SQLite (индекс FTS5 создается миграцией только в SQLite).
+    """
+    return connection.vendor == 'sqlite'
+
+
+def install_fts_triggers(sender=None, using='default', **kwargs):
+    """
+    Восстанавливает триггеры индекса после миграций.
+    SQLite пересоздает таблицу при изменении схемы, и триггеры таблицы при этом удаляются.
+    Подключается к сигналу post_migrate.
+    """
+    connection = connections[using]
+    if not fts_available(connection) or FTS_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        for statement in FTS_TRIGGERS:
+            cursor.execute(statement)
+
+
+def build_match_query(terms):
+    """
+    Собирает выражение MATCH: каждое слово ищется как префикс, слова объединяются через AND.
+    Кавычки экранируются, поэтому синтаксис FTS5 из пользовательского ввода не интерпретируется.
+    """
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms if term)
+
+
+# Поиск по индексу: <колонка-документ> MATCH <запрос>
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+# Скрытая колонка FTS5 с именем таблицы: MATCH по ней ищет по всем колонкам индекса
+class SearchDocumentField(models.TextField):
+    pass
+
+
+SearchDocumentField.register_lookup(Match)
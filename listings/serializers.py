@@ -1,10 +1,50 @@
 from django.core.validators import MinLengthValidator, MinValueValidator, MaxValueValidator
+from django.db import transaction
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from .models import Listing, Booking, Review
+from .representation import FastRepresentationMixin
+
+
+def sparse_fieldset(request, available):
+    """
+    Набор полей ответа по параметрам ?fields=a,b (только эти поля) и ?omit=c,d (все, кроме этих).
+    None - параметры не заданы, нужны все поля. Поле id входит в ответ всегда.
+    """
+    params = getattr(request, 'query_params', request.GET)
+    requested, omitted = params.get('fields'), params.get('omit')
+    if requested is None and omitted is None:
+        return None
+
+    def parse(param, value):
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = names - set(available)
+        if unknown:
+            raise serializers.ValidationError({param: [f'Unknown fields: {", ".join(sorted(unknown))}.']})
+        return names
+
+    keep = parse('fields', requested) if requested is not None else set(available)
+    if omitted is not None:
+        keep -= parse('omit', omitted)
+    return keep | {'id'}
+
+
+# Поддержка ?fields= и ?omit= для ответов на GET-запросы
+class SparseFieldsMixin:
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+        keep = sparse_fieldset(request, fields)
+        if keep is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in keep}
 
 
 # Сериализатор для модели Review
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(FastRepresentationMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Review.
     Проверяет, что пользователь бронировал это объявление, прежде чем он может оставить отзыв.
@@ -24,7 +64,8 @@ class ReviewSerializer(serializers.ModelSerializer):
         # Пользователь, который пытается оставить отзыв
         user = self.context['request'].user
         # Объявление, на которое пользователь пытается оставить отзыв
-        listing = data['listing']
+        # (при частичном обновлении отзыва - текущее объявление отзыва)
+        listing = data['listing'] if 'listing' in data else self.instance.listing
         # Бронирование, которое пользователь сделал на это объявление
         booking = Booking.objects.filter(user=user, listing=listing, status='confirmed')
         # Если бронирование не найдено, то пользователь не может оставить отзыв
@@ -33,7 +74,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         return data
 
 # Сериализатор для модели Booking
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(FastRepresentationMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Booking.
     Проверяет корректность дат бронирования и пересечение дат с другими бронированиями.
@@ -54,46 +95,82 @@ class BookingSerializer(serializers.ModelSerializer):
         if data['start_date'] >= data['end_date']:
             raise serializers.ValidationError("End date must be after start date.")
 
-        # Проверка пересечения дат только для создания и подтверждения бронирования
+        # Проверка пересечения дат только для создания и подтверждения бронирования.
+        # Здесь - быстрый отказ без блокировки, окончательная проверка выполняется при сохранении
         if self.instance:
             # Если бронирование уже существует, проверяем статус
             if self.instance.status == 'pending' and data.get('status') == 'confirmed':
                 # Объявление, на которое пользователь сделал бронирование
                 listing = data.get('listing', self.instance.listing)
-                # Бронирования, которые пересекаются с текущим бронированием
-                overlapping_bookings = Booking.objects.filter(
-                    listing=listing,
-                    status='confirmed',  # Проверяем только подтвержденные бронирования
-                    start_date__lt=data['end_date'],
-                    end_date__gt=data['start_date']
-                ).exclude(id=self.instance.id)
-
-                # Если найдены пересекающиеся бронирования, то текущее бронирование не может быть подтверждено
-                if overlapping_bookings.exists():
-                    raise serializers.ValidationError("Эти даты уже забронированы.")
+                self.check_overlap(listing, data['start_date'], data['end_date'], exclude_id=self.instance.id)
         else:
             # Для новых бронирований проверяем пересечение с подтвержденными
-            # Объявление, на которое пользователь сделал бронирование
-            listing = data['listing']
-            # Бронирования, которые пересекаются с текущим бронированием
-            overlapping_bookings = Booking.objects.filter(
-                listing=listing,
-                status='confirmed',  # Проверяем только подтвержденные бронирования
-                start_date__lt=data['end_date'],
-                end_date__gt=data['start_date']
-            )
-
-            # Если найдены пересекающиеся бронирования, то текущее бронирование не может быть подтверждено
-            if overlapping_bookings.exists():
-                raise serializers.ValidationError("Эти даты уже забронированы.")
+            self.check_overlap(data['listing'], data['start_date'], data['end_date'])
 
         return data
 
+    def check_overlap(self, listing, start_date, end_date, exclude_id=None):
+        """
+        Проверяет, что даты не пересекаются с подтвержденными бронированиями объявления.
+        """
+        # Бронирования, которые пересекаются с текущим бронированием
+        overlapping_bookings = Booking.objects.overlapping(listing, start_date, end_date)
+        if exclude_id is not None:
+            overlapping_bookings = overlapping_bookings.exclude(id=exclude_id)
+
+        # Если найдены пересекающиеся бронирования, то текущее бронирование не может быть подтверждено
+        if overlapping_bookings.exists():
+            raise serializers.ValidationError("Эти даты уже забронированы.")
+
+    def create(self, validated_data):
+        """
+        Проверка пересечения и запись выполняются в одной транзакции под блокировкой объявления,
+        поэтому параллельные запросы не могут создать пересекающиеся бронирования.
+        """
+        listing = validated_data['listing']
+        with transaction.atomic():
+            Listing.objects.lock(listing.pk)
+            self.check_overlap(listing, validated_data['start_date'], validated_data['end_date'])
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        """
+        Подтверждение бронирования повторно проверяет пересечение под блокировкой объявления.
+        """
+        with transaction.atomic():
+            if instance.status == 'pending' and validated_data.get('status') == 'confirmed':
+                listing = validated_data.get('listing', instance.listing)
+                Listing.objects.lock(listing.pk)
+                self.check_overlap(listing, validated_data.get('start_date', instance.start_date),
+                                   validated_data.get('end_date', instance.end_date), exclude_id=instance.id)
+            return super().update(instance, validated_data)
+
+# Сериализатор одного бронирования из пакета
+class BookingBatchItemSerializer(serializers.Serializer):
+    """
+    Проверяет одно бронирование из пакетного запроса (объявление берется из запроса,
+    user - id арендатора, которому принадлежит бронирование).
+    Арендаторы пакета проверяются одним запросом в BookingBulkCreateView,
+    пересечения - для всего пакета сразу в BookingQuerySet.bulk_admit.
+    """
+    user = serializers.IntegerField(min_value=1)
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    status = serializers.ChoiceField(choices=['pending', 'confirmed'], default='pending')
+
+    def validate(self, data):
+        # Проверка корректности дат бронирования
+        if data['start_date'] >= data['end_date']:
+            raise serializers.ValidationError("End date must be after start date.")
+        return data
+
+
 # Сериализатор для модели Listing
-class ListingSerializer(serializers.ModelSerializer):
+class ListingSerializer(SparseFieldsMixin, FastRepresentationMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Listing.
     Сериализует отзывы и бронирования, связанные с объявлением.
+    Набор полей ответа можно сократить параметрами ?fields= и ?omit=.
     """
     reviews = ReviewSerializer(many=True, read_only=True)
     bookings = serializers.SerializerMethodField()  # Кастомное поле для бронирований
@@ -101,7 +178,8 @@ class ListingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Listing
         exclude = ['owner']  # Исключаем поле owner
-        read_only_fields = ['is_active']
+        # Агрегаты рейтинга вычисляются по отзывам
+        read_only_fields = ['is_active', 'review_count', 'rating_sum', 'rating_avg']
 
     def get_bookings(self, obj):
         """
@@ -116,14 +194,38 @@ class ListingSerializer(serializers.ModelSerializer):
 
             # Если пользователь аутентифицирован
             if user.is_authenticated:
-                # Если пользователь - арендодатель (владелец объявления)
-                if user == obj.owner:
-                    return BookingSerializer(obj.bookings.all(), many=True).data
+                # Бронирования, подготовленные ListingQuerySet.with_related (если есть)
+                prefetched = getattr(obj, 'visible_bookings', None)
+
+                # Если пользователь - арендодатель (владелец объявления).
+                # Сравниваем по owner_id, чтобы не загружать владельца отдельным запросом
+                if obj.owner_id == user.pk:
+                    bookings = prefetched if prefetched is not None else obj.bookings.all()
+                    return self.serialize_bookings(bookings)
 
                 # Если пользователь - арендатор
                 elif user.role == 'tenant':
-                    return BookingSerializer(obj.bookings.filter(user=user), many=True).data
+                    bookings = prefetched if prefetched is not None else obj.bookings.filter(user=user)
+                    return self.serialize_bookings(bookings)
 
         # Если пользователь не аутентифицирован или нет доступа, возвращаем пустой список
         return []
 
+    def serialize_bookings(self, bookings):
+        """
+        Один сериализатор бронирований на все объявления ответа: его поля строятся один раз,
+        а не заново для каждого объявления.
+        """
+        if not hasattr(self, '_booking_serializer'):
+            self._booking_serializer = BookingSerializer(context=self.context)
+        return [self._booking_serializer.to_representation(booking) for booking in bookings]
+
+
+class ListingExportSerializer(FastRepresentationMixin, serializers.ModelSerializer):
+    """
+    Плоское представление объявления для выгрузки (без вложенных отзывов и бронирований).
+    """
+
+    class Meta:
+        model = Listing
+        exclude = ['owner']
@@ -0,0 +1,65 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidate
+from .models import Booking, Listing, Review
+
+
+def deleted_with_listing(origin):
+    """
+    Отзыв или бронирование удаляется каскадом вместе с объявлением (Listing.delete() или удаление
+    queryset объявлений): агрегаты, отметку изменения и кэш объявления обновлять не нужно.
+    """
+    return isinstance(origin, Listing) or (isinstance(origin, QuerySet) and origin.model is Listing)
+
+
+# Обновление агрегатов рейтинга объявления при создании и изменении отзыва
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    if created:
+        # Новая строка: приращение через F() не зависит от параллельных изменений
+        Listing.objects.filter(pk=instance.listing_id).apply_review_delta(1, instance.rating)
+    else:
+        # Разница с оценкой, загруженной в память, при параллельных изменениях одного отзыва
+        # сдвигала бы rating_sum: пересчитываем по таблице отзывов в транзакции Review.save.
+        # Если отзыв перенесен на другое объявление - пересчитываем и прежнее
+        loaded_listing_id = getattr(instance, '_loaded_listing_id', None) or instance.listing_id
+        Listing.objects.filter(pk__in={loaded_listing_id, instance.listing_id}).recompute_ratings()
+
+    # Следующее сохранение этого объекта считается от текущего объявления
+    instance._loaded_listing_id = instance.listing_id
+
+
+# Обновление агрегатов рейтинга объявления при удалении отзыва
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, origin=None, **kwargs):
+    if deleted_with_listing(origin):
+        return
+    # Пересчет, а не вычитание оценки: повторное удаление того же отзыва агрегаты не сдвигает
+    listing_id = getattr(instance, '_loaded_listing_id', None) or instance.listing_id
+    Listing.objects.filter(pk=listing_id).recompute_ratings()
+
+
+# Сброс кэша ответов списка объявлений при любом изменении объявлений, отзывов и бронирований
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_listing_cache(sender, origin=None, **kwargs):
+    # При каскадном удалении кэш сбрасывается один раз, по удалению самого объявления
+    if sender is Listing or not deleted_with_listing(origin):
+        invalidate()
+
+
+# Удаление отзыва или бронирования не меняет время изменения оставшихся, поэтому для Last-Modified
+# отмечаем изменение на самом объявлении
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Booking)
+def touch_listing_on_delete(sender, instance, origin=None, **kwargs):
+    if deleted_with_listing(origin):
+        return
+    Listing.objects.filter(pk=instance.listing_id).update(updated_at=timezone.now())
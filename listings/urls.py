@@ -1,11 +1,23 @@
+from django.conf import settings
 from django.urls import path
-from .views import (ListingView, ListingDetailView, BookingListCreateView,
-                    ReviewListView, ReviewDetailView, BookingDetailView)
+from . import async_views
+from .views import (ListingView, ListingCacheStatsView, ListingExportView, ListingDetailView,
+                    BookingListCreateView, BookingBulkCreateView, BookingExportView, BookingDetailView,
+                    ReviewListView, ReviewDetailView)
+
+# Под ASGI чтение объявлений и отзывов обслуживают асинхронные view (остальные методы они передают синхронным)
+if settings.ASYNC_READ_VIEWS:
+    ListingView, ListingDetailView, ReviewListView = (
+        async_views.AsyncListingView, async_views.AsyncListingDetailView, async_views.AsyncReviewListView)
 
 urlpatterns = [
     path('', ListingView.as_view(), name='listings'),
+    path('export/', ListingExportView.as_view(), name='listing_export'),
+    path('bookings/export/', BookingExportView.as_view(), name='booking_export'),
+    path('cache/stats/', ListingCacheStatsView.as_view(), name='listing_cache_stats'),
     path('<int:pk>/', ListingDetailView.as_view(), name='listing_detail'),
     path('<int:listing_id>/bookings/', BookingListCreateView.as_view(), name='bookings'),
+    path('<int:listing_id>/bookings/bulk/', BookingBulkCreateView.as_view(), name='booking_bulk_create'),
     path('<int:listing_id>/bookings/<int:pk>/', BookingDetailView.as_view(), name='booking_detail'),
     path('<int:listing_id>/reviews/', ReviewListView.as_view(), name='review_list'),
     path('<int:listing_id>/reviews/<int:pk>/', ReviewDetailView.as_view(), name='review_detail'),
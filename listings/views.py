@@ -1,39 +1,134 @@
 # Create your views here.
+import hashlib
+
 from django.core.mail import send_mail
+from django.http import StreamingHttpResponse
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, filters, status
+from rest_framework.generics import get_object_or_404
 from rest_framework.decorators import permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser, SAFE_METHODS
 from rest_framework.response import Response
 
+from . import cache as listing_cache
+from rental_project.instrumentation import SerializePhaseMixin
+from users.models import User
 from users.permissions import IsLandlord, IsOwnerOrReadOnly, IsTenant, IsReviewOwnerOrReadOnly
-from .models import Listing, Booking, Review
-from .serializers import ListingSerializer, BookingSerializer, ReviewSerializer
+from .facets import compute_facets, parse_facets
+from .filters import FullTextSearchFilter, ListingFilter, ListingOrderingFilter
+from .models import Listing, Booking, Review, related_prefetches
+from .pagination import KeysetPagination
+from .renderers import CSVRenderer, NDJSONRenderer
+from .serializers import (ListingSerializer, BookingSerializer, ReviewSerializer, BookingBatchItemSerializer,
+                          ListingExportSerializer, sparse_fieldset)
+
+
+# Потоковая выгрузка: строки читаются из базы пачками и сразу отдаются клиенту,
+# поэтому память не растет с количеством строк. Формат - ?format=ndjson (по умолчанию) или ?format=csv
+class StreamingExportMixin:
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    pagination_class = None
+    # Количество строк, читаемых из базы за раз
+    chunk_size = 2000
+    # Имя файла выгрузки (без расширения)
+    export_name = 'export'
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # Один экземпляр сериализатора на всю выгрузку: поля строятся один раз
+        serializer = self.get_serializer()
+        rows = (serializer.to_representation(instance) for instance in queryset.iterator(chunk_size=self.chunk_size))
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(renderer.render_rows(rows, list(serializer.fields)),
+                                         content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        response['Content-Disposition'] = f'attachment; filename="{self.export_name}.{renderer.format}"'
+        return response
+
+# Набор полей объявления в ответе (?fields=, ?omit=): по нему сужаются SELECT и подгрузка связей
+class ListingFieldsetMixin:
+
+    def get_fieldset(self):
+        # None - нужны все поля (параметры не заданы или запрос на изменение)
+        if self.request.method not in SAFE_METHODS:
+            return None
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = sparse_fieldset(self.request, ListingSerializer().fields)
+        return self._fieldset
+
 
 # Класс для просмотра и создания объявлений
-class ListingView(generics.ListCreateAPIView):
+class ListingView(ListingFieldsetMixin, SerializePhaseMixin, generics.ListCreateAPIView):
     #Serializer для конвертации данных объявления в JSON
     serializer_class = ListingSerializer
     # Права доступа для просмотра и создания объявлений
     permission_classes = [IsOwnerOrReadOnly]
     # Фильтры для поиска и сортировки объявлений
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    # Поля для фильтрации объявлений
-    filterset_fields = ['price', 'location', 'rooms', 'type', 'is_active']
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, ListingOrderingFilter]
+    # Фильтры объявлений: поля price, location, rooms, type, is_active, min_rating, даты и координаты
+    filterset_class = ListingFilter
     # Поля для поиска по объявлениям
-    search_fields = ['title', 'description']  # Поиск по заголовкам и описанию
-    # Поля для сортировки объявлений
-    ordering_fields = ['price', 'created_at']  # Сортировка по цене и дате
+    search_fields = ['title', 'description']  # Поиск по заголовкам и описанию (индекс FTS5)
+    # Поля для сортировки объявлений: цена, дата, рейтинг и расстояние до точки ?near=
+    ordering_fields = ['price', 'created_at', 'rating_avg', 'distance']
+    # Пагинация: по номеру страницы или по курсору (?pagination=cursor)
+    pagination_class = KeysetPagination
 
     # Метод для получения набора объявлений
     def get_queryset(self):
-        # Показ только активных объявлений, если не задано иное
-        queryset = Listing.objects.all()
+        # Показ только активных объявлений, если не задано иное.
+        # Отзывы и бронирования подгружаются заранее, чтобы избежать N+1 запросов.
+        # Загружаются только нужные ответу колонки и связи (плюс поля сортировки)
+        fields = self.get_fieldset()
+        queryset = (Listing.objects
+                    .with_related(self.request.user, fields)
+                    .only_fields(fields, *self.ordering_fields))
         is_active = self.request.query_params.get('is_active', None)
         if is_active is not None:
             queryset = queryset.filter(is_active=(is_active.lower() == 'true'))
         return queryset
 
+    # Метод для получения списка объявлений.
+    # Ответы анонимным пользователям кэшируются: они не зависят от пользователя, только от параметров запроса
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return self.list_with_facets(request, *args, **kwargs)
+
+        key = listing_cache.response_key(request, role='anonymous')
+        data = listing_cache.get_response(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response = self.list_with_facets(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            listing_cache.set_response(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    # Метод для получения списка объявлений вместе с фасетами (?facets=type,rooms,price,is_active)
+    def list_with_facets(self, request, *args, **kwargs):
+        facets = request.query_params.get('facets')
+        names = parse_facets(facets) if facets is not None else None
+        response = super().list(request, *args, **kwargs)
+        if names is not None and response.status_code == status.HTTP_200_OK:
+            response.data['facets'] = self.get_facets(names)
+        return response
+
+    # Метод для подсчета фасетов по отфильтрованным объявлениям (кэшируется по набору фильтров)
+    def get_facets(self, names):
+        paginator = self.paginator
+        not_filters = {'facets', 'fields', 'omit', 'ordering', paginator.page_query_param, paginator.page_size_query_param,
+                       paginator.cursor_query_param, paginator.mode_query_param, paginator.count_query_param}
+        key = listing_cache.facets_key(self.request, names, exclude=not_filters)
+        facets = listing_cache.get_response(key)
+        if facets is None:
+            facets = compute_facets(self.filter_queryset(self.get_queryset()), names)
+            listing_cache.set_response(key, facets)
+        return facets
+
     # Метод для получения прав доступа
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -49,8 +144,30 @@ class ListingView(generics.ListCreateAPIView):
         # Устанавливаем текущего пользователя владельцем объявления
         serializer.save(owner=self.request.user)
 
+# Выгрузка объявлений арендодателя с теми же фильтрами, поиском и сортировкой, что и в ListingView
+class ListingExportView(StreamingExportMixin, generics.GenericAPIView):
+    serializer_class = ListingExportSerializer
+    permission_classes = [IsAuthenticated, IsLandlord]
+    filter_backends = ListingView.filter_backends
+    filterset_class = ListingView.filterset_class
+    search_fields = ListingView.search_fields
+    ordering_fields = ListingView.ordering_fields
+    # Порядок по умолчанию - по id, чтобы выгрузка была стабильной
+    ordering = ['id']
+    export_name = 'listings'
+
+    def get_queryset(self):
+        return Listing.objects.filter(owner=self.request.user)
+
+# Статистика кэша ответов списка объявлений (только для администраторов)
+class ListingCacheStatsView(generics.GenericAPIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(listing_cache.stats())
+
 # Класс для просмотра, обновления и удаления объявления
-class ListingDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ListingDetailView(ListingFieldsetMixin, SerializePhaseMixin, generics.RetrieveUpdateDestroyAPIView):
     # Набор объявлений
     queryset = Listing.objects.all()
     # Serializer для конвертации данных объявления в JSON
@@ -68,29 +185,69 @@ class ListingDetailView(generics.RetrieveUpdateDestroyAPIView):
             self.permission_classes = [IsAuthenticated]
         return super().get_permissions()
 
+    # Метод для получения объявления вместе с отзывами и бронированиями.
+    # При просмотре связанные данные подгружаются только после проверки условного запроса (см. retrieve)
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return Listing.objects.with_change_markers().only_fields(self.get_fieldset(), 'updated_at')
+        return Listing.objects.with_related(self.request.user)
+
     def get_serializer_context(self):
         return {'request': self.request}
 
+    # Метод для получения объявления с поддержкой условных запросов (If-None-Match, If-Modified-Since).
+    # Если объявление, его отзывы и бронирования не менялись, возвращается 304 без подгрузки
+    # связанных данных и сериализации
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = self.get_validators(instance)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            prefetch_related_objects([instance], *self.get_prefetches())
+            response = Response(self.serialize(instance))
+        return self.set_validators(response, etag, last_modified)
+
+    # Метод для получения подгрузок отзывов и бронирований для ответа
+    def get_prefetches(self):
+        return related_prefetches(self.request.user, self.get_fieldset())
+
+    # Метод для добавления ETag и Last-Modified к ответу
+    def set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Бронирования в ответе зависят от пользователя
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+        return response
+
+    # Метод для вычисления ETag и Last-Modified по отметкам изменений объявления
+    def get_validators(self, instance):
+        timestamps = [timestamp for timestamp in (instance.updated_at, instance.reviews_updated_at,
+                                                  instance.bookings_updated_at) if timestamp is not None]
+        last_modified = int(max(timestamps).timestamp())
+        markers = (instance.pk, instance.updated_at, instance.reviews_count, instance.reviews_last_id,
+                   instance.reviews_updated_at, instance.bookings_count, instance.bookings_last_id,
+                   instance.bookings_updated_at)
+        # В ETag входят пользователь (разные пользователи видят разные бронирования) и набор полей
+        fields = self.get_fieldset()
+        signature = repr((markers, self.request.user.pk, sorted(fields) if fields is not None else None))
+        etag = '"%s"' % hashlib.sha1(signature.encode()).hexdigest()
+        return etag, last_modified
+
 
 # Класс для просмотра и создания бронирований
-class BookingListCreateView(generics.ListCreateAPIView):
+class BookingListCreateView(SerializePhaseMixin, generics.ListCreateAPIView):
     # Serializer для конвертации данных бронирования в JSON
     serializer_class = BookingSerializer
     # Права доступа для просмотра и создания бронирований
     permission_classes = [IsAuthenticated]
+    # Пагинация: по номеру страницы или по курсору (?pagination=cursor)
+    pagination_class = KeysetPagination
 
     # Метод для получения набора бронирований
     def get_queryset(self):
-        # Если пользователь - арендодатель, показать бронирования для его объявлений
-        if self.request.user.role == 'landlord':
-            return Booking.objects.filter(listing__owner=self.request.user).order_by('-created_at')
-
-        # Если пользователь - арендатор, показать только его бронирования
-        elif self.request.user.role == 'tenant':
-            return Booking.objects.filter(user=self.request.user).order_by('-created_at')
-
-        # Для остальных случаев - пустой queryset
-        return Booking.objects.none()
+        # Арендодатель видит бронирования своих объявлений, арендатор - только свои
+        return Booking.objects.visible_to(self.request.user).order_by('-created_at')
 
     # Метод для создания нового бронирования
     def perform_create(self, serializer):
@@ -98,8 +255,75 @@ class BookingListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
+# Выгрузка бронирований с той же видимостью, что и в BookingListCreateView
+class BookingExportView(StreamingExportMixin, generics.GenericAPIView):
+    serializer_class = BookingSerializer
+    permission_classes = [IsAuthenticated]
+    export_name = 'bookings'
+
+    def get_queryset(self):
+        return Booking.objects.visible_to(self.request.user).order_by('id')
+
+
+# Класс для пакетного создания бронирований (например, из channel manager)
+class BookingBulkCreateView(generics.GenericAPIView):
+    # Serializer для ответа с созданными бронированиями
+    serializer_class = BookingSerializer
+    # Только арендодатели могут загружать бронирования своих объявлений
+    permission_classes = [IsAuthenticated, IsLandlord]
+    # Максимальное количество бронирований в одном запросе
+    max_batch_size = 1000
+
+    # Метод для создания пакета бронирований
+    def post(self, request, *args, **kwargs):
+        listing = get_object_or_404(Listing, pk=self.kwargs['listing_id'])
+        if listing.owner_id != request.user.pk:
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'error': 'Expected a list of bookings'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_batch_size:
+            return Response({'error': f'No more than {self.max_batch_size} bookings per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Проверка каждого бронирования по отдельности (арендатор, даты, статус)
+        results = [None] * len(items)
+        checked = []
+        for index, item in enumerate(items):
+            item_serializer = BookingBatchItemSerializer(data=item)
+            if item_serializer.is_valid():
+                checked.append((index, item_serializer.validated_data))
+            else:
+                results[index] = {'index': index, 'status': 'error', 'errors': item_serializer.errors}
+
+        # Бронирования принадлежат арендаторам, а не загрузившему пакет арендодателю: все id - одним запросом
+        tenants = set(User.objects.filter(pk__in={item['user'] for _, item in checked}, role='tenant')
+                      .values_list('pk', flat=True))
+        valid_indexes, valid_items = [], []
+        for index, item in checked:
+            if item['user'] in tenants:
+                valid_indexes.append(index)
+                valid_items.append(item)
+            else:
+                results[index] = {'index': index, 'status': 'error', 'errors': {'user': ["Арендатор не найден."]}}
+
+        # Проверка пересечений и запись - одной транзакцией для всего пакета
+        created, conflicts = Booking.objects.bulk_admit(listing, valid_items)
+        for position, index in enumerate(valid_indexes):
+            if position in conflicts:
+                results[index] = {'index': index, 'status': 'error',
+                                  'errors': {'non_field_errors': ["Эти даты уже забронированы."]}}
+            else:
+                results[index] = {'index': index, 'status': 'created',
+                                  'booking': self.get_serializer(created[position]).data}
+
+        response_status = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        return Response({'created': len(created), 'results': results}, status=response_status)
+
+
 # Класс для просмотра, обновления и удаления бронирования
-class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BookingDetailView(SerializePhaseMixin, generics.RetrieveUpdateDestroyAPIView):
     # Набор бронирований
     queryset = Booking.objects.all()
     # Serializer для конвертации данных бронирования в JSON
@@ -113,8 +337,18 @@ class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
         # Проверка прав арендодателя для подтверждения бронирования
         if booking.listing.owner == request.user:
             if 'status' in request.data and request.data['status'] in ['confirmed', 'cancelled']:
-                booking.status = request.data['status']
-                booking.save()
+                # Проверка пересечения и подтверждение - в одной транзакции под блокировкой объявления
+                with transaction.atomic():
+                    if request.data['status'] == 'confirmed':
+                        Listing.objects.lock(booking.listing_id)
+                        overlapping_bookings = Booking.objects.overlapping(
+                            booking.listing_id, booking.start_date, booking.end_date
+                        ).exclude(id=booking.id)
+                        if overlapping_bookings.exists():
+                            return Response({'error': 'Эти даты уже забронированы.'},
+                                            status=status.HTTP_400_BAD_REQUEST)
+                    booking.status = request.data['status']
+                    booking.save()
                 return Response({'message': 'Booking updated successfully'}, status=status.HTTP_200_OK)
         # Проверка на отмену бронирования арендатором
         elif booking.user == request.user and booking.status == 'pending' and request.data.get('status') == 'cancelled':
@@ -139,7 +373,7 @@ class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Класс для просмотра, обновления и удаления отзыва
-class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ReviewDetailView(SerializePhaseMixin, generics.RetrieveUpdateDestroyAPIView):
     # Набор отзывов
     queryset = Review.objects.all()
     # Serializer для конвертации данных отзыва в JSON
@@ -153,7 +387,7 @@ class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
         serializer.save(user=self.request.user)
 
 # View для просмотра всех отзывов для конкретного объявления
-class ReviewListView(generics.ListAPIView):
+class ReviewListView(SerializePhaseMixin, generics.ListAPIView):
     # Serializer для конвертации данных отзыва в JSON
     serializer_class = ReviewSerializer
     # Права доступа для просмотра отзывов
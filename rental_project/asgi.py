@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rental_project.settings')
+# Чтение объявлений и отзывов - асинхронными view (ASYNC_READ_VIEWS в settings.py)
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
 application = get_asgi_application()
+
+# Черный список refresh-токенов загружается в память при старте (users/blacklist.py)
+from users.blacklist import warm  # noqa: E402
+
+warm()
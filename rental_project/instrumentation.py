@@ -0,0 +1,178 @@
+# Инструментирование запросов: время и количество SQL-запросов, время основных фаз запроса.
+# Результат - заголовок Server-Timing и строка лога rental_project.instrumentation на запрос.
+# Измеряется только выборка запросов (INSTRUMENTATION_SAMPLE_RATE), остальные проходят без накладных расходов
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager, nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTiming:
+    """
+    Измерения одного запроса. Экземпляр подключается к соединениям с базой как execute_wrapper
+    и считает запросы и их суммарное время; фазы отмечаются контекстным менеджером phase().
+    Время фазы не включает запросы к базе внутри нее, поэтому total = db + фазы + app
+    (фазы не должны быть вложены друг в друга).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.queries = 0
+        self.db = 0.0
+        self.phases = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def install(self):
+        # Соединения привязаны к потоку: вызывается в потоке, где выполняются запросы к базе
+        for connection in connections.all():
+            connection.execute_wrappers.append(self)
+
+    def uninstall(self):
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+    @contextmanager
+    def phase(self, name):
+        started, db = time.perf_counter(), self.db
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started - (self.db - db)
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def metrics(self):
+        """
+        Длительности в миллисекундах. app - время вне базы и отмеченных фаз:
+        код view, остальные middleware.
+        """
+        metrics = {'total': self.total, 'db': self.db, **self.phases}
+        metrics['app'] = max(0.0, self.total - self.db - sum(self.phases.values()))
+        return {name: round(value * 1000, 3) for name, value in metrics.items()}
+
+    def server_timing(self):
+        entries = []
+        for name, duration in self.metrics().items():
+            entry = f'{name};dur={duration}'
+            if name == 'db':
+                entry += f';desc="{self.queries} queries"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+
+def phase(request, name):
+    """
+    Отмечает фазу запроса (например, проверку JWT в JWTAuthenticationMiddleware или рендеринг ответа).
+    Для запросов вне выборки ничего не измеряет. Принимает HttpRequest или Request DRF.
+    """
+    timing = getattr(request, 'timing', None)
+    return nullcontext() if timing is None else timing.phase(name)
+
+
+class SerializePhaseMixin:
+    """
+    Примесь к generic view DRF: list и retrieve отмечают сериализацию ответа (serializer.data)
+    фазой serialize. Свои методы view сериализуют через self.serialize().
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serialize(page, many=True))
+        return Response(self.serialize(queryset, many=True))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.serialize(self.get_object()))
+
+    def serialize(self, *args, **kwargs):
+        serializer = self.get_serializer(*args, **kwargs)
+        with phase(self.request, 'serialize'):
+            return serializer.data
+
+
+class InstrumentationMiddleware:
+    """
+    Измеряет долю запросов INSTRUMENTATION_SAMPLE_RATE (0 - выключено, 1 - все запросы):
+    добавляет заголовок Server-Timing (если INSTRUMENTATION_SERVER_TIMING) и пишет строку лога
+    в формате JSON. Должен стоять первым в MIDDLEWARE, чтобы total включал остальные middleware.
+    Потоковые ответы (экспорт) измеряются до начала отдачи.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        self.server_timing = settings.INSTRUMENTATION_SERVER_TIMING
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        request.timing = timing = RequestTiming()
+        timing.install()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.uninstall()
+        return self.report(request, response, timing)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        request.timing = timing = RequestTiming()
+        # Синхронный код запроса (ORM, синхронные view и middleware) выполняется в одном потоке
+        # (thread_sensitive): execute_wrapper подключается к соединениям этого потока
+        await sync_to_async(timing.install)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(timing.uninstall)()
+        return self.report(request, response, timing)
+
+    def report(self, request, response, timing):
+        timing.finish()
+        if self.server_timing:
+            response['Server-Timing'] = timing.server_timing()
+        if logger.isEnabledFor(logging.INFO):
+            self.log(request, response, timing)
+        return response
+
+    @staticmethod
+    def log(request, response, timing):
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match else None,
+            'status': response.status_code,
+            'queries': timing.queries,
+            **{f'{name}_ms': duration for name, duration in timing.metrics().items()},
+        }
+        logger.info(json.dumps(record, ensure_ascii=False), extra={'timing': record})
@@ -0,0 +1,43 @@
+# Быстрые парсеры тела запроса: orjson для JSON и MessagePack (см. renderers.py)
+import codecs
+
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from .renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+
+
+class ORJSONParser(parsers.JSONParser):
+    """
+    JSON через orjson. NaN и Infinity, как и в строгом режиме DRF, не принимаются.
+    Тело в кодировке, отличной от UTF-8 (charset в Content-Type), перекодируется перед разбором.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        encoding = parsers.get_encoding(parser_context or {})
+        content = stream.read()
+        try:
+            # orjson разбирает только UTF-8
+            if codecs.lookup(encoding).name != 'utf-8':
+                content = content.decode(encoding)
+            return orjson.loads(content)
+        except (UnicodeDecodeError, orjson.JSONDecodeError) as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackParser(parsers.BaseParser):
+    """
+    MessagePack (application/msgpack).
+    """
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            # Ограничения размеров строк и массивов unpackb берет из длины входных данных
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
@@ -0,0 +1,270 @@
+# Профилирование отдельных запросов по требованию: view, сериализация и рендеринг ответа.
+# Запрос профилируется, если у него есть подписанный заголовок X-Profile (manage.py profiling_token),
+# параметр ?profile= от staff-пользователя или он попал в выборку PROFILING_SAMPLE_RATE.
+# Результат - файл .prof (cProfile, для pstats/snakeviz) или .collapsed (свернутые стеки для flame graph:
+# flamegraph.pl, speedscope) в каталоге PROFILING_DIR с ограничением количества и размера файлов
+import cProfile
+import logging
+import os
+import random
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from rest_framework.exceptions import APIException
+
+from users.authentication import JWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'X-Profile'
+META_HEADER = 'HTTP_X_PROFILE'
+QUERY_PARAMETER = 'profile'
+SALT = 'rental_project.profiling'
+
+
+class CProfileProfiler:
+    """
+    Детерминированный профиль cProfile: время и количество вызовов каждой функции.
+    """
+    suffix = '.prof'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+class StackSampler:
+    """
+    Сэмплирующий профилировщик: отдельный поток раз в interval секунд снимает стек потока запроса.
+    Результат - свернутые стеки ("модуль:функция;...;модуль:функция количество"), корень - вызов view.
+    Поток получает GIL не чаще sys.getswitchinterval(), поэтому фактический интервал может быть больше.
+    """
+    suffix = '.collapsed'
+
+    def __init__(self, interval=None):
+        self.interval = settings.PROFILING_INTERVAL if interval is None else interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        # Кадры над точкой входа одинаковы во всех образцах и в стек не попадают
+        self._skip = self.depth(sys._getframe(1))
+        self._thread = threading.Thread(target=self.run, name='profiling-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.stacks[self.collapse(frame)] += 1
+
+    @staticmethod
+    def depth(frame):
+        depth = 0
+        while frame is not None:
+            depth += 1
+            frame = frame.f_back
+        return depth
+
+    def collapse(self, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            # co_qualname (с именем класса) - с Python 3.11
+            name = getattr(code, 'co_qualname', code.co_name)
+            names.append(f'{frame.f_globals.get("__name__", code.co_filename)}:{name}')
+            frame = frame.f_back
+        names.reverse()
+        return ';'.join(names[self._skip:])
+
+    def dump(self, path):
+        with open(path, 'w') as file:
+            for stack, count in self.stacks.most_common():
+                if stack:
+                    file.write(f'{stack} {count}\n')
+
+
+PROFILERS = {'prof': CProfileProfiler, 'collapsed': StackSampler}
+
+
+def make_token(profile_format='prof'):
+    """
+    Значение заголовка X-Profile: подписано SECRET_KEY, действует PROFILING_TOKEN_MAX_AGE секунд.
+    """
+    if profile_format not in PROFILERS:
+        raise ValueError(f'Unknown profile format: {profile_format}')
+    return signing.dumps({'format': profile_format}, salt=SALT)
+
+
+def read_token(value):
+    """
+    Формат профиля из заголовка X-Profile или None, если подпись неверна или истекла.
+    """
+    try:
+        data = signing.loads(value, salt=SALT, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    profile_format = data.get('format') if isinstance(data, dict) else None
+    return profile_format if profile_format in PROFILERS else None
+
+
+class ProfileStorage:
+    """
+    Каталог профилей. После записи удаляются самые старые файлы, пока их больше max_files
+    или их общий размер больше max_total_size; профиль больше max_file_size не сохраняется.
+    """
+
+    def __init__(self, directory, max_files, max_file_size, max_total_size):
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.max_file_size = max_file_size
+        self.max_total_size = max_total_size
+
+    def save(self, profiler, request, response):
+        """
+        Записывает профиль и возвращает путь к файлу или None, если профиль слишком большой.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_')[:60] or 'root'
+        name = (f'{datetime.now().strftime("%Y%m%dT%H%M%S.%f")}-{os.getpid()}-{request.method}-{slug}-'
+                f'{response.status_code}{profiler.suffix}')
+        path = self.directory / name
+        # Файл появляется под своим именем только целиком (ротация в других процессах его не увидит недописанным)
+        temporary = path.with_name(f'.{name}.tmp')
+        profiler.dump(temporary)
+        size = temporary.stat().st_size
+        if size > self.max_file_size:
+            temporary.unlink()
+            logger.warning('Profile of %s %s is %d bytes, limit %d: not saved',
+                           request.method, request.path, size, self.max_file_size)
+            return None
+        os.replace(temporary, path)
+        self.rotate()
+        return path
+
+    def rotate(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(tuple(profiler.suffix for profiler in PROFILERS.values())):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # Удален другим процессом
+                    continue
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        files.sort()
+        total = sum(size for _, _, size in files)
+        while files and (len(files) > self.max_files or total > self.max_total_size):
+            _, name, size = files.pop(0)
+            (self.directory / name).unlink(missing_ok=True)
+            total -= size
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует запрос по требованию (см. комментарий в начале модуля). Стоит последним в MIDDLEWARE:
+    профиль охватывает view, сериализацию и рендеринг. Имя файла профиля возвращается в заголовке
+    X-Profile ответа на запрос с заголовком или параметром (не на запросы из выборки).
+    Под ASGI профилируется синхронная часть запроса (синхронные view, ORM, сериализация, рендеринг);
+    код корутин асинхронных view выполняется в цикле событий и в профиль не попадает.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.default_format = settings.PROFILING_FORMAT
+        self.storage = ProfileStorage(settings.PROFILING_DIR, settings.PROFILING_MAX_FILES,
+                                      settings.PROFILING_MAX_FILE_SIZE, settings.PROFILING_MAX_TOTAL_SIZE)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        trigger = self.trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+        return self.handle(request, trigger, self.get_response)
+
+    async def __acall__(self, request):
+        trigger = self.trigger(request)
+        if trigger is None:
+            return await self.get_response(request)
+        # Синхронный код запроса (thread_sensitive) выполняется в потоке, где включен профилировщик
+        return await sync_to_async(self.handle)(request, trigger, async_to_sync(self.get_response))
+
+    def trigger(self, request):
+        """
+        Причина профилирования без проверки прав: 'header', 'flag', 'sample' или None.
+        """
+        if META_HEADER in request.META:
+            return 'header'
+        if QUERY_PARAMETER in request.GET:
+            return 'flag'
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return 'sample'
+        return None
+
+    def authorize(self, request, trigger):
+        """
+        Формат профиля или None, если профилировать запрос нельзя.
+        """
+        if trigger == 'header':
+            return read_token(request.META[META_HEADER])
+        if trigger == 'flag':
+            value = request.GET[QUERY_PARAMETER]
+            profile_format = value if value in PROFILERS else self.default_format
+            return profile_format if self.is_staff(request) else None
+        return self.default_format
+
+    @staticmethod
+    def is_staff(request):
+        # Пользователь сессии (админка) или JWT-токена; токен DRF проверит повторно уже из кэша
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return True
+        try:
+            authenticated = JWTAuthentication().authenticate(request)
+        except APIException:
+            return False
+        return authenticated is not None and authenticated[0].is_staff
+
+    def handle(self, request, trigger, get_response):
+        profile_format = self.authorize(request, trigger)
+        if profile_format is None:
+            return get_response(request)
+        with PROFILERS[profile_format]() as profiler:
+            response = get_response(request)
+        try:
+            path = self.storage.save(profiler, request, response)
+        except OSError:
+            logger.exception('Could not save profile of %s %s', request.method, request.path)
+            return response
+        if path is not None and trigger != 'sample':
+            response[HEADER] = path.name
+        return response
@@ -0,0 +1,72 @@
+# Быстрые рендереры ответов API: orjson для JSON и MessagePack.
+# Обе библиотеки необязательны: без orjson используется стандартный JSONRenderer,
+# без msgpack рендерер MessagePack не подключается (см. REST_FRAMEWORK в settings.py)
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+from .instrumentation import phase
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# Decimal, даты, ленивые строки и т.п. кодируются так же, как в стандартном JSON-ответе DRF
+_default = encoders.JSONEncoder().default
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """
+    JSON через orjson. Типы, которые orjson кодирует иначе, чем DRF (Decimal, datetime,
+    date, time), передаются в кодировщик DRF; целые больше 64 бит кодирует сам DRF.
+    Отличия от JSONRenderer (значения при разборе те же или допустимы в JSON):
+    - числа с порядком записываются без знака и ведущего нуля порядка: 1e16 и 1e-7, а не 1e+16 и 1e-07;
+    - NaN и Infinity становятся null (DRF в строгом режиме отказывается их кодировать).
+    """
+    if orjson is not None:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Фаза render в Server-Timing (rental_project/instrumentation.py)
+        with phase((renderer_context or {}).get('request'), 'render'):
+            return self.dumps(data, accepted_media_type, renderer_context)
+
+    def dumps(self, data, accepted_media_type, renderer_context):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        try:
+            content = orjson.dumps(data, default=_default, option=options)
+        except orjson.JSONEncodeError:
+            # Например, целое больше 64 бит: кодирует DRF
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и DRF, экранируем U+2028 и U+2029: ответ остается корректным JavaScript
+        return (content
+                .replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029'))
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """
+    MessagePack (application/msgpack). Значения, которые MessagePack не кодирует сам,
+    приводятся так же, как в JSON-ответе (Decimal - число, даты - строки ISO 8601).
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        with phase((renderer_context or {}).get('request'), 'render'):
+            return msgpack.packb(data, default=_default, use_bin_type=True, datetime=False)
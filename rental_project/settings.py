@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
+from importlib.util import find_spec
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -50,7 +52,7 @@ INSTALLED_APPS = [
 ]
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.JWTAuthentication',
     ],
     # 'DEFAULT_PERMISSION_CLASSES': [
     #     'rest_framework.permissions.IsAuthenticated',
@@ -61,6 +63,18 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.OrderingFilter',  # Добавьте OrderingFilter
     ],
+    # JSON через orjson; MessagePack (application/msgpack) - если установлен msgpack
+    'DEFAULT_RENDERER_CLASSES': [
+        'rental_project.renderers.ORJSONRenderer',
+        *(['rental_project.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rental_project.parsers.ORJSONParser',
+        *(['rental_project.parsers.MessagePackParser'] if find_spec('msgpack') else []),
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SIMPLE_JWT = {
@@ -69,9 +83,63 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.TokenRefreshSerializer',
 }
 
+# Кэш пользователей для JWT-аутентификации (users/cache.py): запись живет не дольше access-токена
+# и сбрасывается при изменении пользователя. Сброс доходит до других процессов только через общий кэш
+# (например, Redis). С кэшем процесса (LocMemCache, как по умолчанию) запись живет USER_CACHE_LOCAL_TIMEOUT
+# секунд: столько другие процессы могут пускать пользователя со старой ролью или после блокировки
+USER_CACHE_ALIAS = 'default'
+USER_CACHE_TIMEOUT = int(SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds())
+USER_CACHE_LOCAL_TIMEOUT = 5
+
+# Размер кэша проверенных access-токенов (users/tokens.py): записи удаляются по истечении токена. 0 - без кэша
+JWT_VERIFIED_TOKEN_CACHE_SIZE = 1024
+
+# Сколько секунд повторные запросы с тем же refresh-токеном получают уже выпущенный middleware
+# access-токен (users/tokens.py, SingleFlight). Перед выдачей refresh-токен проверяется заново,
+# поэтому отозванный токен новых access-токенов не получает. 0 - только одновременные запросы
+JWT_REFRESH_GRACE_PERIOD = 10
+
+# Черный список refresh-токенов в памяти (users/blacklist.py): фильтр Блума на CAPACITY записей
+# с вероятностью ложного срабатывания ERROR_RATE (при срабатывании - точная проверка в базе).
+# О записях из других процессов фильтр узнает через счетчик в кэше TOKEN_BLACKLIST_CACHE_ALIAS,
+# поэтому при нескольких процессах нужен общий кэш (например, Redis).
+# TOKEN_BLACKLIST_BLOOM_FILTER: None - фильтр включен, только если этот кэш общий (не LocMemCache/DummyCache),
+# иначе каждая проверка идет в базу; True - включен всегда (допустимо, только если приложение работает
+# в одном процессе); False - выключен
+TOKEN_BLACKLIST_BLOOM_FILTER = None
+TOKEN_BLACKLIST_BLOOM_CAPACITY = 100_000
+TOKEN_BLACKLIST_BLOOM_ERROR_RATE = 0.001
+TOKEN_BLACKLIST_CACHE_ALIAS = 'default'
+TOKEN_BLACKLIST_SYNC_OVERLAP = 100
+
+# Инструментирование запросов (rental_project/instrumentation.py): доля измеряемых запросов
+# (0 - выключено, 1 - все) и заголовок Server-Timing в ответах. Строки лога - в логгере
+# rental_project.instrumentation. Server-Timing виден клиентам: при необходимости отключите
+INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('INSTRUMENTATION_SAMPLE_RATE', '0.01'))
+INSTRUMENTATION_SERVER_TIMING = True
+
+# Профилирование запросов по требованию (rental_project/profiling.py): заголовок X-Profile
+# (python manage.py profiling_token), параметр ?profile= для staff или доля запросов PROFILING_SAMPLE_RATE.
+# PROFILING_FORMAT - формат по умолчанию: prof (cProfile) или collapsed (свернутые стеки для flame graph).
+# Старые файлы удаляются, когда их больше MAX_FILES или их общий размер больше MAX_TOTAL_SIZE байт
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_FORMAT = 'prof'
+PROFILING_DIR = Path(os.environ.get('PROFILING_DIR', BASE_DIR / 'profiles'))
+# Срок действия подписанного заголовка в секундах
+PROFILING_TOKEN_MAX_AGE = 3600
+# Интервал снятия стека для формата collapsed в секундах
+PROFILING_INTERVAL = 0.001
+PROFILING_MAX_FILES = 200
+PROFILING_MAX_FILE_SIZE = 20 * 1024 * 1024
+PROFILING_MAX_TOTAL_SIZE = 500 * 1024 * 1024
+
 MIDDLEWARE = [
+    # Первым, чтобы измерять все остальные middleware
+    'rental_project.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +148,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'users.middleware.JWTAuthenticationMiddleware',
+    # Последним, чтобы профиль охватывал view, сериализацию и рендеринг
+    'rental_project.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'rental_project.urls'
@@ -110,9 +180,58 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Транзакции сразу берут блокировку записи (BEGIN IMMEDIATE): проверка пересечения
+            # бронирований и запись выполняются атомарно, а конкурирующие запросы ждут, а не падают
+            'transaction_mode': 'IMMEDIATE',
+            # Сколько секунд ждать освобождения блокировки
+            'timeout': 20,
+        },
+        # Тестовая база в файле: в памяти (shared cache) SQLite использует табличные блокировки,
+        # которые не ждут timeout, и параллельные тесты бронирования падали бы с "table is locked"
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Кэш. LocMemCache вытесняет давно не использованные ключи (LRU) при превышении MAX_ENTRIES
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rental-project',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    }
+}
+
+# Кэш ответов списка объявлений для анонимных пользователей
+LISTING_CACHE_ALIAS = 'default'
+# Время жизни ответа в секундах (изменения данных сбрасывают кэш раньше)
+LISTING_CACHE_TIMEOUT = 60
+
+# Асинхронные view чтения объявлений и отзывов (listings/async_views.py).
+# Включаются при запуске через ASGI (см. asgi.py); под WSGI каждый async view стоил бы лишнего перехода в event loop
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', '0') == '1'
+
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'rental_project.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
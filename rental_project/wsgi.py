@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rental_project.settings')
 
 application = get_wsgi_application()
+
+# Черный список refresh-токенов загружается в память при старте (users/blacklist.py)
+from users.blacklist import warm  # noqa: E402
+
+warm()
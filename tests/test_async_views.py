@@ -0,0 +1,155 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, RequestFactory
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import AccessToken
+from listings.async_views import AsyncListingView, AsyncListingDetailView, AsyncReadView, AsyncReviewListView
+from listings.models import Listing, Booking, Review
+from listings.views import ListingView, ListingDetailView, ReviewListView
+
+User = get_user_model()
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+@pytest.fixture
+def create_users():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    return tenant, landlord
+
+@pytest.fixture
+def create_listings(create_users):
+    tenant, landlord = create_users
+    listings = []
+    for i in range(13):
+        listing = Listing.objects.create(owner=landlord, title=f"Квартира {i}", description="Светлая квартира у парка",
+                                         location="Berlin", price=500 + i * 100, rooms=1 + i % 3,
+                                         type='apartment', latitude=52.5 + i / 100, longitude=13.4)
+        Review.objects.create(listing=listing, user=tenant, rating=1 + i % 5, comment="Хорошо")
+        Booking.objects.create(listing=listing, user=tenant, start_date='2024-09-20', end_date='2024-09-25')
+        listings.append(listing)
+    return listings
+
+def headers_for(user, extra=None):
+    headers = dict(extra or {})
+    if user is not None:
+        headers['Authorization'] = f'Bearer {AccessToken.for_user(user)}'
+    return headers
+
+def call_sync(view_class, path, user=None, data=None, extra=None, **kwargs):
+    request = RequestFactory().get(path, data or {}, headers=headers_for(user, extra))
+    response = view_class.as_view()(request, **kwargs)
+    response.render()
+    return response
+
+def call_async(view_class, path, user=None, data=None, extra=None, method='get', **kwargs):
+    factory = AsyncRequestFactory()
+    if method == 'get':
+        request = factory.get(path, data or {}, headers=headers_for(user, extra))
+    else:
+        request = factory.post(path, data, content_type='application/json', headers=headers_for(user, extra))
+    return async_to_sync(view_class.as_view())(request, **kwargs)
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [
+    {}, {'page': 2}, {'page': 'last'}, {'ordering': '-price'}, {'fields': 'title,price,bookings'},
+    {'search': 'квартира'}, {'near': '52.55,13.4', 'radius': 5, 'ordering': 'distance'},
+    {'is_active': 'true', 'rooms': 2},
+])
+def test_listing_list_matches_sync_view(create_users, create_listings, params):
+    for user in (*create_users, None):
+        cache.clear()
+        expected = call_sync(ListingView, '/listings/', user, params)
+        response = call_async(AsyncListingView, '/listings/', user, params)
+        assert response.status_code == expected.status_code == 200
+        assert response.content == expected.content
+        assert response['Content-Type'] == expected['Content-Type']
+
+@pytest.mark.django_db
+def test_listing_list_errors_match_sync_view(create_users, create_listings):
+    tenant, _ = create_users
+    for params in ({'page': 99}, {'bbox': '1,2'}, {'fields': 'unknown'}):
+        expected = call_sync(ListingView, '/listings/', tenant, params)
+        response = call_async(AsyncListingView, '/listings/', tenant, params)
+        assert response.status_code == expected.status_code
+        assert response.content == expected.content
+
+@pytest.mark.django_db
+def test_listing_list_same_queries(create_users, create_listings, django_assert_num_queries):
+    tenant, _ = create_users
+    # Пользователь, COUNT, страница, отзывы и бронирования
+    with django_assert_num_queries(5):
+        response = call_async(AsyncListingView, '/listings/', tenant)
+    assert response.status_code == 200
+    assert len(response.data['results']) == 10
+
+@pytest.mark.django_db
+def test_anonymous_listing_list_is_cached(create_listings):
+    assert call_async(AsyncListingView, '/listings/')['X-Cache'] == 'MISS'
+    assert call_async(AsyncListingView, '/listings/')['X-Cache'] == 'HIT'
+
+@pytest.mark.django_db
+def test_listing_detail_matches_sync_view(create_users, create_listings):
+    listing = create_listings[0]
+    for user in create_users:
+        expected = call_sync(ListingDetailView, f'/listings/{listing.id}/', user, pk=listing.id)
+        response = call_async(AsyncListingDetailView, f'/listings/{listing.id}/', user, pk=listing.id)
+        assert response.status_code == 200
+        assert response.content == expected.content
+        assert response['ETag'] == expected['ETag']
+
+        not_modified = call_async(AsyncListingDetailView, f'/listings/{listing.id}/', user,
+                                  extra={'If-None-Match': response['ETag']}, pk=listing.id)
+        assert not_modified.status_code == 304
+
+@pytest.mark.django_db
+def test_listing_detail_not_found_and_unauthenticated(create_users, create_listings):
+    tenant, _ = create_users
+    assert call_async(AsyncListingDetailView, '/listings/0/', tenant, pk=0).status_code == 404
+    response = call_async(AsyncListingDetailView, f'/listings/{create_listings[0].id}/', pk=create_listings[0].id)
+    assert response.status_code == 401
+    assert response['WWW-Authenticate'].startswith('Bearer')
+
+@pytest.mark.django_db
+def test_invalid_token_rejected(create_listings):
+    response = call_async(AsyncListingView, '/listings/', extra={'Authorization': 'Bearer invalid'})
+    assert response.status_code == 401
+    assert response.data['code'] == 'token_not_valid'
+
+@pytest.mark.django_db
+def test_inactive_user_rejected(create_users, create_listings):
+    tenant, _ = create_users
+    tenant.is_active = False
+    tenant.save()
+    response = call_async(AsyncReviewListView, f'/listings/{create_listings[0].id}/reviews/', tenant,
+                          listing_id=create_listings[0].id)
+    assert response.status_code == 401
+
+@pytest.mark.django_db
+def test_review_list_matches_sync_view(create_users, create_listings):
+    tenant, _ = create_users
+    listing = create_listings[0]
+    expected = call_sync(ReviewListView, f'/listings/{listing.id}/reviews/', tenant, listing_id=listing.id)
+    response = call_async(AsyncReviewListView, f'/listings/{listing.id}/reviews/', tenant, listing_id=listing.id)
+    assert response.status_code == 200
+    assert response.content == expected.content
+
+@pytest.mark.django_db
+def test_other_requests_use_sync_view(create_users, create_listings):
+    tenant, landlord = create_users
+    response = call_async(AsyncListingView, '/listings/', landlord, method='post', data={
+        'title': 'Новая квартира', 'description': 'Описание', 'location': 'Berlin', 'price': '800.00',
+        'rooms': 2, 'type': 'apartment'})
+    assert response.status_code == 201
+    assert Listing.objects.filter(title='Новая квартира').exists()
+
+    response = call_async(AsyncListingView, '/listings/', tenant, {'facets': 'type'})
+    assert response.status_code == 200
+    assert 'facets' in response.data
+
+def test_async_read_view_requires_get_response():
+    with pytest.raises(TypeError):
+        AsyncReadView()
@@ -0,0 +1,75 @@
+import pytest
+from rest_framework.test import APIClient
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking
+
+User = get_user_model()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def create_listings():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    listings = [
+        Listing.objects.create(owner=landlord, title=f"Listing {i}", description="", location="Test City",
+                               price=100, rooms=2, type='apartment')
+        for i in range(4)
+    ]
+    # 0 - подтвержденная бронь 20-25, 1 - ожидающая бронь 20-25, 2 - подтвержденная бронь 25-30, 3 - свободно
+    Booking.objects.create(listing=listings[0], user=tenant, start_date='2024-09-20', end_date='2024-09-25',
+                           status='confirmed')
+    Booking.objects.create(listing=listings[1], user=tenant, start_date='2024-09-20', end_date='2024-09-25',
+                           status='pending')
+    Booking.objects.create(listing=listings[2], user=tenant, start_date='2024-09-25', end_date='2024-09-30',
+                           status='confirmed')
+    return listings
+
+def available(api_client, params):
+    response = api_client.get(reverse('listings'), params)
+    assert response.status_code == 200
+    return sorted(item['title'] for item in response.data['results'])
+
+@pytest.mark.django_db
+def test_available_between(api_client, create_listings):
+    assert available(api_client, {'available_from': '2024-09-21', 'available_to': '2024-09-23'}) == [
+        'Listing 1', 'Listing 2', 'Listing 3']
+    # Выезд в день заезда следующего гостя не считается пересечением
+    assert available(api_client, {'available_from': '2024-09-18', 'available_to': '2024-09-25'}) == [
+        'Listing 1', 'Listing 2', 'Listing 3']
+    assert available(api_client, {'available_from': '2024-09-24', 'available_to': '2024-09-26'}) == [
+        'Listing 1', 'Listing 3']
+
+@pytest.mark.django_db
+def test_available_open_period(api_client, create_listings):
+    assert available(api_client, {'available_from': '2024-09-26'}) == ['Listing 0', 'Listing 1', 'Listing 3']
+    assert available(api_client, {'available_to': '2024-09-21'}) == ['Listing 1', 'Listing 2', 'Listing 3']
+
+@pytest.mark.django_db
+def test_availability_is_single_anti_join(api_client, create_listings):
+    with CaptureQueriesContext(connection) as context:
+        available(api_client, {'available_from': '2024-09-21', 'available_to': '2024-09-23'})
+    listing_queries = [query['sql'] for query in context.captured_queries
+                       if query['sql'].startswith('SELECT "listings_listing"')]
+    assert len(listing_queries) == 1
+    assert 'NOT EXISTS' in listing_queries[0]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + listing_queries[0])
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        assert 'booking_listing_status_dates' in plan
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [
+    {'available_from': '2024-09-25', 'available_to': '2024-09-21'},
+    {'available_from': '2024-09-21', 'available_to': '2024-09-21'},
+])
+def test_empty_period_rejected(api_client, create_listings, params):
+    response = api_client.get(reverse('listings'), params)
+    assert response.status_code == 400
+    assert 'available_to' in response.data
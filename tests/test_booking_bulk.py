@@ -0,0 +1,104 @@
+import pytest
+from rest_framework.test import APIClient
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking
+
+User = get_user_model()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def create_users():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    return tenant, landlord
+
+@pytest.fixture
+def create_listing(create_users):
+    tenant, landlord = create_users
+    listing = Listing.objects.create(owner=landlord, title="Test Listing", description="", location="Test City",
+                                     price=100, rooms=2, type='apartment')
+    # Уже подтвержденное бронирование 10-15 сентября
+    Booking.objects.create(listing=listing, user=tenant, start_date='2024-09-10', end_date='2024-09-15',
+                           status='confirmed')
+    return listing
+
+def bulk_url(listing):
+    return reverse('booking_bulk_create', args=[listing.id])
+
+@pytest.mark.django_db
+def test_bulk_create_reports_each_item(api_client, create_users, create_listing):
+    tenant, landlord = create_users
+    api_client.force_authenticate(user=landlord)
+    items = [
+        {'start_date': '2024-09-01', 'end_date': '2024-09-05', 'status': 'confirmed'},
+        {'start_date': '2024-09-14', 'end_date': '2024-09-18'},  # пересекается с подтвержденным
+        {'start_date': '2024-09-20', 'end_date': '2024-09-25', 'status': 'confirmed'},
+        {'start_date': '2024-09-22', 'end_date': '2024-09-27', 'status': 'confirmed'},  # с предыдущим из пакета
+        {'start_date': '2024-09-30', 'end_date': '2024-09-29'},  # неверные даты
+        {'start_date': '2024-09-05', 'end_date': '2024-09-10'},  # вплотную к соседним - допустимо
+        {'start_date': '2024-09-08', 'end_date': '2024-09-20'},  # накрывает подтвержденное целиком
+    ]
+    response = api_client.post(bulk_url(create_listing), [{'user': tenant.pk, **item} for item in items],
+                               format='json')
+    assert response.status_code == 201
+    assert response.data['created'] == 3
+    statuses = [item['status'] for item in response.data['results']]
+    assert statuses == ['created', 'error', 'created', 'error', 'error', 'created', 'error']
+    assert response.data['results'][0]['booking']['status'] == 'confirmed'
+    assert 'non_field_errors' in response.data['results'][4]['errors']
+    assert Booking.objects.filter(listing=create_listing).count() == 4
+    # Бронирования принадлежат арендатору, а не загрузившему пакет арендодателю
+    assert not Booking.objects.filter(user=landlord).exists()
+
+@pytest.mark.django_db
+def test_bulk_pending_bookings_may_overlap(api_client, create_users, create_listing):
+    tenant, landlord = create_users
+    other = User.objects.create_user(username='other', email='other@example.com', password=None, role='tenant')
+    api_client.force_authenticate(user=landlord)
+    response = api_client.post(bulk_url(create_listing), [
+        {'user': tenant.pk, 'start_date': '2024-09-20', 'end_date': '2024-09-25'},
+        {'user': other.pk, 'start_date': '2024-09-22', 'end_date': '2024-09-27'},  # заявки могут пересекаться
+        {'user': other.pk, 'start_date': '2024-10-03', 'end_date': '2024-10-08'},  # с подтвержденным из пакета
+        {'user': tenant.pk, 'start_date': '2024-10-05', 'end_date': '2024-10-10', 'status': 'confirmed'},
+    ], format='json')
+    assert response.status_code == 201
+    statuses = [item['status'] for item in response.data['results']]
+    assert statuses == ['created', 'created', 'error', 'created']
+    assert response.data['results'][1]['booking']['user'] == other.pk
+
+@pytest.mark.django_db
+def test_bulk_bookings_require_tenant(api_client, create_users, create_listing):
+    tenant, landlord = create_users
+    api_client.force_authenticate(user=landlord)
+    response = api_client.post(bulk_url(create_listing), [
+        {'user': landlord.pk, 'start_date': '2024-09-20', 'end_date': '2024-09-25'},
+        {'user': 10_000, 'start_date': '2024-09-20', 'end_date': '2024-09-25'},
+        {'start_date': '2024-09-20', 'end_date': '2024-09-25'},
+    ], format='json')
+    assert response.status_code == 400
+    assert response.data['created'] == 0
+    assert all('user' in item['errors'] for item in response.data['results'])
+
+@pytest.mark.django_db
+def test_bulk_create_query_count_is_constant(api_client, create_users, create_listing, django_assert_max_num_queries):
+    tenant, landlord = create_users
+    api_client.force_authenticate(user=landlord)
+    items = [{'user': tenant.pk, 'start_date': f'2025-01-{day:02d}', 'end_date': f'2025-01-{day + 1:02d}'}
+             for day in range(1, 30)]
+    # Объявление, арендаторы, блокировка, подтвержденные бронирования, вставка и служебные запросы транзакции
+    with django_assert_max_num_queries(9):
+        response = api_client.post(bulk_url(create_listing), items, format='json')
+    assert response.data['created'] == 29
+
+@pytest.mark.django_db
+def test_bulk_create_requires_listing_owner(api_client, create_users, create_listing):
+    tenant, _ = create_users
+    other = User.objects.create_user(username='other', email='other@example.com', password=None, role='landlord')
+    for user in (tenant, other):
+        api_client.force_authenticate(user=user)
+        response = api_client.post(bulk_url(create_listing), [], format='json')
+        assert response.status_code == 403
@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+from rest_framework.test import APIClient
+from django.db import connection
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking
+
+User = get_user_model()
+
+# Количество параллельных запросов на каждое объявление
+THREADS_PER_LISTING = 8
+
+@pytest.fixture
+def create_users():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    return tenant, landlord
+
+@pytest.fixture
+def create_listings(create_users):
+    _, landlord = create_users
+    return [
+        Listing.objects.create(owner=landlord, title=f"Listing {i}", description="", location="Test City",
+                               price=100, rooms=2, type='apartment')
+        for i in range(3)
+    ]
+
+def run_concurrently(requests):
+    # Запускает запросы одновременно в отдельных потоках и возвращает коды ответов
+    barrier = threading.Barrier(len(requests))
+    results = [None] * len(requests)
+
+    def worker(index, request):
+        try:
+            barrier.wait()
+            results[index] = request().status_code
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(index, request)) for index, request in enumerate(requests)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(f'{len(requests)} concurrent requests in {elapsed:.3f}s ({len(requests) / elapsed:.1f} req/s)')
+    return results
+
+def post_confirmed_booking(user, listing):
+    def request():
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client.post(reverse('bookings', args=[listing.id]), {
+            'listing': listing.id, 'start_date': '2024-09-20', 'end_date': '2024-09-25', 'status': 'confirmed',
+        })
+    return request
+
+def confirm_booking(user, booking):
+    def request():
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client.patch(reverse('booking_detail', args=[booking.listing_id, booking.id]),
+                            {'status': 'confirmed'})
+    return request
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_create_does_not_double_book(create_users, create_listings):
+    tenant, _ = create_users
+    requests = [post_confirmed_booking(tenant, listing)
+                for listing in create_listings for _ in range(THREADS_PER_LISTING)]
+    results = run_concurrently(requests)
+    assert results.count(201) == len(create_listings)
+    assert results.count(400) == len(requests) - len(create_listings)
+    for listing in create_listings:
+        assert Booking.objects.filter(listing=listing, status='confirmed').count() == 1
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_confirm_does_not_double_book(create_users, create_listings):
+    tenant, landlord = create_users
+    bookings = [
+        Booking.objects.create(listing=listing, user=tenant, start_date='2024-09-20', end_date='2024-09-25')
+        for listing in create_listings for _ in range(THREADS_PER_LISTING)
+    ]
+    results = run_concurrently([confirm_booking(landlord, booking) for booking in bookings])
+    assert results.count(200) == len(create_listings)
+    for listing in create_listings:
+        assert Booking.objects.filter(listing=listing, status='confirmed').count() == 1
@@ -0,0 +1,73 @@
+import pytest
+from django.core.management import call_command
+from django.db.models import Count, Sum
+from listings.models import Booking, Listing, Review
+from users.models import User
+
+def generate(**options):
+    defaults = {'users': 10, 'listings': 20, 'bookings_per_listing': 6, 'reviews_per_listing': 2, 'chunk_size': 7,
+                'seed': 1}
+    call_command('create_test_data', **{**defaults, **options})
+
+@pytest.mark.django_db
+def test_default_run_creates_known_accounts():
+    call_command('create_test_data')
+    assert set(User.objects.values_list('email', 'role')) == {('landlord@example.com', 'landlord'),
+                                                              ('tenant@example.com', 'tenant')}
+    assert User.objects.get(role='tenant').check_password('password123')
+    assert Listing.objects.count() == 1 and Booking.objects.count() == 1
+
+@pytest.mark.django_db
+def test_generated_counts_and_roles():
+    generate()
+    assert User.objects.count() == 10
+    assert User.objects.filter(role='landlord').count() == 2
+    assert Listing.objects.count() == 20
+    assert Booking.objects.count() == 20 * 6
+    assert not Listing.objects.exclude(owner__role='landlord').exists()
+    assert not Booking.objects.exclude(user__role='tenant').exists()
+    # Один хеш пароля на всех
+    assert User.objects.values('password').distinct().count() == 1
+    assert User.objects.order_by('-id').first().check_password('password123')
+
+@pytest.mark.django_db
+def test_bookings_do_not_overlap_and_reviews_are_valid():
+    generate()
+    for booking in Booking.objects.all():
+        assert booking.start_date < booking.end_date
+        assert not Booking.objects.filter(listing_id=booking.listing_id, start_date__lt=booking.end_date,
+                                          end_date__gt=booking.start_date).exclude(pk=booking.pk).exists()
+    assert Review.objects.exists()
+    for review in Review.objects.all():
+        assert Booking.objects.filter(listing_id=review.listing_id, user_id=review.user_id, status='confirmed').exists()
+
+    # Агрегаты рейтинга совпадают с отзывами
+    expected = {row['listing']: (row['count'], row['total'])
+                for row in Review.objects.values('listing').annotate(count=Count('id'), total=Sum('rating'))}
+    for listing in Listing.objects.all():
+        assert (listing.review_count, listing.rating_sum) == expected.get(listing.pk, (0, 0))
+        if listing.review_count:
+            assert listing.rating_avg == pytest.approx(listing.rating_sum / listing.review_count)
+
+@pytest.mark.django_db
+def test_seed_is_reproducible_and_reruns_add_data():
+    generate()
+    first = list(Listing.objects.order_by('id').values_list('title', 'price', 'location'))
+    generate()
+    assert User.objects.count() == 20
+    assert list(Listing.objects.order_by('id').values_list('title', 'price', 'location'))[20:] == first
+
+@pytest.mark.django_db
+def test_reruns_after_deleting_users_do_not_collide():
+    generate()
+    User.objects.filter(role='tenant').order_by('id').first().delete()
+    generate()
+    generate()
+    assert User.objects.count() == 29
+    assert User.objects.filter(email__in=['landlord@example.com', 'tenant@example.com']).count() == 2
+
+@pytest.mark.django_db
+def test_every_listing_with_bookings_has_review():
+    generate(listings=50, bookings_per_listing=1, reviews_per_listing=1)
+    assert not Listing.objects.filter(review_count=0).exists()
+    assert Review.objects.count() == 50
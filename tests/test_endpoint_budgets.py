@@ -0,0 +1,45 @@
+import pytest
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from listings import urls as listing_urls
+from listings.management.commands import _endpoints as endpoints
+from users import urls as user_urls
+
+@pytest.fixture
+def baseline():
+    return endpoints.load_baseline()
+
+@pytest.fixture
+def objects(baseline):
+    endpoints.seed(baseline['dataset'])
+    return endpoints.prepare()
+
+def test_every_route_is_benchmarked(baseline):
+    routes = {pattern.name for pattern in listing_urls.urlpatterns + user_urls.urlpatterns}
+    assert None not in routes
+    assert routes == {endpoint.url_name for endpoint in endpoints.ENDPOINTS}
+    assert set(baseline['endpoints']) == {endpoint.name for endpoint in endpoints.ENDPOINTS}
+
+@pytest.mark.django_db
+def test_endpoints_within_query_and_payload_budgets(baseline, objects):
+    # Задержки зависят от машины и сравниваются командой bench_endpoints
+    results = {endpoint.name: result for endpoint, result in endpoints.run(objects, 1)}
+    assert endpoints.compare(baseline, results, check_latency=False) == []
+
+@pytest.mark.django_db
+def test_requests_leave_no_rows(objects):
+    # Изменения запроса, включая записи выпущенных им токенов, откатываются вместе с ним
+    before = OutstandingToken.objects.count()
+    for endpoint in endpoints.ENDPOINTS:
+        if endpoint.url_name in ('login', 'token_obtain_pair', 'register', 'token_refresh'):
+            response, _, _ = endpoints.request(endpoint, objects)
+            assert response.status_code < 400, endpoint.name
+    assert OutstandingToken.objects.count() == before
+
+def test_compare_reports_regressions(baseline):
+    name, expected = next(iter(baseline['endpoints'].items()))
+    results = {name: {**expected, 'queries': expected['query_budget'] + 1, 'bytes': expected['bytes'] * 2,
+                      'p50_ms': expected['p50_ms'] * 3 + 10}}
+    failures = endpoints.compare(baseline, results)
+    assert len(failures) == 3
+    assert endpoints.compare(baseline, {'GET unknown [anonymous]': expected}) == [
+        'GET unknown [anonymous]: no baseline (run bench_endpoints --update-baseline)']
@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+
+import pytest
+from rest_framework.test import APIClient
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking
+
+User = get_user_model()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def create_users():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    other = User.objects.create_user(username='other', email='other@example.com', password=None, role='landlord')
+    return tenant, landlord, other
+
+@pytest.fixture
+def create_listings(create_users):
+    tenant, landlord, other = create_users
+    listings = [
+        Listing.objects.create(owner=landlord, title=f"Listing {i}", description="Тихий район", location="Berlin",
+                               price=100 + i, rooms=i % 3 + 1, type='apartment')
+        for i in range(5)
+    ]
+    listings.append(Listing.objects.create(owner=other, title="Other", description="", location="Berlin",
+                                           price=100, rooms=1, type='house'))
+    for listing in listings:
+        Booking.objects.create(listing=listing, user=tenant, start_date='2024-09-20', end_date='2024-09-25')
+    return listings
+
+def read_stream(response):
+    assert response.streaming
+    return b''.join(response.streaming_content).decode()
+
+@pytest.mark.django_db
+def test_listing_export_ndjson(api_client, create_users, create_listings):
+    _, landlord, _ = create_users
+    api_client.force_authenticate(user=landlord)
+    response = api_client.get(reverse('listing_export'))
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('application/x-ndjson')
+    rows = [json.loads(line) for line in read_stream(response).splitlines()]
+    # Только объявления арендодателя, без вложенных отзывов и бронирований
+    assert [row['title'] for row in rows] == [f"Listing {i}" for i in range(5)]
+    assert rows[0]['price'] == '100.00'
+    assert 'bookings' not in rows[0] and 'owner' not in rows[0]
+
+@pytest.mark.django_db
+def test_listing_export_csv_uses_listing_filters(api_client, create_users, create_listings):
+    _, landlord, _ = create_users
+    api_client.force_authenticate(user=landlord)
+    response = api_client.get(reverse('listing_export'), {'format': 'csv', 'rooms': 1, 'ordering': '-price'})
+    assert response['Content-Type'].startswith('text/csv')
+    assert 'listings.csv' in response['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(read_stream(response))))
+    assert [row['title'] for row in rows] == ["Listing 3", "Listing 0"]
+
+@pytest.mark.django_db
+def test_listing_export_requires_landlord(api_client, create_users, create_listings):
+    tenant, _, _ = create_users
+    api_client.force_authenticate(user=tenant)
+    assert api_client.get(reverse('listing_export')).status_code == 403
+
+@pytest.mark.django_db
+def test_booking_export_is_role_scoped(api_client, create_users, create_listings):
+    tenant, landlord, other = create_users
+    for user, expected in ((tenant, 6), (landlord, 5), (other, 1)):
+        api_client.force_authenticate(user=user)
+        response = api_client.get(reverse('booking_export'), {'format': 'csv'})
+        rows = list(csv.DictReader(io.StringIO(read_stream(response))))
+        assert len(rows) == expected
+        assert rows[0]['start_date'] == '2024-09-20'
+
+@pytest.mark.django_db
+def test_export_reads_in_chunks(api_client, create_users, create_listings, django_assert_num_queries, monkeypatch):
+    from listings.views import BookingExportView
+    monkeypatch.setattr(BookingExportView, 'chunk_size', 2)
+    tenant, _, _ = create_users
+    api_client.force_authenticate(user=tenant)
+    response = api_client.get(reverse('booking_export'))
+    # Запрос к базе выполняется при чтении потока, а не при создании ответа
+    with django_assert_num_queries(1):
+        lines = read_stream(response).splitlines()
+    assert len(lines) == 6
+
+def test_streaming_renderer_requires_render_rows():
+    from listings.renderers import StreamingRenderer
+    with pytest.raises(TypeError):
+        StreamingRenderer()
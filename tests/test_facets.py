@@ -0,0 +1,76 @@
+import pytest
+from rest_framework.test import APIClient
+from django.core.cache import cache
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing
+
+User = get_user_model()
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def viewer():
+    return User.objects.create_user(username='viewer', email='viewer@example.com', password=None, role='tenant')
+
+@pytest.fixture
+def create_listings():
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    rows = [
+        ('apartment', 1, 400, True), ('apartment', 2, 800, True), ('apartment', 3, 1200, True),
+        ('house', 5, 2500, True), ('house', 4, 3500, False), ('studio', 1, 500, True),
+    ]
+    return [
+        Listing.objects.create(owner=landlord, title=f"Listing {i}", description="", location="Berlin",
+                               price=price, rooms=rooms, type=type_, is_active=is_active)
+        for i, (type_, rooms, price, is_active) in enumerate(rows)
+    ]
+
+@pytest.mark.django_db
+def test_all_facets(api_client, create_listings):
+    response = api_client.get(reverse('listings'), {'facets': ''})
+    assert response.status_code == 200
+    assert response.data['facets'] == {
+        'is_active': {'true': 5, 'false': 1},
+        'price': {'0-500': 1, '500-1000': 2, '1000-1500': 1, '1500-2000': 0, '2000-3000': 1, '3000+': 1},
+        'rooms': {'1': 2, '2': 1, '3': 1, '4+': 2},
+        'type': {'apartment': 3, 'house': 2, 'studio': 1},
+    }
+
+@pytest.mark.django_db
+def test_facets_follow_filters(api_client, create_listings):
+    response = api_client.get(reverse('listings'), {'facets': 'type,rooms', 'type': 'apartment', 'rooms': 1})
+    assert response.data['count'] == 1
+    assert response.data['facets'] == {
+        'rooms': {'1': 1, '2': 0, '3': 0, '4+': 0},
+        'type': {'apartment': 1, 'house': 0, 'studio': 0},
+    }
+    assert 'facets' not in api_client.get(reverse('listings')).data
+    assert api_client.get(reverse('listings'), {'facets': 'color'}).status_code == 400
+
+@pytest.mark.django_db
+def test_facets_single_query_and_cached(api_client, viewer, create_listings, django_assert_num_queries):
+    api_client.force_authenticate(user=viewer)
+    url = reverse('listings')
+    api_client.get(url, {'facets': 'type'})
+    # Запрос страницы (COUNT, объявления, отзывы, бронирования) без повторного подсчета фасетов
+    with django_assert_num_queries(4):
+        response = api_client.get(url, {'facets': 'type', 'page': 1, 'ordering': 'price'})
+    assert response.data['facets']['type']['house'] == 2
+    # Фасеты считаются одним запросом
+    cache.clear()
+    with django_assert_num_queries(5):
+        api_client.get(url, {'facets': 'type,rooms,price,is_active'})
+
+    # Изменение данных сбрасывает кэш фасетов
+    create_listings[0].type = 'house'
+    create_listings[0].save()
+    assert api_client.get(url, {'facets': 'type'}).data['facets']['type']['house'] == 3
@@ -0,0 +1,74 @@
+import pytest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking, Review
+from listings.representation import FastRepresentationMixin
+from listings.serializers import ListingSerializer, BookingSerializer, ReviewSerializer
+
+User = get_user_model()
+
+@pytest.fixture
+def create_users():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    return tenant, landlord
+
+@pytest.fixture
+def create_listings(create_users):
+    tenant, landlord = create_users
+    listings = [
+        Listing.objects.create(owner=landlord, title="Квартира у парка", description="Описание", location="Berlin",
+                               price='1234.50', rooms=2, type='apartment', latitude=52.52, longitude=13.405),
+        Listing.objects.create(owner=landlord, title="Studio", description="", location="Berlin",
+                               price=99, rooms=1, type='studio', is_active=False),
+    ]
+    Booking.objects.create(listing=listings[0], user=tenant, start_date='2024-09-20', end_date='2024-09-25',
+                           status='confirmed')
+    Booking.objects.create(listing=listings[0], user=landlord, start_date='2024-10-01', end_date='2024-10-03')
+    Review.objects.create(listing=listings[0], user=tenant, rating=4, comment="Хорошо")
+    return listings
+
+def get_request(user, params=None):
+    request = APIRequestFactory().get('/listings/', params or {})
+    force_authenticate(request, user=user)
+    request = Request(request)
+    request.user = user
+    return request
+
+def render(serializer_class, instances, request):
+    return JSONRenderer().render(serializer_class(instances, many=True, context={'request': request}).data)
+
+def render_both(serializer_class, instances, request, monkeypatch):
+    fast = render(serializer_class, instances, request)
+    with monkeypatch.context() as patch:
+        patch.setattr(FastRepresentationMixin, '_get_fast_accessors', lambda self: None)
+        standard = render(serializer_class, instances, request)
+    return fast, standard
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [{}, {'fields': 'title,price,bookings'}, {'omit': 'reviews'}])
+def test_listing_output_is_identical(create_users, create_listings, monkeypatch, params):
+    for user in create_users:
+        listings = list(Listing.objects.with_related(user).order_by('id'))
+        fast, standard = render_both(ListingSerializer, listings, get_request(user, params), monkeypatch)
+        assert fast == standard
+
+@pytest.mark.django_db
+def test_booking_and_review_output_is_identical(create_users, create_listings, monkeypatch):
+    tenant, _ = create_users
+    request = get_request(tenant)
+    fast, standard = render_both(BookingSerializer, list(Booking.objects.order_by('id')), request, monkeypatch)
+    assert fast == standard
+    fast, standard = render_both(ReviewSerializer, list(Review.objects.order_by('id')), request, monkeypatch)
+    assert fast == standard
+
+@pytest.mark.django_db
+def test_fast_path_only_for_safe_methods(create_users, create_listings):
+    tenant, _ = create_users
+    serializer = ReviewSerializer(context={'request': get_request(tenant)})
+    assert serializer._get_fast_accessors() is not None
+    post = Request(APIRequestFactory().post('/listings/'))
+    serializer = ReviewSerializer(context={'request': post})
+    assert serializer._get_fast_accessors() is None
@@ -0,0 +1,115 @@
+import pytest
+from rest_framework.test import APIClient
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing, ListingGeoIndex
+
+User = get_user_model()
+
+# Объявления в Берлине, Потсдаме и Гамбурге и одно без координат
+PLACES = [
+    ("Mitte", 52.5200, 13.4050),
+    ("Kreuzberg", 52.4990, 13.4030),
+    ("Potsdam", 52.3906, 13.0645),
+    ("Hamburg", 53.5511, 9.9937),
+    ("Nowhere", None, None),
+]
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def create_listings():
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    return {
+        title: Listing.objects.create(owner=landlord, title=title, description="", location="Germany", price=100,
+                                      rooms=2, type='apartment', latitude=latitude, longitude=longitude)
+        for title, latitude, longitude in PLACES
+    }
+
+def titles(api_client, params):
+    response = api_client.get(reverse('listings'), params)
+    assert response.status_code == 200, response.data
+    return [item['title'] for item in response.data['results']]
+
+@pytest.mark.django_db
+def test_index_follows_listing_changes(create_listings):
+    if connection.vendor != 'sqlite':
+        pytest.skip('R*Tree index exists only in SQLite')
+    assert ListingGeoIndex.objects.count() == 4
+    hamburg = create_listings["Hamburg"]
+    hamburg.latitude, hamburg.longitude = None, None
+    hamburg.save()
+    assert ListingGeoIndex.objects.count() == 3
+    nowhere = create_listings["Nowhere"]
+    nowhere.latitude, nowhere.longitude = 48.1351, 11.5820
+    nowhere.save()
+    assert ListingGeoIndex.objects.get(listing=nowhere).min_lat == pytest.approx(48.1351, abs=1e-4)
+    nowhere.delete()
+    assert not ListingGeoIndex.objects.filter(listing_id=nowhere.id).exists()
+    assert ListingGeoIndex.objects.count() == 3
+
+@pytest.mark.django_db
+def test_bbox_filter(api_client, create_listings):
+    assert sorted(titles(api_client, {'bbox': '52.3,13.0,52.6,13.5'})) == ["Kreuzberg", "Mitte", "Potsdam"]
+    assert sorted(titles(api_client, {'bbox': '52.45,13.3,52.6,13.5'})) == ["Kreuzberg", "Mitte"]
+    response = api_client.get(reverse('listings'), {'bbox': '52.3,13.0'})
+    assert response.status_code == 400
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params, field', [
+    ({'bbox': '-91,13.0,52.6,13.5'}, 'bbox'),
+    ({'bbox': '52.3,13.0,52.6,181'}, 'bbox'),
+    ({'bbox': '52.6,13.0,52.3,13.5'}, 'bbox'),  # min_lat > max_lat
+    ({'bbox': '52.3,13.5,52.6,13.0'}, 'bbox'),  # min_lon > max_lon
+    ({'near': '95,13.4'}, 'near'),
+    ({'near': '52.5,-180.5', 'radius': 10}, 'near'),
+    ({'near': '52.5'}, 'near'),
+])
+def test_invalid_coordinates_rejected(api_client, create_listings, params, field):
+    response = api_client.get(reverse('listings'), params)
+    assert response.status_code == 400
+    assert field in response.data
+
+@pytest.mark.django_db
+def test_radius_filter_and_distance_ordering(api_client, create_listings):
+    params = {'near': '52.5200,13.4050', 'radius': 10, 'ordering': 'distance'}
+    assert titles(api_client, params) == ["Mitte", "Kreuzberg"]
+    params['radius'] = 30
+    assert titles(api_client, params) == ["Mitte", "Kreuzberg", "Potsdam"]
+    params['ordering'] = '-distance'
+    assert titles(api_client, params) == ["Potsdam", "Kreuzberg", "Mitte"]
+    # Без радиуса - все объявления с координатами по расстоянию
+    assert titles(api_client, {'near': '53.5,10.0', 'ordering': 'distance'}) == [
+        "Hamburg", "Potsdam", "Mitte", "Kreuzberg"]
+    # Сортировка по расстоянию без точки игнорируется
+    assert len(titles(api_client, {'ordering': 'distance'})) == 5
+    assert api_client.get(reverse('listings'), {'radius': 10}).status_code == 400
+
+@pytest.mark.django_db
+def test_distance_ordering_with_cursor_pagination(api_client, create_listings):
+    response = api_client.get(reverse('listings'), {'near': '52.5200,13.4050', 'ordering': 'distance',
+                                                    'pagination': 'cursor', 'page_size': 2})
+    seen = [item['title'] for item in response.data['results']]
+    while response.data['next']:
+        response = api_client.get(response.data['next'])
+        seen += [item['title'] for item in response.data['results']]
+    assert seen == ["Mitte", "Kreuzberg", "Potsdam", "Hamburg"]
+
+@pytest.mark.django_db
+def test_radius_query_uses_rtree(api_client, create_listings):
+    if connection.vendor != 'sqlite':
+        pytest.skip('R*Tree index exists only in SQLite')
+    with CaptureQueriesContext(connection) as context:
+        titles(api_client, {'near': '52.5200,13.4050', 'radius': 10, 'ordering': 'distance'})
+    listing_query = next(query['sql'] for query in context.captured_queries
+                         if query['sql'].startswith('SELECT "listings_listing"'))
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + listing_query)
+        plan = [row[-1] for row in cursor.fetchall()]
+    # Первым просматривается R*Tree, объявления читаются по первичному ключу
+    assert 'VIRTUAL TABLE INDEX' in plan[0] and 'listings_listing_geo' in plan[0]
+    assert not any(step.startswith('SCAN listings_listing') and 'geo' not in step for step in plan)
@@ -0,0 +1,110 @@
+import json
+import logging
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth import get_user_model
+from listings.models import Listing
+from users.tokens import RefreshToken
+
+User = get_user_model()
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+@pytest.fixture
+def sample_all(settings):
+    # Middleware читает настройки при создании: клиент создается после изменения
+    settings.INSTRUMENTATION_SAMPLE_RATE = 1
+    settings.INSTRUMENTATION_SERVER_TIMING = True
+
+@pytest.fixture
+def landlord():
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None,
+                                        role='landlord')
+    for i in range(3):
+        Listing.objects.create(owner=landlord, title=f'Квартира {i}', description='Описание', location='Berlin',
+                               price=800, rooms=2, type='apartment')
+    return landlord
+
+def parse_server_timing(header):
+    metrics = {}
+    for entry in header.split(', '):
+        name, *params = entry.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+@pytest.mark.django_db
+def test_server_timing_and_log_line(sample_all, landlord, caplog):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(landlord)}')
+    with caplog.at_level(logging.INFO, logger='rental_project.instrumentation'):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('listings'))
+    assert response.status_code == 200
+
+    metrics = parse_server_timing(response['Server-Timing'])
+    assert set(metrics) == {'total', 'db', 'jwt', 'serialize', 'render', 'app'}
+    assert metrics['db']['desc'] == f'"{len(queries.captured_queries)} queries"'
+    durations = {name: float(params['dur']) for name, params in metrics.items()}
+    # Фазы не включают время базы: база, фазы и app в сумме дают total
+    assert sum(durations.values()) - durations['total'] == pytest.approx(durations['total'], abs=0.01)
+
+    [record] = [json.loads(record.getMessage()) for record in caplog.records
+                if record.name == 'rental_project.instrumentation']
+    assert record['method'] == 'GET'
+    assert record['path'] == reverse('listings')
+    assert record['route'] == 'listings/'
+    assert record['status'] == 200
+    assert record['queries'] == len(queries.captured_queries)
+    assert record['total_ms'] == durations['total']
+    # Обертка снимается после запроса
+    assert connection.execute_wrappers == []
+
+@pytest.mark.django_db
+def test_requests_outside_sample_are_not_measured(settings, landlord, caplog):
+    settings.INSTRUMENTATION_SAMPLE_RATE = 0
+    with caplog.at_level(logging.INFO, logger='rental_project.instrumentation'):
+        response = APIClient().get(reverse('listings'))
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response
+    assert not [record for record in caplog.records if record.name == 'rental_project.instrumentation']
+
+@pytest.mark.django_db
+def test_server_timing_header_can_be_disabled(sample_all, settings, landlord):
+    settings.INSTRUMENTATION_SERVER_TIMING = False
+    response = APIClient().get(reverse('listings'))
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response
+
+@pytest.mark.django_db
+def test_jwt_refresh_in_middleware_is_timed(sample_all, landlord):
+    client = APIClient()
+    client.cookies['refresh_token'] = str(RefreshToken.for_user(landlord))
+    response = client.get(reverse('listings'))
+    assert response.status_code == 200
+    assert 'access_token' in response.cookies
+    assert float(parse_server_timing(response['Server-Timing'])['jwt']['dur']) > 0
+
+@pytest.mark.django_db(transaction=True)
+def test_async_requests_count_queries(sample_all, landlord):
+    response = async_to_sync(AsyncClient().get)(reverse('listings'))
+    assert response.status_code == 200
+    metrics = parse_server_timing(response['Server-Timing'])
+    assert metrics['db']['desc'] != '"0 queries"'
+
+@pytest.mark.django_db
+def test_detail_serialization_is_timed(sample_all, landlord):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(landlord)}')
+    response = client.get(reverse('listing_detail', kwargs={'pk': landlord.listings.first().pk}))
+    assert response.status_code == 200
+    assert float(parse_server_timing(response['Server-Timing'])['serialize']['dur']) > 0
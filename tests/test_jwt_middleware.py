@@ -0,0 +1,212 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from listings.models import Listing
+from users import tokens
+from users.blacklist import blacklist_index
+from users.middleware import JWTAuthenticationMiddleware
+from users.tokens import SingleFlight, VerifiedTokenCache, access_token_refreshes, verified_tokens, verify_access_token
+
+User = get_user_model()
+
+@pytest.fixture(autouse=True)
+def clear_verified_tokens():
+    verified_tokens.clear()
+    access_token_refreshes.clear()
+    yield
+    verified_tokens.clear()
+    access_token_refreshes.clear()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def decodes(monkeypatch):
+    # Счетчик декодирований JWT (проверок подписи)
+    calls = []
+    original = TokenBackend.decode
+
+    def decode(self, token, verify=True):
+        calls.append(token)
+        return original(self, token, verify)
+    monkeypatch.setattr(TokenBackend, 'decode', decode)
+    return calls
+
+@pytest.fixture
+def create_listing():
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    listing = Listing.objects.create(owner=landlord, title="Test Listing", description="Description",
+                                     location="Test City", price=100, rooms=2, type='apartment')
+    return landlord, listing
+
+def detail_url(listing):
+    return reverse('listing_detail', args=[listing.id])
+
+@pytest.mark.django_db
+def test_cookie_token_decoded_once(api_client, create_listing, decodes):
+    landlord, listing = create_listing
+    api_client.cookies['access_token'] = str(AccessToken.for_user(landlord))
+    assert api_client.get(detail_url(listing)).status_code == 200
+    assert len(decodes) == 1
+    # Повторный запрос с тем же токеном - из кэша проверенных токенов
+    assert api_client.get(detail_url(listing)).status_code == 200
+    assert len(decodes) == 1
+
+@pytest.mark.django_db
+def test_header_token_decoded_once(api_client, create_listing, decodes):
+    landlord, listing = create_listing
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(landlord)}')
+    assert api_client.get(detail_url(listing)).status_code == 200
+    assert api_client.get(detail_url(listing)).status_code == 200
+    assert len(decodes) == 1
+
+@pytest.mark.django_db
+def test_refresh_sets_cookie_without_decoding_new_token(api_client, create_listing, decodes):
+    landlord, listing = create_listing
+    expired = AccessToken.for_user(landlord)
+    expired.set_exp(lifetime=-timedelta(minutes=1))
+    api_client.cookies['access_token'] = str(expired)
+    api_client.cookies['refresh_token'] = str(RefreshToken.for_user(landlord))
+
+    response = api_client.get(detail_url(listing))
+    assert response.status_code == 200
+    new_token = response.cookies['access_token'].value
+    assert new_token != str(expired)
+    # Декодируются только истекший access-токен и refresh-токен
+    assert len(decodes) == 2
+    # Новый access-токен уже в кэше проверенных токенов
+    verify_access_token(new_token)
+    assert len(decodes) == 2
+
+@pytest.mark.django_db
+def test_invalid_cookie_without_refresh_is_anonymous(api_client, create_listing):
+    _, listing = create_listing
+    api_client.cookies['access_token'] = 'invalid'
+    response = api_client.get(detail_url(listing))
+    assert response.status_code == 401
+    assert 'access_token' not in response.cookies
+
+def test_cache_is_lru_and_bounded():
+    cache = VerifiedTokenCache(maxsize=2)
+    expires = {'exp': time.time() + 60}
+    cache.set('a', expires)
+    cache.set('b', expires)
+    assert cache.get('a') is expires
+    cache.set('c', expires)
+    assert cache.get('b') is None
+    assert cache.get('a') is expires and cache.get(b'c') is expires
+    assert len(cache) == 2
+
+    disabled = VerifiedTokenCache(maxsize=0)
+    disabled.set('a', expires)
+    assert disabled.get('a') is None
+
+@pytest.mark.django_db
+def test_cached_token_expires_at_exp(monkeypatch, create_listing, decodes):
+    landlord, _ = create_listing
+    token = AccessToken.for_user(landlord)
+    raw = str(token)
+    assert verify_access_token(raw)['exp'] == token['exp']
+    assert verify_access_token(raw)['exp'] == token['exp']
+    assert len(decodes) == 1
+
+    monkeypatch.setattr(tokens.time, 'time', lambda: token['exp'] + 1)
+    assert verified_tokens.get(raw) is None
+    assert len(verified_tokens) == 0
+    # Токен проверяется заново и отклоняется как истекший
+    monkeypatch.setattr('rest_framework_simplejwt.tokens.aware_utcnow', lambda: token.current_time + timedelta(days=1))
+    with pytest.raises(TokenError):
+        verify_access_token(raw)
+
+@pytest.mark.django_db
+def test_concurrent_refreshes_coalesced(monkeypatch, create_listing):
+    landlord, _ = create_listing
+    refresh = str(RefreshToken.for_user(landlord))
+    blacklist_index.warm()
+    middleware = JWTAuthenticationMiddleware(lambda request: HttpResponse())
+    issued = []
+    issue = JWTAuthenticationMiddleware.issue_access_token
+
+    def slow_issue(self, refresh_token):
+        issued.append(refresh_token)
+        # Обновление идет, пока остальные запросы приходят
+        time.sleep(0.1)
+        return issue(self, refresh_token)
+    monkeypatch.setattr(JWTAuthenticationMiddleware, 'issue_access_token', slow_issue)
+
+    barrier = threading.Barrier(8)
+
+    def refresh_in_parallel(_):
+        barrier.wait()
+        return str(middleware.refresh_access_token(refresh))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        new_tokens = set(executor.map(refresh_in_parallel, range(8)))
+    assert len(issued) == 1
+    assert len(new_tokens) == 1
+
+@pytest.mark.django_db
+def test_requests_in_grace_window_get_same_cookie(api_client, create_listing):
+    landlord, listing = create_listing
+    expired = AccessToken.for_user(landlord)
+    expired.set_exp(lifetime=-timedelta(minutes=1))
+    api_client.cookies['refresh_token'] = str(RefreshToken.for_user(landlord))
+
+    new_tokens = set()
+    for _ in range(3):
+        api_client.cookies['access_token'] = str(expired)
+        response = api_client.get(detail_url(listing))
+        assert response.status_code == 200
+        new_tokens.add(response.cookies['access_token'].value)
+    assert len(new_tokens) == 1
+
+@pytest.mark.django_db
+def test_grace_window_ends_when_refresh_token_blacklisted(api_client, create_listing):
+    landlord, listing = create_listing
+    expired = AccessToken.for_user(landlord)
+    expired.set_exp(lifetime=-timedelta(minutes=1))
+    refresh = RefreshToken.for_user(landlord)
+    api_client.cookies['refresh_token'] = str(refresh)
+    api_client.cookies['access_token'] = str(expired)
+    assert 'access_token' in api_client.get(detail_url(listing)).cookies
+
+    # Выход: refresh-токен отозван, сохраненный access-токен больше не выдается
+    refresh.blacklist()
+    api_client.cookies['access_token'] = str(expired)
+    assert 'access_token' not in api_client.get(detail_url(listing)).cookies
+    assert len(access_token_refreshes) == 0
+
+def test_single_flight_grace_period_and_errors(monkeypatch):
+    flight = SingleFlight(grace_period=5)
+    calls = []
+
+    def issue(key):
+        calls.append(key)
+        return f'{key}-{len(calls)}'
+    assert flight.run('a', issue) == 'a-1'
+    assert flight.run('a', issue) == 'a-1'
+    # По истечении окна обновление выполняется заново
+    now = time.monotonic()
+    monkeypatch.setattr(tokens.time, 'monotonic', lambda: now + 10)
+    assert flight.run('a', issue) == 'a-2'
+    assert len(flight) == 1
+
+    def fail(key):
+        raise RuntimeError(key)
+    with pytest.raises(RuntimeError):
+        flight.run('b', fail)
+    # Неудачный результат не запоминается
+    assert flight.run('b', issue) == 'b-3'
+    # Результат, не прошедший повторную проверку, выпускается заново
+    assert flight.run('b', issue, revalidate=lambda key: True) == 'b-3'
+    assert flight.run('b', issue, revalidate=lambda key: False) == 'b-4'
@@ -0,0 +1,97 @@
+import pytest
+from rest_framework.test import APIClient
+from django.core.cache import cache
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking, Review
+
+User = get_user_model()
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def create_users():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    return tenant, landlord
+
+@pytest.fixture
+def create_listing(create_users):
+    _, landlord = create_users
+    return Listing.objects.create(owner=landlord, title="Test Listing", description="", location="Test City",
+                                  price=100, rooms=2, type='apartment')
+
+@pytest.mark.django_db
+def test_anonymous_list_is_cached(api_client, create_listing, django_assert_num_queries):
+    response = api_client.get(reverse('listings'), {'rooms': 2, 'ordering': 'price'})
+    assert response['X-Cache'] == 'MISS'
+    # Порядок параметров не влияет на ключ кэша
+    with django_assert_num_queries(0):
+        cached = api_client.get(reverse('listings'), {'ordering': 'price', 'rooms': 2})
+    assert cached['X-Cache'] == 'HIT'
+    assert cached.json() == response.json()
+    assert api_client.get(reverse('listings'), {'rooms': 3})['X-Cache'] == 'MISS'
+
+@pytest.mark.django_db
+def test_cache_is_invalidated_by_changes(api_client, create_users, create_listing):
+    tenant, landlord = create_users
+    url = reverse('listings')
+    assert api_client.get(url)['X-Cache'] == 'MISS'
+    assert api_client.get(url)['X-Cache'] == 'HIT'
+
+    create_listing.title = "Renamed"
+    create_listing.save()
+    response = api_client.get(url)
+    assert response['X-Cache'] == 'MISS'
+    assert response.data['results'][0]['title'] == "Renamed"
+
+    Review.objects.create(listing=create_listing, user=tenant, rating=4, comment="")
+    response = api_client.get(url)
+    assert response['X-Cache'] == 'MISS'
+    assert response.data['results'][0]['rating_avg'] == 4.0
+
+    # Бронирование влияет на фильтр свободных дат
+    params = {'available_from': '2024-09-21', 'available_to': '2024-09-23'}
+    assert response_count(api_client, params) == 1
+    Booking.objects.create(listing=create_listing, user=tenant, start_date='2024-09-20', end_date='2024-09-25',
+                           status='confirmed')
+    assert response_count(api_client, params) == 0
+
+    # Пакетные операции без сигналов тоже сбрасывают кэш
+    Listing.objects.filter(pk=create_listing.pk).recompute_ratings()
+    assert api_client.get(url)['X-Cache'] == 'MISS'
+
+def response_count(api_client, params):
+    return api_client.get(reverse('listings'), params).data['count']
+
+@pytest.mark.django_db
+def test_authenticated_list_is_not_cached(api_client, create_users, create_listing):
+    tenant, _ = create_users
+    api_client.force_authenticate(user=tenant)
+    api_client.get(reverse('listings'))
+    response = api_client.get(reverse('listings'))
+    assert 'X-Cache' not in response
+
+@pytest.mark.django_db
+def test_cache_stats(api_client, create_users, create_listing):
+    _, landlord = create_users
+    api_client.get(reverse('listings'))
+    api_client.get(reverse('listings'))
+    api_client.get(reverse('listings'))
+    api_client.force_authenticate(user=landlord)
+    assert api_client.get(reverse('listing_cache_stats')).status_code == 403
+
+    landlord.is_staff = True
+    landlord.save()
+    response = api_client.get(reverse('listing_cache_stats'))
+    assert response.status_code == 200
+    assert response.data['hits'] == 2
+    assert response.data['misses'] == 1
@@ -0,0 +1,93 @@
+import pytest
+from rest_framework.test import APIClient
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking, Review
+
+User = get_user_model()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def create_users():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    return tenant, landlord
+
+@pytest.fixture
+def create_listing(create_users):
+    tenant, landlord = create_users
+    listing = Listing.objects.create(owner=landlord, title="Test Listing", description="", location="Test City",
+                                     price=100, rooms=2, type='apartment')
+    Review.objects.create(listing=listing, user=tenant, rating=5, comment="Great")
+    Booking.objects.create(listing=listing, user=tenant, start_date='2024-09-20', end_date='2024-09-25')
+    return listing
+
+def detail_url(listing):
+    return reverse('listing_detail', args=[listing.id])
+
+@pytest.mark.django_db
+def test_etag_not_modified_runs_one_query(api_client, create_users, create_listing, django_assert_num_queries):
+    tenant, _ = create_users
+    api_client.force_authenticate(user=tenant)
+    response = api_client.get(detail_url(create_listing))
+    assert response.status_code == 200
+    assert response['ETag'].startswith('"')
+    assert 'Last-Modified' in response
+
+    with django_assert_num_queries(1):
+        not_modified = api_client.get(detail_url(create_listing), HTTP_IF_NONE_MATCH=response['ETag'])
+    assert not_modified.status_code == 304
+    assert not_modified.content == b''
+    assert not_modified['ETag'] == response['ETag']
+
+    with django_assert_num_queries(1):
+        not_modified = api_client.get(detail_url(create_listing), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    assert not_modified.status_code == 304
+
+@pytest.mark.django_db
+def test_etag_changes_with_related_data(api_client, create_users, create_listing):
+    tenant, landlord = create_users
+    api_client.force_authenticate(user=tenant)
+    etags = {api_client.get(detail_url(create_listing))['ETag']}
+
+    def changed():
+        response = api_client.get(detail_url(create_listing), HTTP_IF_NONE_MATCH=', '.join(etags))
+        etags.add(response['ETag'])
+        return response.status_code == 200
+
+    review = Review.objects.get(listing=create_listing)
+    review.comment = "Edited"
+    review.save()
+    assert changed()
+    booking = Booking.objects.get(listing=create_listing)
+    booking.status = 'canceled'
+    booking.save()
+    assert changed()
+    booking.delete()
+    assert changed()
+    create_listing.title = "Renamed"
+    create_listing.save()
+    assert changed()
+    assert not changed()
+
+    # Другой пользователь видит другие бронирования - и другой ETag
+    api_client.force_authenticate(user=landlord)
+    assert changed()
+
+@pytest.mark.django_db
+def test_deleting_review_moves_last_modified(api_client, create_users, create_listing):
+    tenant, _ = create_users
+    api_client.force_authenticate(user=tenant)
+    Listing.objects.filter(pk=create_listing.pk).update(updated_at='2024-01-01T00:00:00Z')
+    Review.objects.update(updated_at='2024-01-01T00:00:00Z')
+    Booking.objects.update(updated_at='2024-01-01T00:00:00Z')
+    last_modified = api_client.get(detail_url(create_listing))['Last-Modified']
+    assert last_modified == 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+    Review.objects.get(listing=create_listing).delete()
+    response = api_client.get(detail_url(create_listing), HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 200
+    assert response.data['reviews'] == []
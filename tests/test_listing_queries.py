@@ -0,0 +1,75 @@
+import pytest
+from rest_framework.test import APIClient
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking, Review
+
+User = get_user_model()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def create_users():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    return tenant, landlord
+
+@pytest.fixture
+def create_listings(create_users):
+    # Страница из нескольких объявлений, у каждого есть отзывы и бронирования
+    tenant, landlord = create_users
+    other = User.objects.create_user(username='other', email='other@example.com', password=None, role='tenant')
+    listings = []
+    for i in range(5):
+        listing = Listing.objects.create(
+            owner=landlord, title=f"Listing {i}", description="Nice place", location="Test City",
+            price=100 + i, rooms=2, type='apartment'
+        )
+        for user in (tenant, other):
+            Booking.objects.create(listing=listing, user=user, start_date='2024-09-20',
+                                   end_date='2024-09-25', status='confirmed')
+            Review.objects.create(listing=listing, user=user, rating=5, comment="Great place!")
+        listings.append(listing)
+    return listings
+
+@pytest.mark.django_db
+def test_anonymous_listings_query_count(api_client, create_listings, django_assert_num_queries):
+    # COUNT для пагинации, объявления, отзывы
+    with django_assert_num_queries(3):
+        response = api_client.get(reverse('listings'))
+    assert response.status_code == 200
+    assert all(item['bookings'] == [] for item in response.data['results'])
+    assert all(len(item['reviews']) == 2 for item in response.data['results'])
+
+@pytest.mark.django_db
+def test_tenant_listings_query_count(api_client, create_users, create_listings, django_assert_num_queries):
+    tenant, _ = create_users
+    api_client.force_authenticate(user=tenant)
+    # COUNT для пагинации, объявления, отзывы, бронирования арендатора
+    with django_assert_num_queries(4):
+        response = api_client.get(reverse('listings'))
+    assert response.status_code == 200
+    for item in response.data['results']:
+        assert [booking['user'] for booking in item['bookings']] == [tenant.id]
+
+@pytest.mark.django_db
+def test_landlord_listings_query_count(api_client, create_users, create_listings, django_assert_num_queries):
+    _, landlord = create_users
+    api_client.force_authenticate(user=landlord)
+    # COUNT для пагинации, объявления, отзывы, все бронирования объявлений владельца
+    with django_assert_num_queries(4):
+        response = api_client.get(reverse('listings'))
+    assert response.status_code == 200
+    assert all(len(item['bookings']) == 2 for item in response.data['results'])
+
+@pytest.mark.django_db
+def test_listing_detail_query_count(api_client, create_users, create_listings, django_assert_num_queries):
+    tenant, _ = create_users
+    api_client.force_authenticate(user=tenant)
+    # Объявление, отзывы, бронирования арендатора
+    with django_assert_num_queries(3):
+        response = api_client.get(reverse('listing_detail', args=[create_listings[0].id]))
+    assert response.status_code == 200
+    assert len(response.data['bookings']) == 1
@@ -0,0 +1,116 @@
+import base64
+import json
+
+import pytest
+from rest_framework.test import APIClient
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking
+
+User = get_user_model()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def create_users():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    return tenant, landlord
+
+@pytest.fixture
+def create_listings(create_users):
+    # Повторяющиеся цены, чтобы проверить разрешение равенства по id
+    _, landlord = create_users
+    return [
+        Listing.objects.create(owner=landlord, title=f"Listing {i}", description="", location="Test City",
+                               price=100 + i % 3, rooms=2, type='apartment')
+        for i in range(25)
+    ]
+
+def walk(api_client, url, link='next'):
+    # Проходит по всем страницам и собирает id
+    ids, urls = [], []
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == 200
+        ids.extend(item['id'] for item in response.data['results'])
+        urls.append(url)
+        url = response.data[link]
+    return ids, urls
+
+@pytest.mark.django_db
+def test_cursor_pages_follow_price_ordering(api_client, create_listings):
+    expected = [listing.id for listing in sorted(create_listings, key=lambda item: (item.price, item.id))]
+    with CaptureQueriesContext(connection) as context:
+        ids, urls = walk(api_client, reverse('listings') + '?pagination=cursor&ordering=price')
+    assert ids == expected
+    assert len(urls) == 3
+    assert not any('COUNT(' in query['sql'] for query in context.captured_queries)
+
+@pytest.mark.django_db
+def test_cursor_previous_links(api_client, create_listings):
+    expected = [listing.id for listing in sorted(create_listings, key=lambda item: (item.created_at, item.id),
+                                                 reverse=True)]
+    _, urls = walk(api_client, reverse('listings') + '?pagination=cursor&ordering=-created_at')
+    response = api_client.get(urls[-1])
+    assert response.data['next'] is None
+    ids, _ = walk(api_client, response.data['previous'], link='previous')
+    assert ids == expected[10:20] + expected[0:10]
+
+@pytest.mark.django_db
+def test_cursor_count_on_request(api_client, create_listings):
+    response = api_client.get(reverse('listings') + '?pagination=cursor')
+    assert 'count' not in response.data
+    response = api_client.get(reverse('listings') + '?pagination=cursor&count=true')
+    assert response.data['count'] == 25
+
+@pytest.mark.django_db
+def test_cursor_rejects_mismatched_ordering(api_client, create_listings):
+    response = api_client.get(reverse('listings') + '?pagination=cursor&ordering=price')
+    cursor = response.data['next'].split('cursor=')[1]
+    response = api_client.get(reverse('listings') + f'?cursor={cursor}&ordering=created_at')
+    assert response.status_code == 404
+    response = api_client.get(reverse('listings') + '?cursor=not-a-cursor')
+    assert response.status_code == 404
+
+def encode_cursor(cursor):
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode().rstrip('=')
+
+def decode_cursor(url):
+    encoded = url.split('cursor=')[1].split('&')[0]
+    return json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query, change', [
+    ('ordering=price', lambda cursor: cursor.pop('r')),
+    ('ordering=price', lambda cursor: cursor.update(r='yes')),
+    ('ordering=price', lambda cursor: cursor.update(v='100')),
+    ('ordering=price', lambda cursor: cursor['v'].__setitem__(0, {'price': 1})),
+    ('ordering=price', lambda cursor: cursor['v'].__setitem__(0, 'cheap')),
+    ('ordering=created_at', lambda cursor: cursor['v'].__setitem__(0, [2024])),
+    ('near=52.5,13.4&ordering=distance', lambda cursor: cursor['v'].__setitem__(0, {'km': 1})),
+    ('near=52.5,13.4&ordering=distance', lambda cursor: cursor['v'].__setitem__(0, '1.5')),
+    ('near=52.5,13.4&ordering=distance', lambda cursor: cursor['v'].__setitem__(0, True)),
+])
+def test_malformed_cursor_returns_404(api_client, create_listings, query, change):
+    # Поиск по расстоянию учитывает только объявления с координатами
+    Listing.objects.update(latitude=52.5, longitude=13.4)
+    url = reverse('listings') + f'?pagination=cursor&{query}'
+    cursor = decode_cursor(api_client.get(url).data['next'])
+    change(cursor)
+    response = api_client.get(f'{url}&cursor={encode_cursor(cursor)}')
+    assert response.status_code == 404
+
+@pytest.mark.django_db
+def test_cursor_booking_list(api_client, create_users, create_listings):
+    tenant, _ = create_users
+    for listing in create_listings[:12]:
+        Booking.objects.create(listing=listing, user=tenant, start_date='2024-09-20', end_date='2024-09-25')
+    api_client.force_authenticate(user=tenant)
+    ids, urls = walk(api_client, reverse('bookings', args=[create_listings[0].id]) + '?pagination=cursor')
+    assert ids == list(Booking.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+    assert len(urls) == 2
@@ -0,0 +1,153 @@
+import io
+import pstats
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import AsyncClient, RequestFactory
+from django.http import HttpResponse
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking
+from rental_project.profiling import ProfileStorage, StackSampler, make_token, read_token
+
+User = get_user_model()
+
+@pytest.fixture
+def profile_dir(settings, tmp_path):
+    # Middleware читает настройки при создании: клиенты создаются после изменения
+    settings.PROFILING_DIR = tmp_path
+    settings.PROFILING_SAMPLE_RATE = 0
+    return tmp_path
+
+@pytest.fixture
+def create_users():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None,
+                                        role='landlord', is_staff=True)
+    return tenant, landlord
+
+@pytest.fixture
+def listing(create_users):
+    tenant, landlord = create_users
+    listing = Listing.objects.create(owner=landlord, title='Квартира', description='Описание', location='Berlin',
+                                     price=800, rooms=2, type='apartment')
+    Booking.objects.create(listing=listing, user=tenant, start_date='2024-09-20', end_date='2024-09-25')
+    return listing
+
+def client_for(user=None, **headers):
+    client = APIClient(headers=headers)
+    if user is not None:
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+def profiles(directory):
+    return sorted(path.name for path in directory.iterdir())
+
+@pytest.mark.django_db
+def test_signed_header_writes_cprofile(profile_dir, listing):
+    response = client_for(listing.owner, **{'X-Profile': make_token()}).get(
+        reverse('listing_detail', kwargs={'pk': listing.pk}))
+    assert response.status_code == 200
+    assert profiles(profile_dir) == [response['X-Profile']]
+    assert response['X-Profile'].endswith('-GET-listings_{}-200.prof'.format(listing.pk))
+
+    # Профиль охватывает сериализацию и рендеринг
+    stats = pstats.Stats(str(profile_dir / response['X-Profile']))
+    functions = {name for _, _, name in stats.stats}
+    assert {'get_bookings', 'render'} <= functions
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('case', ['forged', 'expired'])
+def test_invalid_or_expired_header_is_ignored(profile_dir, settings, listing, case):
+    token = make_token()
+    if case == 'forged':
+        token = token[:-2] + ('xx' if not token.endswith('xx') else 'yy')
+    else:
+        settings.PROFILING_TOKEN_MAX_AGE = -1
+    response = client_for(**{'X-Profile': token}).get(reverse('listings'))
+    assert response.status_code == 200
+    assert 'X-Profile' not in response
+    assert profiles(profile_dir) == []
+
+@pytest.mark.django_db
+def test_query_flag_only_for_staff(profile_dir, create_users, listing):
+    tenant, landlord = create_users
+    url = reverse('listings') + '?profile=collapsed'
+    for user in (None, tenant):
+        response = client_for(user).get(url)
+        assert response.status_code == 200 and 'X-Profile' not in response
+    assert profiles(profile_dir) == []
+
+    response = client_for(landlord).get(url)
+    assert response.status_code == 200
+    assert profiles(profile_dir) == [response['X-Profile']]
+    assert response['X-Profile'].endswith('.collapsed')
+
+@pytest.mark.django_db
+def test_sampled_requests_are_profiled(profile_dir, settings, listing):
+    settings.PROFILING_SAMPLE_RATE = 1
+    response = client_for().get(reverse('listings'))
+    assert response.status_code == 200
+    # Имя файла возвращается только тому, кто запросил профиль
+    assert 'X-Profile' not in response
+    assert len(profiles(profile_dir)) == 1
+
+@pytest.mark.django_db(transaction=True)
+def test_async_requests_are_profiled(profile_dir, listing):
+    response = async_to_sync(AsyncClient().get)(reverse('listings'), headers={'X-Profile': make_token()})
+    assert response.status_code == 200
+    # Синхронная часть запроса (view, сериализация, рендеринг) попадает в профиль
+    stats = pstats.Stats(str(profile_dir / response['X-Profile']))
+    assert 'render' in {name for _, _, name in stats.stats}
+
+def test_stack_sampler_collects_collapsed_stacks(tmp_path):
+    def busy():
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+
+    with StackSampler(interval=0.001) as sampler:
+        busy()
+    sampler.dump(tmp_path / 'stacks.collapsed')
+    lines = (tmp_path / 'stacks.collapsed').read_text().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+    assert any('test_stack_sampler_collects_collapsed_stacks.<locals>.busy' in line for line in lines)
+
+class FixedSizeProfiler:
+    suffix = '.prof'
+
+    def __init__(self, size):
+        self.size = size
+
+    def dump(self, path):
+        path.write_bytes(b'x' * self.size)
+
+def test_storage_rotation_and_size_limits(tmp_path):
+    storage = ProfileStorage(tmp_path, max_files=3, max_file_size=100, max_total_size=180)
+    request, response = RequestFactory().get('/listings/'), HttpResponse()
+    saved = [storage.save(FixedSizeProfiler(50), request, response) for _ in range(5)]
+    # Остаются три самых новых файла
+    assert profiles(tmp_path) == [path.name for path in saved[2:]]
+
+    # Слишком большой профиль не сохраняется
+    assert storage.save(FixedSizeProfiler(101), request, response) is None
+    assert profiles(tmp_path) == [path.name for path in saved[2:]]
+
+    # Общий размер 3 * 50 + 100 больше 180: удаляются самые старые, пока не станет не больше
+    latest = storage.save(FixedSizeProfiler(100), request, response)
+    assert profiles(tmp_path) == [saved[4].name, latest.name]
+
+def test_profiling_token_command():
+    out = io.StringIO()
+    call_command('profiling_token', format='collapsed', stdout=out, stderr=io.StringIO())
+    header, token = out.getvalue().strip().split(': ')
+    assert header == 'X-Profile'
+    assert read_token(token) == 'collapsed'
+    assert read_token('garbage') is None
@@ -0,0 +1,51 @@
+import re
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from listings.views import ListingView
+
+# Частые комбинации фильтров и сортировок ListingView
+FILTER_COMBINATIONS = [
+    {'is_active': 'true'},
+    {'is_active': 'true', 'type': 'house'},
+    {'is_active': 'true', 'type': 'house', 'price': '100'},
+    {'is_active': 'true', 'price': '100'},
+    {'is_active': 'true', 'ordering': 'price'},
+    {'is_active': 'true', 'ordering': '-created_at'},
+    {'is_active': 'true', 'ordering': '-rating_avg'},
+    {'is_active': 'true', 'min_rating': '4'},
+    {'is_active': 'true', 'type': 'studio', 'ordering': 'price'},
+    {'type': 'apartment'},
+    {'type': 'apartment', 'price': '100'},
+    {'type': 'apartment', 'ordering': '-price'},
+    {'location': 'Berlin'},
+    {'location': 'Berlin', 'rooms': '2'},
+    {'location': 'Berlin', 'rooms': '2', 'is_active': 'true'},
+]
+
+def listing_queryset(params):
+    # Queryset, который ListingView строит для заданных параметров запроса
+    request = Request(APIRequestFactory().get('/listings/', params))
+    request.user = AnonymousUser()
+    view = ListingView(request=request, format_kwarg=None, kwargs={})
+    return view.filter_queryset(view.get_queryset())
+
+def query_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='EXPLAIN QUERY PLAN is SQLite specific')
+@pytest.mark.parametrize('params', FILTER_COMBINATIONS, ids=lambda params: '&'.join(f'{k}={v}' for k, v in params.items()))
+def test_listing_filters_use_indexes(params):
+    plan = query_plan(listing_queryset(params))
+    # Полный просмотр таблицы без индекса
+    assert not [step for step in plan if re.fullmatch(r'SCAN listings_listing', step)], plan
+    # Сортировка должна идти по индексу, а не во временном B-дереве
+    if 'ordering' in params:
+        assert 'USE TEMP B-TREE FOR ORDER BY' not in plan, plan
@@ -0,0 +1,131 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from django.core.management import call_command
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking, Review
+
+User = get_user_model()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def create_users():
+    tenants = [
+        User.objects.create_user(username=f'tenant{i}', email=f'tenant{i}@example.com', password=None, role='tenant')
+        for i in range(3)
+    ]
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    return tenants, landlord
+
+@pytest.fixture
+def create_listings(create_users):
+    _, landlord = create_users
+    return [
+        Listing.objects.create(owner=landlord, title=f"Listing {i}", description="", location="Test City",
+                               price=100, rooms=2, type='apartment')
+        for i in range(3)
+    ]
+
+def ratings(listing):
+    listing.refresh_from_db()
+    return listing.review_count, listing.rating_sum, listing.rating_avg
+
+@pytest.mark.django_db
+def test_rating_aggregates_follow_reviews(create_users, create_listings):
+    tenants, _ = create_users
+    listing, other = create_listings[:2]
+    first = Review.objects.create(listing=listing, user=tenants[0], rating=5, comment="Great")
+    Review.objects.create(listing=listing, user=tenants[1], rating=2, comment="Bad")
+    assert ratings(listing) == (2, 7, 3.5)
+
+    first = Review.objects.get(pk=first.pk)
+    first.rating = 3
+    first.save()
+    assert ratings(listing) == (2, 5, 2.5)
+
+    first.listing = other
+    first.save()
+    assert ratings(listing) == (1, 2, 2.0)
+    assert ratings(other) == (1, 3, 3.0)
+
+    Review.objects.filter(listing=listing).delete()
+    assert ratings(listing) == (0, 0, 0.0)
+
+@pytest.mark.django_db
+def test_concurrent_updates_do_not_drift(create_users, create_listings):
+    tenants, _ = create_users
+    listing = create_listings[0]
+    review = Review.objects.create(listing=listing, user=tenants[0], rating=3, comment="")
+    # Две копии одного отзыва, загруженные до изменения (параллельные запросы)
+    first, second = Review.objects.get(pk=review.pk), Review.objects.get(pk=review.pk)
+    first.rating = 5
+    first.save()
+    second.rating = 4
+    second.save()
+    assert ratings(listing) == (1, 4, 4.0)
+
+    # Повторное удаление уже удаленного отзыва
+    first.delete()
+    second.delete()
+    assert ratings(listing) == (0, 0, 0.0)
+
+@pytest.mark.django_db
+def test_listing_delete_skips_per_row_updates(create_users, create_listings):
+    tenants, _ = create_users
+    listing, other = create_listings[:2]
+    for tenant in tenants:
+        Review.objects.create(listing=listing, user=tenant, rating=4, comment="")
+        Booking.objects.create(listing=listing, user=tenant, start_date='2024-09-20', end_date='2024-09-25')
+    with CaptureQueriesContext(connection) as queries:
+        listing.delete()
+    # Каскадное удаление не обновляет удаляемое объявление по каждому отзыву и бронированию
+    assert not [query for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+    assert not Review.objects.filter(listing_id=listing.pk).exists()
+
+    # Удаление отдельного отзыва по-прежнему обновляет объявление
+    review = Review.objects.create(listing=other, user=tenants[0], rating=5, comment="")
+    review.delete()
+    assert ratings(other) == (0, 0, 0.0)
+
+@pytest.mark.django_db
+def test_review_update_view_updates_rating(api_client, create_users, create_listings):
+    tenants, _ = create_users
+    listing = create_listings[0]
+    Booking.objects.create(listing=listing, user=tenants[0], start_date='2024-09-20', end_date='2024-09-25',
+                           status='confirmed')
+    review = Review.objects.create(listing=listing, user=tenants[0], rating=5, comment="Great")
+    api_client.force_authenticate(user=tenants[0])
+    response = api_client.patch(
+        reverse('review_detail', kwargs={'listing_id': listing.id, 'pk': review.id}),
+        {'rating': 1}
+    )
+    assert response.status_code == 200
+    assert ratings(listing) == (1, 1, 1.0)
+
+@pytest.mark.django_db
+def test_recompute_ratings_command(create_users, create_listings):
+    tenants, _ = create_users
+    listing = create_listings[0]
+    Review.objects.bulk_create([
+        Review(listing=listing, user=tenant, rating=rating, comment="")
+        for tenant, rating in zip(tenants, [5, 4, 3])
+    ])
+    # bulk_create не отправляет сигналы, агрегаты устарели
+    assert ratings(listing) == (0, 0, 0.0)
+    call_command('recompute_ratings', chunk_size=1)
+    assert ratings(listing) == (3, 12, 4.0)
+
+@pytest.mark.django_db
+def test_rating_ordering_and_filter(api_client, create_users, create_listings):
+    tenants, _ = create_users
+    for listing, rating in zip(create_listings, [3, 5, 4]):
+        Review.objects.create(listing=listing, user=tenants[0], rating=rating, comment="")
+    response = api_client.get(reverse('listings'), {'ordering': '-rating_avg'})
+    assert [item['rating_avg'] for item in response.data['results']] == [5.0, 4.0, 3.0]
+    response = api_client.get(reverse('listings'), {'min_rating': '4'})
+    assert sorted(item['id'] for item in response.data['results']) == [create_listings[1].id, create_listings[2].id]
@@ -0,0 +1,146 @@
+import datetime
+import io
+import json
+from decimal import Decimal
+from importlib.util import find_spec
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking, Review
+from rental_project.parsers import ORJSONParser
+from rental_project.renderers import ORJSONRenderer
+
+User = get_user_model()
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def create_users():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password='password123', role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password='password123', role='landlord')
+    return tenant, landlord
+
+@pytest.fixture
+def create_listing(create_users):
+    tenant, landlord = create_users
+    listing = Listing.objects.create(owner=landlord, title="Квартира у парка", description="Описание",
+                                     location="Berlin", price='1234.50', rooms=2, type='apartment',
+                                     latitude=52.52, longitude=13.405)
+    Booking.objects.create(listing=listing, user=tenant, start_date='2024-09-20', end_date='2024-09-25',
+                           status='confirmed')
+    Review.objects.create(listing=listing, user=tenant, rating=4, comment="Хорошо")
+    return listing
+
+def test_orjson_matches_drf_json_renderer():
+    data = {
+        'price': Decimal('1234.50'),
+        'created_at': datetime.datetime(2024, 9, 20, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+        'naive': datetime.datetime(2024, 9, 20, 12, 30),
+        'date': datetime.date(2024, 9, 20),
+        'time': datetime.time(8, 15, 30, 500000),
+        'title': 'Квартира',
+        'items': [1, 2.5, None, True],
+        1: 'non-str key',
+    }
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+@pytest.mark.django_db
+def test_listing_list_output_unchanged(api_client, create_users, create_listing):
+    tenant, _ = create_users
+    api_client.force_authenticate(user=tenant)
+    response = api_client.get(reverse('listings'))
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/json'
+    assert response.content == JSONRenderer().render(response.data)
+    listing = response.json()['results'][0]
+    assert listing['price'] == '1234.50'
+    assert listing['bookings'][0]['start_date'] == '2024-09-20'
+
+@pytest.mark.django_db
+def test_json_request_body_is_parsed(api_client, create_users):
+    _, landlord = create_users
+    api_client.force_authenticate(user=landlord)
+    response = api_client.post(reverse('listings'), data=json.dumps({
+        'title': 'Новая квартира', 'description': 'Описание', 'location': 'Berlin',
+        'price': '850.00', 'rooms': 2, 'type': 'apartment',
+    }), content_type='application/json')
+    assert response.status_code == 201, response.data
+    assert Listing.objects.get(title='Новая квартира').price == Decimal('850.00')
+
+@pytest.mark.django_db
+def test_invalid_json_returns_400(api_client, create_users):
+    _, landlord = create_users
+    api_client.force_authenticate(user=landlord)
+    response = api_client.post(reverse('listings'), data='{"title": ', content_type='application/json')
+    assert response.status_code == 400
+    assert 'JSON parse error' in response.json()['detail']
+
+def test_orjson_parser_rejects_nan():
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(io.BytesIO(b'{"price": NaN}'))
+
+def test_orjson_escapes_line_separators():
+    data = {'comment': 'строка\u2028абзац\u2029конец'}
+    content = ORJSONRenderer().render(data)
+    assert content == JSONRenderer().render(data)
+    assert b'\\u2028' in content and b'\\u2029' in content
+
+def test_orjson_differences_from_drf_json_renderer():
+    # Числа с порядком: другая запись того же значения
+    data = {'distance': 1e-7, 'big': 1e16}
+    content = ORJSONRenderer().render(data)
+    assert content == b'{"distance":1e-7,"big":1e16}'
+    assert JSONRenderer().render(data) == b'{"distance":1e-07,"big":1e+16}'
+    assert json.loads(content) == data
+    # NaN и Infinity - null вместо ошибки
+    assert ORJSONRenderer().render({'rating_avg': float('nan'), 'x': float('inf')}) == b'{"rating_avg":null,"x":null}'
+    with pytest.raises(ValueError):
+        JSONRenderer().render({'rating_avg': float('nan')})
+    # Целые больше 64 бит кодирует DRF
+    assert ORJSONRenderer().render({'id': 2 ** 70}) == JSONRenderer().render({'id': 2 ** 70})
+
+def test_orjson_parser_decodes_charset():
+    body = '{"title": "Квартира"}'.encode('cp1251')
+    assert ORJSONParser().parse(io.BytesIO(body), parser_context={'encoding': 'cp1251'}) == {'title': 'Квартира'}
+    # Тело не в объявленной кодировке и неизвестная кодировка - 400
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(io.BytesIO(body), parser_context={'encoding': 'utf-8'})
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(io.BytesIO(body), parser_context={'encoding': 'no-such-charset'})
+
+@pytest.mark.django_db
+def test_msgpack_round_trip(api_client, create_users, create_listing):
+    msgpack = pytest.importorskip('msgpack')
+    tenant, landlord = create_users
+    api_client.force_authenticate(user=tenant)
+    response = api_client.get(reverse('listings'), HTTP_ACCEPT='application/msgpack')
+    assert response['Content-Type'] == 'application/msgpack'
+    assert msgpack.unpackb(response.content) == json.loads(JSONRenderer().render(response.data))
+
+    api_client.force_authenticate(user=landlord)
+    response = api_client.post(reverse('listings'), data=msgpack.packb({
+        'title': 'MessagePack', 'description': 'Binary', 'location': 'Berlin',
+        'price': '500.00', 'rooms': 1, 'type': 'studio',
+    }), content_type='application/msgpack')
+    assert response.status_code == 201, response.data
+
+@pytest.mark.django_db
+def test_msgpack_not_offered_without_library(api_client, create_users):
+    if find_spec('msgpack') is not None:
+        pytest.skip('msgpack installed')
+    _, landlord = create_users
+    api_client.force_authenticate(user=landlord)
+    assert api_client.get(reverse('listings'), HTTP_ACCEPT='application/msgpack').status_code == 406
+    response = api_client.post(reverse('listings'), data=b'\x80', content_type='application/msgpack')
+    assert response.status_code == 415
@@ -0,0 +1,54 @@
+import pytest
+from rest_framework.test import APIClient
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing
+
+User = get_user_model()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def landlord():
+    return User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+
+def create_listing(owner, title, description):
+    return Listing.objects.create(owner=owner, title=title, description=description, location="Test City",
+                                  price=100, rooms=2, type='apartment')
+
+def search(api_client, query):
+    response = api_client.get(reverse('listings'), {'search': query})
+    assert response.status_code == 200
+    return [item['id'] for item in response.data['results']]
+
+@pytest.mark.django_db
+def test_search_ranks_by_relevance(api_client, landlord):
+    weak = create_listing(landlord, "Quiet house", "Garden and a small balcony")
+    strong = create_listing(landlord, "Balcony apartment", "Balcony with view, second balcony in bedroom")
+    create_listing(landlord, "Studio", "Close to the station")
+    assert search(api_client, 'balcony') == [strong.id, weak.id]
+
+@pytest.mark.django_db
+def test_search_prefix_and_all_terms(api_client, landlord):
+    listing = create_listing(landlord, "Sunny apartment", "Near the river")
+    create_listing(landlord, "Sunny house", "In the forest")
+    assert search(api_client, 'apart riv') == [listing.id]
+    assert search(api_client, 'квартира') == []
+
+@pytest.mark.django_db
+def test_search_index_follows_updates_and_deletes(api_client, landlord):
+    listing = create_listing(landlord, "Old title", "Nothing special")
+    listing.title = "Renovated loft"
+    listing.save()
+    assert search(api_client, 'loft') == [listing.id]
+    assert search(api_client, 'old') == []
+    listing.delete()
+    assert search(api_client, 'loft') == []
+
+@pytest.mark.django_db
+def test_search_escapes_query_syntax(api_client, landlord):
+    listing = create_listing(landlord, "Loft \"NEAR\" park", "OR AND NOT")
+    assert search(api_client, '"near') == [listing.id]
+    assert search(api_client, 'NOT*') == [listing.id]
@@ -0,0 +1,93 @@
+import pytest
+from rest_framework.test import APIClient
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from listings.models import Listing, Booking, Review
+
+User = get_user_model()
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def create_users():
+    tenant = User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+    landlord = User.objects.create_user(username='landlord', email='landlord@example.com', password=None, role='landlord')
+    return tenant, landlord
+
+@pytest.fixture
+def create_listings(create_users):
+    tenant, landlord = create_users
+    listings = [
+        Listing.objects.create(owner=landlord, title=f"Listing {i}", description="Long description " * 20,
+                               location="Berlin", price=100 + i, rooms=2, type='apartment')
+        for i in range(3)
+    ]
+    for listing in listings:
+        Booking.objects.create(listing=listing, user=tenant, start_date='2024-09-20', end_date='2024-09-25',
+                               status='confirmed')
+        Review.objects.create(listing=listing, user=tenant, rating=5, comment="Great")
+    return listings
+
+@pytest.mark.django_db
+def test_fields_narrow_response_and_sql(api_client, create_listings):
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.get(reverse('listings'), {'fields': 'title,price,location,type'})
+    assert response.status_code == 200
+    assert set(response.data['results'][0]) == {'id', 'title', 'price', 'location', 'type'}
+    # COUNT и сами объявления, без подгрузки отзывов
+    assert len(context.captured_queries) == 2
+    listing_query = context.captured_queries[-1]['sql']
+    assert '"description"' not in listing_query and '"title"' in listing_query
+
+@pytest.mark.django_db
+def test_omit_skips_related_prefetches(api_client, create_users, create_listings, django_assert_num_queries):
+    tenant, _ = create_users
+    api_client.force_authenticate(user=tenant)
+    with django_assert_num_queries(2):
+        response = api_client.get(reverse('listings'), {'omit': 'reviews,bookings,description'})
+    item = response.data['results'][0]
+    assert 'reviews' not in item and 'bookings' not in item and 'description' not in item
+    assert item['title'].startswith("Listing")
+
+    # Только бронирования: отзывы не подгружаются, видимость бронирований сохраняется
+    with django_assert_num_queries(3):
+        response = api_client.get(reverse('listings'), {'fields': 'bookings'})
+    assert len(response.data['results'][0]['bookings']) == 1
+
+@pytest.mark.django_db
+def test_fields_with_ordering_and_cursor(api_client, create_listings, django_assert_num_queries):
+    # Поле сортировки загружается, даже если его нет в ответе: курсор строится без дозагрузки
+    with django_assert_num_queries(1):
+        response = api_client.get(reverse('listings'), {'fields': 'title', 'ordering': '-price',
+                                                        'pagination': 'cursor'})
+    assert [item['title'] for item in response.data['results']] == ["Listing 2", "Listing 1", "Listing 0"]
+
+@pytest.mark.django_db
+def test_unknown_field_is_rejected(api_client, create_listings):
+    assert api_client.get(reverse('listings'), {'fields': 'title,secret'}).status_code == 400
+    assert api_client.get(reverse('listings'), {'omit': 'secret'}).status_code == 400
+
+@pytest.mark.django_db
+def test_detail_fields_and_etag(api_client, create_users, create_listings, django_assert_num_queries):
+    tenant, _ = create_users
+    api_client.force_authenticate(user=tenant)
+    url = reverse('listing_detail', args=[create_listings[0].id])
+    full = api_client.get(url)
+    with django_assert_num_queries(1):
+        short = api_client.get(url, {'fields': 'title,rating_avg'})
+    assert short.data == {'id': create_listings[0].id, 'title': "Listing 0", 'rating_avg': 5.0}
+    # Разные наборы полей - разные представления и разные ETag
+    assert short['ETag'] != full['ETag']
+    assert api_client.get(url, {'fields': 'title,rating_avg'}, HTTP_IF_NONE_MATCH=short['ETag']).status_code == 304
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=short['ETag']).status_code == 200
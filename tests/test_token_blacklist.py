@@ -0,0 +1,126 @@
+import uuid
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from users.blacklist import BloomFilter, blacklist_index, bump_version
+from users.tokens import RefreshToken
+
+User = get_user_model()
+
+@pytest.fixture(autouse=True)
+def reset_blacklist(settings):
+    # Тесты моделируют несколько процессов с одним кэшем: фильтр включен и при LocMemCache
+    settings.TOKEN_BLACKLIST_BLOOM_FILTER = True
+    cache.clear()
+    blacklist_index.clear()
+    yield
+    blacklist_index.clear()
+
+@pytest.fixture
+def tenant():
+    return User.objects.create_user(username='tenant', email='tenant@example.com', password=None, role='tenant')
+
+def blacklist_queries(queries):
+    return [query['sql'] for query in queries if 'token_blacklist_blacklistedtoken' in query['sql']]
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1_000, error_rate=0.01)
+    items = [uuid.uuid4().hex for _ in range(1_000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10_000))
+    assert false_positives < 300
+
+@pytest.mark.django_db
+def test_valid_token_checked_without_query(tenant):
+    refresh = RefreshToken.for_user(tenant)
+    blacklist_index.warm()
+    with CaptureQueriesContext(connection) as queries:
+        RefreshToken(str(refresh))
+    assert blacklist_queries(queries.captured_queries) == []
+
+@pytest.mark.django_db
+def test_rotated_token_rejected(tenant):
+    client = APIClient()
+    refresh = str(RefreshToken.for_user(tenant))
+    response = client.post(reverse('token_refresh'), {'refresh': refresh}, format='json')
+    assert response.status_code == 200
+    rotated = response.data['refresh']
+
+    # Отозванный при ротации токен - в фильтре и отклоняется после точной проверки
+    assert blacklist_index.warmed
+    assert client.post(reverse('token_refresh'), {'refresh': refresh}, format='json').status_code == 401
+    assert client.post(reverse('token_refresh'), {'refresh': rotated}, format='json').status_code == 200
+
+@pytest.mark.django_db
+def test_entries_from_other_processes_loaded_by_version(tenant):
+    refresh = RefreshToken.for_user(tenant)
+    blacklist_index.warm()
+    # Запись без сигнала - как из другого процесса
+    BlacklistedToken.objects.bulk_create([BlacklistedToken(token=OutstandingToken.objects.get(jti=refresh['jti']))])
+    # Пока счетчик изменений не сдвинулся, фильтр о записи не знает
+    RefreshToken(str(refresh))
+    bump_version()
+    with pytest.raises(TokenError):
+        RefreshToken(str(refresh))
+
+@pytest.mark.django_db
+def test_process_local_cache_checks_database(settings, tenant):
+    settings.TOKEN_BLACKLIST_BLOOM_FILTER = None
+    refresh = RefreshToken.for_user(tenant)
+    blacklist_index.warm()
+    # Запись из другого процесса: счетчик в LocMemCache о ней не узнает, проверка идет в базу
+    BlacklistedToken.objects.bulk_create([BlacklistedToken(token=OutstandingToken.objects.get(jti=refresh['jti']))])
+    with pytest.raises(TokenError):
+        RefreshToken(str(refresh))
+
+@pytest.mark.django_db
+def test_middleware_rejects_blacklisted_refresh_token(tenant):
+    refresh = RefreshToken.for_user(tenant)
+    refresh.blacklist()
+    client = APIClient()
+    client.cookies['refresh_token'] = str(refresh)
+    response = client.get(reverse('protected_data'))
+    assert response.status_code == 401
+    assert 'access_token' not in response.cookies
+
+@pytest.mark.django_db
+def test_outstanding_tokens_written_by_issuing_request(tenant):
+    client = APIClient()
+    response = client.post(reverse('token_refresh'), {'refresh': str(RefreshToken.for_user(tenant))}, format='json')
+    assert response.status_code == 200
+    # Запись ротированного токена создается в запросе, без поиска пользователя
+    rotated = OutstandingToken.objects.get(jti=RefreshToken(response.data['refresh'])['jti'])
+    assert rotated.user_id == tenant.pk
+    assert OutstandingToken.objects.filter(user=tenant).count() == 2
+
+@pytest.mark.django_db
+def test_outstanding_token_rolled_back_with_request(tenant):
+    # Запись откатывается вместе с транзакцией выпустившего токен запроса
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            RefreshToken.for_user(tenant)
+            raise RuntimeError
+    assert OutstandingToken.objects.count() == 0
+
+@pytest.mark.django_db
+def test_sync_survives_concurrent_clear(monkeypatch, tenant):
+    blacklist_index.warm()
+    bump_version()
+    query = BlacklistedToken.objects.filter
+
+    def clear_while_reading(*args, **kwargs):
+        # clear() из другого потока, пока sync() читает базу
+        blacklist_index.clear()
+        return query(*args, **kwargs)
+    monkeypatch.setattr(BlacklistedToken.objects, 'filter', clear_while_reading)
+    assert blacklist_index.sync() is None
+    assert not blacklist_index.warmed
@@ -0,0 +1,106 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth import get_user_model
+from listings.models import Listing
+from users import cache as user_cache
+from users.authentication import JWTAuthentication
+
+User = get_user_model()
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+@pytest.fixture
+def landlord():
+    return User.objects.create_user(username='landlord', email='landlord@example.com', password='password123',
+                                    role='landlord')
+
+@pytest.fixture
+def api_client(landlord):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(landlord)}')
+    return client
+
+def create_listing(client):
+    return client.post(reverse('listings'), {
+        'title': 'Квартира', 'description': 'Описание', 'location': 'Berlin',
+        'price': '800.00', 'rooms': 2, 'type': 'apartment'}, format='json')
+
+def user_queries(queries):
+    return [query['sql'] for query in queries if 'FROM "users_user"' in query['sql']]
+
+@pytest.mark.django_db
+def test_user_loaded_from_cache(api_client, landlord):
+    with CaptureQueriesContext(connection) as first:
+        assert api_client.get(reverse('listings')).status_code == 200
+    assert len(user_queries(first.captured_queries)) == 1
+
+    with CaptureQueriesContext(connection) as second:
+        assert api_client.get(reverse('listings')).status_code == 200
+    assert user_queries(second.captured_queries) == []
+
+@pytest.mark.django_db
+def test_cached_user_matches_database(landlord):
+    user_cache.set_user(landlord.pk, landlord)
+    cached = user_cache.get_user(landlord.pk)
+    assert (cached.pk, cached.email, cached.role, cached.is_active) == (landlord.pk, landlord.email, 'landlord', True)
+    # Хеш пароля в кэш не попадает и загружается при обращении
+    assert 'password' in cached.get_deferred_fields()
+    assert cached.check_password('password123')
+
+@pytest.mark.django_db
+def test_demoted_user_loses_access_immediately(api_client, landlord):
+    assert create_listing(api_client).status_code == 201
+    landlord.role = 'tenant'
+    landlord.save()
+    assert create_listing(api_client).status_code == 403
+    assert Listing.objects.count() == 1
+
+@pytest.mark.django_db
+def test_deactivated_user_loses_access_immediately(api_client, landlord):
+    assert api_client.get(reverse('listings')).status_code == 200
+    landlord.is_active = False
+    landlord.save()
+    response = api_client.get(reverse('listings'))
+    assert response.status_code == 401
+    assert response.data['detail'].code == 'user_inactive'
+
+@pytest.mark.django_db
+def test_deleted_user_loses_access_immediately(api_client, landlord):
+    assert api_client.get(reverse('listings')).status_code == 200
+    landlord.delete()
+    response = api_client.get(reverse('listings'))
+    assert response.status_code == 401
+    assert response.data['detail'].code == 'user_not_found'
+
+@pytest.mark.django_db
+def test_async_loader_uses_same_cache(landlord):
+    token = AccessToken.for_user(landlord)
+    authentication = JWTAuthentication()
+    assert async_to_sync(authentication.aget_user)(token) == landlord
+    with CaptureQueriesContext(connection) as queries:
+        assert authentication.get_user(token).role == 'landlord'
+    assert queries.captured_queries == []
+
+    landlord.is_active = False
+    landlord.save()
+    with pytest.raises(AuthenticationFailed) as error:
+        async_to_sync(authentication.aget_user)(token)
+    assert error.value.get_codes() == 'user_inactive'
+
+def test_process_local_cache_uses_short_timeout(settings):
+    # LocMemCache не сбрасывается из других процессов: запись живет недолго
+    settings.USER_CACHE_LOCAL_TIMEOUT = 5
+    assert user_cache.get_timeout() == 5
+    settings.CACHES = {**settings.CACHES, 'shared': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                                     'LOCATION': 'redis://127.0.0.1:6379'}}
+    settings.USER_CACHE_ALIAS = 'shared'
+    assert user_cache.get_timeout() == settings.USER_CACHE_TIMEOUT
@@ -0,0 +1,113 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from rental_project.instrumentation import phase
+from . import cache as user_cache
+from .tokens import VerifiedTokenCache, verified_tokens
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    JWT-аутентификация simplejwt с асинхронным вариантом для async view (aauthenticate):
+    токен проверяется так же, пользователь загружается через async ORM.
+    Каждый токен декодируется и проверяется один раз: токен, уже проверенный
+    JWTAuthenticationMiddleware в этом запросе или найденный в кэше проверенных токенов,
+    повторно не проверяется. Пользователь загружается из кэша (users.cache), а не из базы.
+    """
+
+    def authenticate(self, request):
+        raw_token = self.get_request_raw_token(request)
+        if raw_token is None:
+            return None
+
+        # Фаза jwt в Server-Timing (rental_project/instrumentation.py)
+        with phase(request, 'jwt'):
+            validated_token = self.get_request_token(request, raw_token)
+            return self.get_user(validated_token), validated_token
+
+    async def aauthenticate(self, request):
+        raw_token = self.get_request_raw_token(request)
+        if raw_token is None:
+            return None
+
+        # Фаза - только проверка токена: во время await выполняются другие корутины
+        with phase(request, 'jwt'):
+            validated_token = self.get_request_token(request, raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    def get_request_raw_token(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        return self.get_raw_token(header)
+
+    def get_request_token(self, request, raw_token):
+        # Токен, проверенный middleware в этом же запросе (см. JWTAuthenticationMiddleware)
+        carried = getattr(request, 'jwt_access_token', None)
+        if carried is not None and carried[0] == VerifiedTokenCache.key(raw_token):
+            return carried[1]
+        return self.get_validated_token(raw_token)
+
+    def get_validated_token(self, raw_token):
+        token = verified_tokens.get(raw_token)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            verified_tokens.set(raw_token, token)
+        return token
+
+    def get_user(self, validated_token):
+        """
+        Пользователь из кэша (users.cache) или из базы. Записи кэша сбрасываются
+        при сохранении и удалении пользователя (users.signals).
+        """
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get_user(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            user_cache.set_user(user_id, user)
+        elif api_settings.CHECK_REVOKE_TOKEN:
+            # Хеш пароля в кэш не попадает
+            user.refresh_from_db(fields=['password'])
+        self.check_user(user, validated_token)
+        return user
+
+    async def aget_user(self, validated_token):
+        """
+        Асинхронный вариант get_user с теми же проверками.
+        """
+        user_id = self.get_user_id(validated_token)
+        user = await user_cache.aget_user(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            await user_cache.aset_user(user_id, user)
+        elif api_settings.CHECK_REVOKE_TOKEN:
+            await user.arefresh_from_db(fields=['password'])
+        self.check_user(user, validated_token)
+        return user
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def check_user(self, user, validated_token):
+        """
+        Проверки simplejwt: пользователь активен и не менял пароль после выпуска токена.
+        """
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
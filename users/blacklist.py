@@ -0,0 +1,184 @@
+import hashlib
+import math
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .cache import PROCESS_LOCAL_CACHES
+
+# Ключ счетчика изменений черного списка в общем кэше: по нему другие процессы узнают о новых записях
+VERSION_KEY = 'users:blacklist:version'
+
+
+class BloomFilter:
+    """
+    Фильтр Блума для строк: ложноположительные ответы возможны (с вероятностью error_rate
+    при заполнении до capacity), ложноотрицательные - нет.
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(1, capacity)
+        # Оптимальные размер битового массива и число хеш-функций для заданной вероятности ошибки
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Двойное хеширование: k позиций из двух 64-битных половин одного хеша
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+def get_cache():
+    return caches[getattr(settings, 'TOKEN_BLACKLIST_CACHE_ALIAS', 'default')]
+
+
+class BlacklistIndex:
+    """
+    Членство в черном списке refresh-токенов (token_blacklist) в памяти процесса.
+    Фильтр Блума отвечает "точно нет" без запроса к базе; на "возможно" делается точная проверка в базе.
+    Фильтр заполняется при старте (warm) неистекшими записями и пополняется сигналом о новых записях.
+    Записи, добавленные другими процессами, подгружаются по счетчику изменений в общем кэше.
+    Если кэш виден только текущему процессу (LocMemCache), фильтр по умолчанию выключен
+    и каждая проверка идет в базу (TOKEN_BLACKLIST_BLOOM_FILTER).
+    """
+
+    def __init__(self):
+        self._filter = None
+        self._last_id = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def enabled():
+        enabled = getattr(settings, 'TOKEN_BLACKLIST_BLOOM_FILTER', None)
+        if enabled is None:
+            return not isinstance(get_cache(), PROCESS_LOCAL_CACHES)
+        return enabled
+
+    @property
+    def warmed(self):
+        return self._filter is not None
+
+    def warm(self):
+        """
+        Заполняет фильтр из базы. Возвращает False, если база недоступна (тогда проверки идут в базу).
+        """
+        capacity = getattr(settings, 'TOKEN_BLACKLIST_BLOOM_CAPACITY', 100_000)
+        error_rate = getattr(settings, 'TOKEN_BLACKLIST_BLOOM_ERROR_RATE', 0.001)
+        version = get_cache().get(VERSION_KEY)
+        try:
+            # Истекшие токены не проходят проверку срока действия, держать их в фильтре не нужно
+            rows = list(BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+                        .values_list('id', 'token__jti'))
+            last_id = BlacklistedToken.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        except DatabaseError:
+            return False
+        # Запас вдвое, чтобы новые записи не поднимали вероятность ошибки до следующего старта
+        bloom = BloomFilter(max(capacity, 2 * len(rows)), error_rate)
+        for _, jti in rows:
+            bloom.add(jti)
+        with self._lock:
+            self._filter, self._last_id, self._version = bloom, last_id, version
+        return True
+
+    def add(self, jti, row_id=None):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+                if row_id is not None:
+                    self._last_id = max(self._last_id, row_id)
+
+    def advance(self, version):
+        # Счетчик сдвинут только нашей записью: перечитывать базу не нужно
+        with self._lock:
+            if self._version is not None and version == self._version + 1:
+                self._version = version
+
+    def sync(self):
+        """
+        Подгружает записи, добавленные другими процессами, если счетчик изменений в кэше сдвинулся.
+        Возвращает текущий фильтр или None, если его сбросили (clear) параллельно.
+        """
+        version = get_cache().get(VERSION_KEY)
+        with self._lock:
+            bloom, last_id, known_version = self._filter, self._last_id, self._version
+        if bloom is None or version == known_version:
+            return bloom
+        # Записи из еще не закоммиченных транзакций могут получить id меньше уже прочитанных:
+        # перечитываем с запасом TOKEN_BLACKLIST_SYNC_OVERLAP записей
+        overlap = getattr(settings, 'TOKEN_BLACKLIST_SYNC_OVERLAP', 100)
+        rows = list(BlacklistedToken.objects.filter(id__gt=last_id - overlap)
+                    .values_list('id', 'token__jti'))
+        with self._lock:
+            # Фильтр могли сбросить или заменить, пока читалась база
+            if self._filter is not bloom:
+                return self._filter
+            for row_id, jti in rows:
+                bloom.add(jti)
+                self._last_id = max(self._last_id, row_id)
+            self._version = version
+        return bloom
+
+    def might_contain(self, jti):
+        if not self.enabled():
+            return True
+        if self._filter is None and not self.warm():
+            return True
+        bloom = self.sync()
+        return bloom is None or jti in bloom
+
+    def contains(self, jti):
+        """
+        Точная проверка: есть ли токен с этим jti в черном списке.
+        """
+        if not self.might_contain(jti):
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def clear(self):
+        with self._lock:
+            self._filter, self._last_id, self._version = None, 0, None
+
+
+def bump_version():
+    # Сообщаем другим процессам о новой записи в черном списке
+    cache = get_cache()
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        return
+    blacklist_index.advance(version)
+
+
+# Черный список процесса
+blacklist_index = BlacklistIndex()
+
+
+def warm():
+    """
+    Заполняет черный список в памяти при старте приложения (wsgi.py, asgi.py).
+    """
+    blacklist_index.warm()
+
+
+def on_blacklisted(jti, row_id=None):
+    blacklist_index.add(jti, row_id)
+    transaction.on_commit(bump_version)
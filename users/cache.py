@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+# Поля, которые не кладутся в кэш: хеш пароля загружается из базы только при обращении к нему
+EXCLUDED_FIELDS = {'password'}
+
+# Кэши, которые видит только текущий процесс: сброс записи в них не доходит до других процессов
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def get_cache():
+    return caches[getattr(settings, 'USER_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    # Время жизни записи в секундах. Кэш процесса не узнает об изменениях пользователя в других процессах:
+    # запись живет USER_CACHE_LOCAL_TIMEOUT секунд, столько же другие процессы видят старые данные
+    if isinstance(get_cache(), PROCESS_LOCAL_CACHES):
+        return getattr(settings, 'USER_CACHE_LOCAL_TIMEOUT', 5)
+    return getattr(settings, 'USER_CACHE_TIMEOUT', 300)
+
+
+def user_key(user_id):
+    return f'users:user:{user_id}'
+
+
+def dump(user):
+    return {field.attname: getattr(user, field.attname) for field in user._meta.concrete_fields
+            if field.attname not in EXCLUDED_FIELDS}
+
+
+def load(values):
+    # Объект как из базы; поля, которых нет в кэше, отложены (загружаются при обращении)
+    return get_user_model().from_db(DEFAULT_DB_ALIAS, list(values), list(values.values()))
+
+
+def get_user(user_id):
+    values = get_cache().get(user_key(user_id))
+    return load(values) if values is not None else None
+
+
+def set_user(user_id, user):
+    get_cache().set(user_key(user_id), dump(user), get_timeout())
+
+
+async def aget_user(user_id):
+    values = await get_cache().aget(user_key(user_id))
+    return load(values) if values is not None else None
+
+
+async def aset_user(user_id, user):
+    await get_cache().aset(user_key(user_id), dump(user), get_timeout())
+
+
+def invalidate(user_id):
+    # Удаляем запись сразу и еще раз после коммита: иначе запрос, прочитавший пользователя
+    # до коммита, успел бы положить в кэш старые данные (см. listings.cache.invalidate)
+    key = user_key(user_id)
+    get_cache().delete(key)
+    transaction.on_commit(lambda: get_cache().delete(key))
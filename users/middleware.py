@@ -1,67 +1,102 @@
 # middleware.py
-from datetime import datetime
+from datetime import datetime, timezone
 from django.utils.deprecation import MiddlewareMixin
-from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
 from rest_framework_simplejwt.exceptions import TokenError
 
+from rental_project.instrumentation import phase
+from .tokens import RefreshToken, VerifiedTokenCache, access_token_refreshes, verified_tokens, verify_access_token
+
 class JWTAuthenticationMiddleware(MiddlewareMixin):
     """
     Middleware для аутентификации пользователей с помощью JWT-токенов.
+    Каждый токен проверяется один раз за запрос: проверенный токен сохраняется в request.jwt_access_token
+    (строка токена и AccessToken) и используется JWTAuthentication и при установке cookie.
     """
 
     def process_request(self, request):
         """
         Обрабатывает запрос перед тем, как он будет обработан view-функцией.
         """
+        # Фаза jwt в Server-Timing (rental_project/instrumentation.py)
+        with phase(request, 'jwt'):
+            self.authenticate_cookies(request)
+
+    def authenticate_cookies(self, request):
+        """
+        Проверяет access-токен из cookies или выпускает новый по refresh-токену.
+        """
         # Получаем токены из cookies
         access_token = request.COOKIES.get('access_token')
         refresh_token = request.COOKIES.get('refresh_token')
 
         if access_token:
             try:
-                # Проверяем токен на валидность
-                token = AccessToken(access_token)
-                # Проверяем, не истек ли токен
-                if datetime.utcfromtimestamp(token['exp']) < datetime.utcnow():
-                    raise TokenError('Token expired')
+                # Проверяем токен на валидность (подпись и срок действия; проверенные токены - из кэша)
+                token = verify_access_token(access_token)
                 # Если токен валиден, добавляем его в метаданные запроса
                 request.META['HTTP_AUTHORIZATION'] = f'Bearer {access_token}'
+                # Проверенный токен передаем аутентификации
+                request.jwt_access_token = (access_token, token)
             except TokenError:
                 # Если токен невалиден, обновляем его с помощью refresh-токена
-                new_access_token = self.refresh_access_token(refresh_token)
-                if new_access_token:
-                    # Если обновление токена прошло успешно, добавляем новый токен в метаданные запроса
-                    request.META['HTTP_AUTHORIZATION'] = f'Bearer {new_access_token}'
-                    # Сохраняем новый токен в атрибуте запроса
-                    request._new_access_token = new_access_token
-                else:
-                    # Если обновление токена не прошло успешно, удаляем cookies
-                    self.clear_cookies(request)
+                self.set_new_access_token(request, refresh_token)
 
         elif refresh_token:
             # Если доступный токен не найден, но есть refresh-токен, обновляем доступный токен
-            new_access_token = self.refresh_access_token(refresh_token)
-            if new_access_token:
-                # Если обновление токена прошло успешно, добавляем новый токен в метаданные запроса
-                request.META['HTTP_AUTHORIZATION'] = f'Bearer {new_access_token}'
-                # Сохраняем новый токен в атрибуте запроса
-                request._new_access_token = new_access_token
-            else:
-                # Если обновление токена не прошло успешно, удаляем cookies
-                self.clear_cookies(request)
+            self.set_new_access_token(request, refresh_token)
+
+    def set_new_access_token(self, request, refresh_token):
+        """
+        Выпускает новый access-токен по refresh-токену и передает его дальше в запросе.
+        """
+        new_access_token = self.refresh_access_token(refresh_token)
+        if new_access_token is not None:
+            raw_token = str(new_access_token)
+            # Если обновление токена прошло успешно, добавляем новый токен в метаданные запроса
+            request.META['HTTP_AUTHORIZATION'] = f'Bearer {raw_token}'
+            # Новый токен только что подписан: проверять его повторно не нужно
+            request.jwt_access_token = (VerifiedTokenCache.key(raw_token), new_access_token)
+            verified_tokens.set(raw_token, new_access_token)
+            # Сохраняем новый токен в атрибуте запроса
+            request._new_access_token = raw_token
+        else:
+            # Если обновление токена не прошло успешно, удаляем cookies
+            self.clear_cookies(request)
 
     def refresh_access_token(self, refresh_token):
         """
-        Обновляет доступный токен с помощью refresh-токена.
+        Обновляет доступный токен с помощью refresh-токена. Возвращает AccessToken или None.
+        Одновременные запросы с одним refresh-токеном (параллельные запросы браузера после истечения
+        access-токена) получают один и тот же новый токен. Повторные запросы в течение
+        JWT_REFRESH_GRACE_PERIOD получают его же, пока refresh-токен не отозван.
+        """
+        if not refresh_token:
+            return None
+        return access_token_refreshes.run(refresh_token, self.issue_access_token, self.refresh_token_valid)
+
+    def issue_access_token(self, refresh_token):
+        """
+        Выпускает access-токен по refresh-токену. Возвращает AccessToken или None.
         """
         try:
-            # Обновляем токен
+            # Обновляем токен (черный список проверяется фильтром в памяти)
             refresh = RefreshToken(refresh_token)
-            return str(refresh.access_token)
+            return refresh.access_token
         except TokenError:
             # Если обновление токена не прошло успешно, возвращаем None
             return None
 
+    @staticmethod
+    def refresh_token_valid(refresh_token):
+        """
+        Проверяет refresh-токен (подпись, срок действия, черный список) без выпуска access-токена.
+        """
+        try:
+            RefreshToken(refresh_token)
+        except TokenError:
+            return False
+        return True
+
     def process_response(self, request, response):
         """
         Обрабатывает ответ после того, как он был обработан view-функцией.
@@ -69,8 +104,8 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
         # Получаем новый токен из атрибута запроса
         new_access_token = getattr(request, '_new_access_token', None)
         if new_access_token:
-            # Получаем время истечения нового токена
-            access_expiry = AccessToken(new_access_token)['exp']
+            # Время истечения берем из claims выпущенного токена, не декодируя его заново
+            access_expiry = request.jwt_access_token[1]['exp']
             # Устанавливаем новый токен в cookies
             response.set_cookie(
                 key='access_token',
@@ -78,7 +113,7 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
                 httponly=True,
                 secure=False,  # Используйте True для HTTPS
                 samesite='Lax',
-                expires=datetime.utcfromtimestamp(access_expiry)
+                expires=datetime.fromtimestamp(access_expiry, tz=timezone.utc)
             )
         return response
 
@@ -87,4 +122,4 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
         Удаляет cookies с токенами.
         """
         request.COOKIES.pop('access_token', None)
-        request.COOKIES.pop('refresh_token', None)
\ No newline at end of file
+        request.COOKIES.pop('refresh_token', None)
@@ -21,7 +21,9 @@ class IsOwnerOrReadOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in SAFE_METHODS:
             return True
-        return obj.listing.owner == request.user
+        # Объект - объявление или связанный с объявлением объект (бронирование)
+        listing = getattr(obj, 'listing', obj)
+        return listing.owner == request.user
 
 class IsReviewOwnerOrReadOnly(BasePermission):
     """
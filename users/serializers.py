@@ -1,9 +1,12 @@
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
 from users.models import User
 from django.core.exceptions import ValidationError
 from django.contrib.auth.password_validation import validate_password
 import re
 
+from users.tokens import RefreshToken
+
 # Serializer для вывода списка пользователей.
 class UserListSerializer(serializers.ModelSerializer):
     # Serializer для вывода списка пользователей.
@@ -128,4 +131,13 @@ class LoginSerializer(serializers.Serializer):
         style={'input_type': 'password', 'placeholder': 'Пароль'}
     )
     # Запомнить меня.
-    remember_me = serializers.BooleanField()
\ No newline at end of file
+    remember_me = serializers.BooleanField()
+
+# Serializer для получения пары JWT токенов (refresh-токен с проверкой черного списка в памяти).
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+
+# Serializer для обновления JWT токенов (черный список проверяется фильтром в памяти).
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from . import blacklist
+from . import cache as user_cache
+
+
+# Сброс пользователя в кэше аутентификации при любом изменении (роль, is_active, deleted и т.д.) и удалении.
+# Изменения через QuerySet.update() сигналов не вызывают - после них нужен user_cache.invalidate
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_user_cache(sender, instance, **kwargs):
+    user_cache.invalidate(getattr(instance, api_settings.USER_ID_FIELD))
+
+
+# Новая запись черного списка сразу попадает в фильтр в памяти (users/blacklist.py)
+@receiver(post_save, sender=BlacklistedToken)
+def add_to_blacklist_index(sender, instance, created, **kwargs):
+    if created:
+        blacklist.on_blacklisted(instance.token.jti, instance.pk)
+
@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens as simplejwt_tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .blacklist import blacklist_index
+
+
+class VerifiedTokenCache:
+    """
+    Ограниченный LRU-кэш проверенных токенов: строка токена -> проверенный токен.
+    Подпись и срок действия проверяются один раз, при добавлении в кэш.
+    Запись удаляется, когда истекает срок действия токена (exp) или когда кэш переполнен
+    (вытесняется давно не использованный токен).
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(raw_token):
+        return raw_token.decode() if isinstance(raw_token, bytes) else raw_token
+
+    def get(self, raw_token):
+        key = self.key(raw_token)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None:
+                return None
+            token, expires_at = entry
+            if time.time() >= expires_at:
+                del self._tokens[key]
+                return None
+            self._tokens.move_to_end(key)
+            return token
+
+    def set(self, raw_token, token):
+        if self.maxsize <= 0:
+            return
+        key = self.key(raw_token)
+        with self._lock:
+            self._tokens[key] = (token, token['exp'])
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.maxsize:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def __len__(self):
+        return len(self._tokens)
+
+
+# Кэш проверенных access-токенов процесса (JWT_VERIFIED_TOKEN_CACHE_SIZE записей, 0 - без кэша)
+verified_tokens = VerifiedTokenCache(getattr(settings, 'JWT_VERIFIED_TOKEN_CACHE_SIZE', 1024))
+
+
+def verify_access_token(raw_token):
+    """
+    Проверяет access-токен (подпись, срок действия, тип) и возвращает AccessToken.
+    Уже проверенные токены берутся из кэша. При ошибке проверки - TokenError.
+    """
+    token = verified_tokens.get(raw_token)
+    if token is None:
+        token = AccessToken(raw_token)
+        verified_tokens.set(raw_token, token)
+    return token
+
+
+class RefreshToken(simplejwt_tokens.RefreshToken):
+    """
+    Refresh-токен с проверкой черного списка через фильтр в памяти (users/blacklist.py).
+    Запись OutstandingToken создается при выпуске токена, в транзакции выпустившего его запроса.
+    Пакетная запись не используется: надежный сброс пакета возможен только до ответа клиенту,
+    а запрос выпускает один токен, поэтому пакет из нескольких запросов не набирается.
+    """
+
+    def check_blacklist(self):
+        if blacklist_index.contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        # Запись OutstandingToken уже создана при выпуске (for_user, outstand): без поиска пользователя
+        token = OutstandingToken.objects.filter(jti=self.payload[api_settings.JTI_CLAIM]).first()
+        if token is None:
+            return super().blacklist()
+        return BlacklistedToken.objects.get_or_create(token=token)
+
+    def outstand(self):
+        # Вызывается после ротации, когда пользователь из токена уже проверен: запись без его поиска
+        token = OutstandingToken(jti=self.payload[api_settings.JTI_CLAIM], token=str(self),
+                                 user_id=self.payload.get(api_settings.USER_ID_CLAIM),
+                                 created_at=self.current_time, expires_at=datetime_from_epoch(self.payload['exp']))
+        token.save(force_insert=True)
+        return token
+
+
+class SingleFlight:
+    """
+    Объединение одновременных обновлений access-токена по одному refresh-токену:
+    первый запрос выполняет обновление, остальные ждут его результата. Успешный результат
+    еще grace_period секунд отдается повторным запросам с тем же refresh-токеном, если ключ
+    проходит повторную проверку (revalidate), например не отозван.
+    """
+
+    def __init__(self, grace_period):
+        self.grace_period = grace_period
+        self._flights = {}
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def run(self, key, func, revalidate=None):
+        """
+        Возвращает func(key), выполняя func не более одного раза для одновременных вызовов с тем же ключом.
+        Исключение из func получают все ожидающие вызовы. Сохраненный результат отдается, только если
+        revalidate(key) истинно (без revalidate - всегда), иначе он удаляется и func выполняется заново.
+        """
+        with self._lock:
+            result = self._get_result(key)
+        if result is not None:
+            # Проверка может идти в базу: вне блокировки
+            if revalidate is None or revalidate(key):
+                return result
+            self.discard(key)
+        with self._lock:
+            # Результат мог появиться, пока шла проверка: он выпущен только что
+            result = self._get_result(key)
+            if result is not None:
+                return result
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = func(key)
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.result is not None and self.grace_period > 0:
+                    self._results[key] = (flight.result, time.monotonic() + self.grace_period)
+            flight.done.set()
+        return flight.result
+
+    def _get_result(self, key):
+        # Записи добавляются с одинаковым сроком, поэтому истекшие всегда в начале
+        now = time.monotonic()
+        while self._results and next(iter(self._results.values()))[1] <= now:
+            self._results.popitem(last=False)
+        entry = self._results.get(key)
+        return entry[0] if entry is not None else None
+
+    def discard(self, key):
+        with self._lock:
+            self._results.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def __len__(self):
+        return len(self._results)
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Обновления access-токена в middleware (JWT_REFRESH_GRACE_PERIOD секунд повторного использования, 0 - без него)
+access_token_refreshes = SingleFlight(getattr(settings, 'JWT_REFRESH_GRACE_PERIOD', 10))
@@ -5,8 +5,8 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 
 urlpatterns = [
-    path('', UserListGenericView.as_view()),
-    path('register/', RegisterUserGenericView.as_view()),
+    path('', UserListGenericView.as_view(), name='users'),
+    path('register/', RegisterUserGenericView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -8,14 +8,15 @@ from rest_framework.generics import CreateAPIView, ListAPIView
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from rental_project.instrumentation import SerializePhaseMixin
 from users.serializers import RegisterUserSerializer, UserListSerializer, LoginSerializer
 from .models import User
+from .tokens import RefreshToken
 
 
 # Класс для вывода списка пользователей.
-class UserListGenericView(ListAPIView):
+class UserListGenericView(SerializePhaseMixin, ListAPIView):
     # Права доступа для этого класса.
     permission_classes = [IsAuthenticated, IsAdminUser]
     # Serializer для вывода списка пользователей.
@@ -38,10 +39,8 @@ class UserListGenericView(ListAPIView):
         # Если пользователей нет, вернуть пустой список.
         if not users.exists():
             return Response(data=[], status=status.HTTP_204_NO_CONTENT)
-        # Serializer для вывода списка пользователей.
-        serializer = self.get_serializer(users, many=True)
         # Вернуть список пользователей.
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(self.serialize(users, many=True), status=status.HTTP_200_OK)
 
 
 # Класс для регистрации нового пользователя.